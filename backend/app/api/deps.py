@@ -2,22 +2,21 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 import os
 import jwt
-from supabase import create_client, Client
+from app.core.supabase_client import get_anon_client
 
 security = HTTPBearer()
 
 # JWT Secret - same as used by Auth service
 JWT_SECRET = os.getenv("JWT_SECRET", "55a6dca744ee4e41c5c59be899a1fd185fb12c76b8eecc232ccd8cf6babed5d5")
 
-def get_supabase_client() -> Client:
-    url = os.getenv("SUPABASE_URL")
-    key = os.getenv("SUPABASE_ANON_KEY") or os.getenv("SUPABASE_KEY")
-    if not url or not key:
+def get_supabase_client():
+    supabase = get_anon_client()
+    if not supabase:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Supabase credentials not configured in backend"
         )
-    return create_client(url, key)
+    return supabase
 
 class MockUser:
     """Simple user object from JWT payload"""
@@ -1,8 +1,11 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
 from pydantic import BaseModel
-from app.services.ai_service import ai_service
-import os
-from supabase import create_client
+from typing import Optional
+from app.api.uploads import read_image_request
+from app.services.ai_service import ai_service, ModelNotReady
+from app.services.compute_pool import ComputePoolBusy
+from app.services.llm_gateway import LLMOverloaded
+from app.core.supabase_client import get_anon_client
 
 router = APIRouter()
 
@@ -10,7 +13,15 @@ class EnrichmentRequest(BaseModel):
     label: str
 
 class EmbeddingRequest(BaseModel):
-    image_base64: str
+    # JSON body only; multipart/octet-stream uploads send the raw image instead
+    image_base64: str = ""
+
+class SimilarSearchRequest(EmbeddingRequest):
+    match_threshold: float = 0.75
+    match_count: int = 3
+    # ANN recall knobs (HNSW ef_search / IVFFlat probes); DB defaults when omitted
+    ef_search: Optional[int] = None
+    probes: Optional[int] = None
 
 class ContextualDescriptionRequest(BaseModel):
     object_name: str
@@ -20,19 +31,33 @@ class ContextualDescriptionRequest(BaseModel):
     location_context: str = None
 
 def get_supabase():
-    url = os.getenv("SUPABASE_URL")
-    key = os.getenv("SUPABASE_ANON_KEY") or os.getenv("SUPABASE_KEY")
-    return create_client(url, key) if url and key else None
+    return get_anon_client()
 
 @router.post("/enrich-data")
 async def enrich_data(req: EnrichmentRequest):
-    return ai_service.enrich_label(req.label)
+    try:
+        return await ai_service.enrich_label(req.label)
+    except LLMOverloaded as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
+async def _read_image(request: Request, model_cls):
+    req, image = await read_image_request(request, model_cls)
+    image = image if image is not None else req.image_base64
+    if not image:
+        raise HTTPException(status_code=400, detail="Image required")
+    return req, image
 
 @router.post("/generate-embedding")
-async def generate_embedding(req: EmbeddingRequest):
+async def generate_embedding(request: Request):
+    """Body: JSON {image_base64}, multipart (image part) or raw image bytes."""
+    req, image = await _read_image(request, EmbeddingRequest)
     try:
-        embedding = ai_service.generate_embedding(req.image_base64)
+        embedding = await ai_service.generate_embedding_async(image)
         return {"embedding": embedding}
+    except ComputePoolBusy as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    except ModelNotReady as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
     except Exception as e:
         return {"error": str(e)}
 
@@ -42,7 +67,7 @@ async def contextual_description(req: ContextualDescriptionRequest):
     Genera una descripción inteligente usando contexto de taxonomía.
     """
     try:
-        description = ai_service.generate_contextual_description(
+        description = await ai_service.generate_contextual_description(
             object_name=req.object_name,
             category=req.category,
             subcategory=req.subcategory,
@@ -50,26 +75,40 @@ async def contextual_description(req: ContextualDescriptionRequest):
             location_context=req.location_context
         )
         return {"description": description, "success": True}
+    except LLMOverloaded as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e), headers={"Retry-After": str(e.retry_after)})
     except Exception as e:
         return {"description": f"{req.object_name} detectado.", "success": False, "error": str(e)}
 
 @router.post("/search-similar")
-async def search_similar(req: EmbeddingRequest):
+async def search_similar(request: Request):
+    """Body: JSON, multipart (image part + fields) or raw image bytes (fields in query / X-Meta)."""
+    req, image = await _read_image(request, SimilarSearchRequest)
     try:
-        embedding = ai_service.generate_embedding(req.image_base64)
+        embedding = await ai_service.generate_embedding_async(image)
         supabase = get_supabase()
         if not supabase: return {"matches": [], "error": "DB Config Missing"}
         
         # Note: 'search_similar_objects' RPC must exist (original main.py used it)
-        result = supabase.rpc('search_similar_objects', {
+        params = {
             'query_embedding': embedding,
-            'match_threshold': 0.75,
-            'match_count': 3
-        }).execute()
+            'match_threshold': req.match_threshold,
+            'match_count': req.match_count
+        }
+        # Only send tuning params when given, so older function signatures keep working
+        if req.ef_search is not None:
+            params['ef_search'] = req.ef_search
+        if req.probes is not None:
+            params['probes'] = req.probes
+        result = supabase.rpc('search_similar_objects', params).execute()
         
         matches = result.data if result.data else []
         return {"matches": matches}
         
+    except ComputePoolBusy as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    except ModelNotReady as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
     except Exception as e:
         return {"error": str(e), "matches": []}
 
@@ -1,23 +1,26 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request, Response, Query
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import Optional, List, Dict, Any
-import ollama
 import traceback
+import json
+import uuid
+import base64
 import os
-from supabase import create_client, Client
+from app.core.supabase_client import get_user_client
+from app.services.chat_persistence import chat_persistence
+from app.services.chat_context import chat_context
+from app.services.llm_gateway import LLMOverloaded, llm_gateway
 from app.api.deps import get_current_user, security
 from fastapi.security import HTTPAuthorizationCredentials
 
 router = APIRouter()
 
 # --- SUPABASE INIT ---
-def get_supabase() -> Client:
-    url = os.getenv("SUPABASE_URL")
-    key = os.getenv("SUPABASE_ANON_KEY") or os.getenv("SUPABASE_KEY")
-    if not url or not key:
-        # print("Warning: Supabase credentials missing (URL or KEY).") # Non-blocking for Chat logic
-        return None
-    return create_client(url, key)
+def get_supabase(token: HTTPAuthorizationCredentials):
+    # User-scoped view over the shared pool so RLS policies apply.
+    # Returns None when credentials are missing (non-blocking for Chat logic)
+    return get_user_client(token.credentials)
 
 # --- OLLAMA INIT ---
 # Set OLLAMA_HOST environment variable if not already set, for ollama client to pick up
@@ -38,68 +41,112 @@ class ChatResponse(BaseModel):
 
 # --- ENDPOINTS ---
 
+def _encode_cursor(updated_at: str, chat_id: str) -> str:
+    return base64.urlsafe_b64encode(f"{updated_at}|{chat_id}".encode()).decode()
+
+def _decode_cursor(cursor: str):
+    try:
+        updated_at, chat_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|", 1)
+        return updated_at, chat_id
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
 @router.get("/history")
 async def get_chat_history(
+    response: Response,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
     user=Depends(get_current_user),
     token: HTTPAuthorizationCredentials = Depends(security)
 ):
     """
     Get list of past conversations for the user.
+    Keyset-paginated on (updated_at, id); the next page cursor is returned in X-Next-Cursor.
     """
-    supabase = get_supabase()
+    supabase = get_supabase(token)
     if not supabase: 
         return []
-    supabase.postgrest.auth(token.credentials)
     
     try:
-        # Fetch id, title, created_at, text preview
-        res = supabase.from_("chat_logs")\
-            .select("id, title, created_at, messages")\
-            .eq("user_id", user.id)\
-            .order("updated_at", desc=True)\
-            .execute()
+        # Fetch id, title, created_at and the denormalized preview (no message bodies)
+        query = supabase.from_("chat_logs")\
+            .select("id, title, created_at, updated_at, last_preview, message_count")\
+            .eq("user_id", user.id)
+        if cursor:
+            updated_at, last_id = _decode_cursor(cursor)
+            query = query.or_(f'updated_at.lt."{updated_at}",and(updated_at.eq."{updated_at}",id.lt.{last_id})')
+        res = query.order("updated_at", desc=True).order("id", desc=True).limit(limit).execute()
         
         # Summarize for list view
         history = []
         for item in res.data:
-            preview = ""
-            if item.get('messages') and len(item['messages']) > 0:
-                preview = item['messages'][-1].get('content', '')[:50] + "..."
+            preview = item.get('last_preview') or ""
+            if preview:
+                preview = preview + "..."
             
             history.append({
                 "id": item['id'],
                 "title": item['title'],
                 "date": item['created_at'],
-                "preview": preview
+                "preview": preview,
+                "message_count": item.get('message_count') or 0
             })
+        
+        if len(res.data) == limit:
+            last = res.data[-1]
+            response.headers["X-Next-Cursor"] = _encode_cursor(last['updated_at'], last['id'])
             
         return history
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"History Error: {e}")
         return []
 
+def _fetch_messages(supabase, chat_id: str, limit: int, before: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Newest `limit` messages (optionally older than message id `before`), returned oldest-first."""
+    query = supabase.from_("chat_messages")\
+        .select("id, role, content, created_at")\
+        .eq("chat_id", chat_id)
+    if before is not None:
+        query = query.lt("id", before)
+    res = query.order("id", desc=True).limit(limit).execute()
+    return list(reversed(res.data or []))
+
 @router.get("/history/{chat_id}")
 async def get_chat_details(
     chat_id: str, 
+    limit: int = Query(200, ge=1, le=1000),
+    before: Optional[int] = None,
     user=Depends(get_current_user),
     token: HTTPAuthorizationCredentials = Depends(security)
 ):
     """
     Load specific conversation.
+    Messages are keyset-paginated by message id: pass `before` (= next_before) for older pages.
     """
-    supabase = get_supabase()
+    supabase = get_supabase(token)
     if not supabase: return None
-    supabase.postgrest.auth(token.credentials)
 
     try:
         res = supabase.from_("chat_logs")\
-            .select("*")\
+            .select("id, user_id, title, created_at, updated_at, message_count")\
             .eq("id", chat_id)\
             .eq("user_id", user.id)\
             .single()\
             .execute()
-        return res.data
+        chat = res.data
+        chat["messages"] = _fetch_messages(supabase, chat_id, limit, before)
+        chat["next_before"] = chat["messages"][0]["id"] if len(chat["messages"]) == limit else None
+        # Turns still queued are only relevant on the newest page
+        if before is None:
+            chat = chat_persistence.overlay(chat_id, chat, user_id=user.id)
+        return chat
     except Exception as e:
+        # Brand-new chat whose first write is still queued
+        pending = chat_persistence.overlay(chat_id, None, user_id=user.id)
+        if pending:
+            return pending
         print(f"Load Chat Error: {e}")
         raise HTTPException(status_code=404, detail="Chat not found")
 
@@ -109,9 +156,8 @@ async def delete_chat(
     user=Depends(get_current_user),
     token: HTTPAuthorizationCredentials = Depends(security)
 ):
-    supabase = get_supabase()
+    supabase = get_supabase(token)
     if not supabase: return {"status": "error"}
-    supabase.postgrest.auth(token.credentials)
 
     try:
         supabase.from_("chat_logs").delete().eq("id", chat_id).eq("user_id", user.id).execute()
@@ -129,9 +175,8 @@ async def update_chat_title(
     user=Depends(get_current_user),
     token: HTTPAuthorizationCredentials = Depends(security)
 ):
-    supabase = get_supabase()
+    supabase = get_supabase(token)
     if not supabase: return {"status": "error"}
-    supabase.postgrest.auth(token.credentials)
 
     try:
         supabase.from_("chat_logs").update({"title": req.title}).eq("id", chat_id).eq("user_id", user.id).execute()
@@ -139,6 +184,75 @@ async def update_chat_title(
     except Exception as e:
         return {"status": "error", "message": str(e)}
 
+SYSTEM_PROMPT = (
+    "Eres 'Llama 3.8', una IA avanzada integrada en el traje espacial 'Mars-Sight AR'. "
+    "Tu misión es asistir al astronauta con información científica, técnica y de supervivencia en Marte. "
+    "Respuestas concisas, útiles y en español. "
+    "Si te preguntan por datos del traje, inventa valores realistas dentro de parámetros seguros."
+)
+
+CHAT_MODEL = 'llama3:8b-instruct-q6_K'
+# Newest messages loaded per turn; chat_context trims them to the token budget
+HISTORY_FETCH = int(os.getenv("CHAT_HISTORY_FETCH", "40"))
+
+def _load_chat(supabase, chat_id: Optional[str]) -> Optional[Dict[str, Any]]:
+    """
+    Load an existing conversation (None if new / missing) with only its most
+    recent messages, including turns not yet persisted.
+    """
+    if not chat_id or not supabase:
+        return None
+    chat_data = None
+    try:
+        res = supabase.from_("chat_logs").select("id, title").eq("id", chat_id).single().execute()
+        if res.data:
+            chat_data = res.data
+            chat_data["messages"] = _fetch_messages(supabase, chat_id, HISTORY_FETCH)
+    except:
+        pass # Chat might not exist yet or error, treat as new
+    return chat_persistence.overlay(chat_id, chat_data)
+
+def _build_messages(req: ChatRequest, current_chat_data: Optional[Dict[str, Any]]) -> List[Dict[str, str]]:
+    history = current_chat_data.get('messages', []) if current_chat_data else []
+    # Stable prefix (system + rolling summary), recent turns within budget, then context + message
+    messages, overflow = chat_context.build(req.chat_id, SYSTEM_PROMPT, history, req.message, req.context)
+    chat_context.schedule_fold(req.chat_id, CHAT_MODEL, overflow)
+    return messages
+
+def _persist_turn(supabase, user, token: HTTPAuthorizationCredentials, req: ChatRequest, current_chat_data: Optional[Dict[str, Any]], ai_text: str) -> str:
+    """
+    Queue the user/assistant pair for background persistence and return the chat id.
+    New chats get their id here; the smart title is generated later by the queue.
+    """
+    if not (supabase and user):
+        return "local-only"
+    
+    new_msgs = [
+        {'role': 'user', 'content': req.message},
+        {'role': 'assistant', 'content': ai_text}
+    ]
+    
+    if current_chat_data:
+        # Maybe update title if it's "New Conversation" and we have content now?
+        title = None
+        if current_chat_data.get('title') == 'New Conversation':
+             title = req.message[:30] + "..."
+        chat_persistence.enqueue_turn(req.chat_id, user.id, token.credentials, new_msgs, title=title)
+        return req.chat_id
+    
+    # Create New (fallback title until the smart one is generated)
+    chat_id = str(uuid.uuid4())
+    chat_persistence.enqueue_turn(
+        chat_id, user.id, token.credentials, new_msgs,
+        is_new=True, title=req.message[:30] + "..."
+    )
+    return chat_id
+
+def _log_chat_error(e: Exception):
+    with open("backend_error.log", "a") as f:
+        f.write(f"Chat Error: {str(e)}\n{traceback.format_exc()}\n")
+    print(f"Ollama Chat Error: {e}")
+
 @router.post("/")
 async def chat_with_llama(
     req: ChatRequest, 
@@ -151,104 +265,93 @@ async def chat_with_llama(
     if not req.message:
         raise HTTPException(status_code=400, detail="Message is required")
 
-    supabase = get_supabase()
     # Authenticate the client with the user's token so RLS policies work!
-    if supabase:
-        supabase.postgrest.auth(token.credentials)
+    supabase = get_supabase(token)
     
     # 1. Load History Context if chat_id exists
-    history_messages = []
-    current_chat_data = None
-    
-    if req.chat_id and supabase:
-        try:
-            res = supabase.from_("chat_logs").select("*").eq("id", req.chat_id).single().execute()
-            if res.data:
-                current_chat_data = res.data
-                # Convert DB JSON to Ollama format
-                raw_msgs = current_chat_data.get('messages', [])
-                for m in raw_msgs:
-                    history_messages.append({'role': m['role'], 'content': m['content']})
-        except:
-            pass # Chat might not exist yet or error, treat as new
+    current_chat_data = _load_chat(supabase, req.chat_id)
 
     # 2. Prepare Prompt
-    system_prompt = (
-        "Eres 'Llama 3.8', una IA avanzada integrada en el traje espacial 'Mars-Sight AR'. "
-        "Tu misión es asistir al astronauta con información científica, técnica y de supervivencia en Marte. "
-        "Respuestas concisas, útiles y en español. "
-        "Si te preguntan por datos del traje, inventa valores realistas dentro de parámetros seguros."
-    )
-    
-    messages = [{'role': 'system', 'content': system_prompt}]
-    
-    # Add history (limit last 10 messages for context window efficiency)
-    messages.extend(history_messages[-10:])
-    
-    # Add current context if any
-    if req.context:
-        messages.append({'role': 'system', 'content': f"Contexto actual del sistema: {req.context}"})
-        
-    messages.append({'role': 'user', 'content': req.message})
+    messages = _build_messages(req, current_chat_data)
 
     try:
         # 3. Inference
-        client = ollama.AsyncClient(host=OLLAMA_API_URL)
-        response = await client.chat(model='llama3:8b-instruct-q6_K', messages=messages)
+        response = await llm_gateway.chat(CHAT_MODEL, messages, priority="interactive")
         ai_text = response['message']['content']
         
-        # 4. Save to DB (Background-like)
-        if supabase and user:
-            new_msgs = [
-                {'role': 'user', 'content': req.message},
-                {'role': 'assistant', 'content': ai_text}
-            ]
-            
-            if current_chat_data:
-                # Update existing
-                updated_msgs = current_chat_data.get('messages', []) + new_msgs
-                update_data = {
-                    "messages": updated_msgs,
-                    "updated_at": "now()"
-                }
-                # Maybe update title if it's "New Conversation" and we have content now?
-                if current_chat_data.get('title') == 'New Conversation':
-                     update_data['title'] = req.message[:30] + "..."
-
-                supabase.from_("chat_logs").update(update_data).eq("id", req.chat_id).execute()
-                chat_id = req.chat_id
-                
-            else:
-                # Create New
-                # Create New Smart Title with Llama 3
-                title_prompt = f"Genera un título muy corto (máximo 4 palabras) para esta conversación que empieza con: '{req.message}'. Solo el título, sin comillas ni prefijos."
-                try:
-                    title_resp = ollama.chat(model='llama3:8b-instruct-q6_K', messages=[{'role': 'user', 'content': title_prompt}])
-                    title = title_resp['message']['content'].strip().strip('"')
-                except:
-                    title = req.message[:30] + "..."
-
-                res = supabase.from_("chat_logs").insert({
-                    "user_id": user.id,
-                    "title": title,
-                    "messages": new_msgs
-                }).execute()
-                
-                if res.data:
-                    chat_id = res.data[0]['id']
-                else:
-                    chat_id = "temp" # Should not happen
-
-        else:
-             chat_id = "local-only"
+        # 4. Save to DB (background queue, coalesced + retried)
+        chat_id = _persist_turn(supabase, user, token, req, current_chat_data, ai_text)
 
         return {"response": ai_text, "chat_id": chat_id}
         
+    except LLMOverloaded as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e), headers={"Retry-After": str(e.retry_after)})
     except Exception as e:
-        with open("backend_error.log", "a") as f:
-            f.write(f"Chat Error: {str(e)}\n{traceback.format_exc()}\n")
-        print(f"Ollama Chat Error: {e}")
+        _log_chat_error(e)
         return {
             "response": "Error de conexión con el módulo Llama 3.",
             "chat_id": req.chat_id
         }
+
+@router.post("/stream")
+async def chat_with_llama_stream(
+    req: ChatRequest, 
+    request: Request,
+    user=Depends(get_current_user), 
+    token: HTTPAuthorizationCredentials = Depends(security)
+):
+    """
+    Streaming chat: forwards tokens as they arrive from Ollama.
+    NDJSON by default; Server-Sent Events if the client sends Accept: text/event-stream.
+    Events: {"type": "token", "content"} ... then {"type": "done", "chat_id", "response"}
+    (or {"type": "error", ...}). The transcript is persisted when the stream ends.
+    """
+    if not req.message:
+        raise HTTPException(status_code=400, detail="Message is required")
+
+    supabase = get_supabase(token)
+    current_chat_data = _load_chat(supabase, req.chat_id)
+    messages = _build_messages(req, current_chat_data)
+    # Shed load before the 200 + stream headers go out
+    try:
+        admission = llm_gateway.admit("interactive")
+    except LLMOverloaded as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    
+    use_sse = "text/event-stream" in request.headers.get("accept", "")
+    
+    def encode(event: Dict[str, Any]) -> str:
+        payload = json.dumps(event, ensure_ascii=False)
+        return f"data: {payload}\n\n" if use_sse else payload + "\n"
+    
+    async def event_stream():
+        parts = []
+        try:
+            async for chunk in llm_gateway.stream_chat(CHAT_MODEL, messages, priority="interactive", admission=admission):
+                token_text = chunk['message']['content']
+                if token_text:
+                    parts.append(token_text)
+                    yield encode({"type": "token", "content": token_text})
+        except Exception as e:
+            _log_chat_error(e)
+            yield encode({
+                "type": "error",
+                "response": "Error de conexión con el módulo Llama 3.",
+                "chat_id": req.chat_id
+            })
+            return
+        
+        ai_text = "".join(parts)
+        try:
+            chat_id = _persist_turn(supabase, user, token, req, current_chat_data, ai_text)
+        except Exception as e:
+            print(f"Chat persist error: {e}")
+            chat_id = req.chat_id
+        yield encode({"type": "done", "chat_id": chat_id, "response": ai_text})
+    
+    media_type = "text/event-stream" if use_sse else "application/x-ndjson"
+    return StreamingResponse(
+        event_stream(),
+        media_type=media_type,
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -1,19 +1,19 @@
 from fastapi import APIRouter, Depends, HTTPException
-from supabase import create_client, Client
-import os
+from starlette.concurrency import run_in_threadpool
+from app.core.supabase_client import get_service_client
+from app.services import dashboard_service
 from dotenv import load_dotenv
 
 load_dotenv()
 
 router = APIRouter()
 
-def get_supabase() -> Client:
-    url = os.getenv("SUPABASE_URL")
+def get_supabase():
     # Use Service Role Key for Dashboard Stats to ensure visibility of all data
-    key = os.getenv("SUPABASE_SERVICE_ROLE_KEY") or os.getenv("SUPABASE_ANON_KEY")
-    if not url or not key:
+    supabase = get_service_client()
+    if not supabase:
         raise HTTPException(status_code=500, detail="Supabase credentials not configured")
-    return create_client(url, key)
+    return supabase
 
 @router.get("/stats")
 async def get_dashboard_stats():
@@ -27,20 +27,12 @@ async def get_dashboard_stats():
     try:
         # Tables: misiones, objetos_exploracion
         # POIs/Minerals not yet implemented in DB, return 0
-        
-        try:
-            missions_count = supabase.table("misiones").select("*", count="exact", head=True).execute().count
-            missions_data = supabase.table("misiones").select("*").order("inicio_at", desc=True).limit(5).execute().data
-        except:
-             missions_count = 0
-             missions_data = []
-
-        try:
-             objects_count = supabase.table("objetos_exploracion").select("*", count="exact", head=True).execute().count
-             objects_data = supabase.table("objetos_exploracion").select("*").order("created_at", desc=True).limit(5).execute().data
-        except:
-             objects_count = 0
-             objects_data = []
+        # One RPC for counts + slim recent rows, served from a short-TTL cache
+        summary = await run_in_threadpool(dashboard_service.get_summary, supabase)
+        missions_count = summary.get("missions_count") or 0
+        missions_data = summary.get("recent_missions") or []
+        objects_count = summary.get("objects_count") or 0
+        objects_data = summary.get("recent_objects") or []
 
         # Placeholders for future tables
         pois_count = 0
@@ -1,10 +1,11 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from pydantic import BaseModel
 from typing import Dict, Any, Optional
 from app.api.deps import get_current_user
-from supabase import create_client
-import os
+from app.core.supabase_client import get_service_client
+from app.services import dashboard_service
 from datetime import datetime
+import base64
 
 router = APIRouter()
 
@@ -17,9 +18,95 @@ class MissionEndRequest(BaseModel):
     mission_id: str
 
 def get_supabase():
-    url = os.getenv("SUPABASE_URL")
-    key = os.getenv("SUPABASE_SERVICE_ROLE_KEY") or os.getenv("SUPABASE_ANON_KEY")
-    return create_client(url, key) if url and key else None
+    return get_service_client()
+
+# Projectable object columns (fields=...). metadata is served without the legacy
+# inline base64 image; embedding is opt-in only.
+OBJECT_FIELDS = {
+    "id": "id",
+    "mission_id": "mission_id",
+    "user_id": "user_id",
+    "nombre": "nombre",
+    "tipo": "tipo",
+    "descripcion": "descripcion",
+    "subcategoria": "subcategoria",
+    "genero": "genero",
+    "categoria_id": "categoria_id",
+    "subcategoria_id": "subcategoria_id",
+    "created_at": "created_at",
+    "metadata": "metadata:metadata_slim",
+    "contexto_ambiental": "contexto_ambiental",
+    "posicion": "posicion",
+    "embedding": "embedding",
+}
+DEFAULT_OBJECT_FIELDS = "id,mission_id,nombre,tipo,descripcion,subcategoria,genero,categoria_id,subcategoria_id,created_at,metadata"
+# Before migration 07 (no metadata_slim): only the metadata keys the UI reads
+METADATA_FALLBACK_KEYS = ("source", "description", "confidence", "heading", "timestamp", "image_ref")
+
+def _object_projection(fields: Optional[str]) -> str:
+    names = [f.strip() for f in (fields or DEFAULT_OBJECT_FIELDS).split(",") if f.strip()]
+    unknown = [f for f in names if f not in OBJECT_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    # Keyset cursor needs id + created_at
+    for required in ("created_at", "id"):
+        if required not in names:
+            names.insert(0, required)
+    return ", ".join(OBJECT_FIELDS[f] for f in names)
+
+def _encode_cursor(created_at: str, object_id: str) -> str:
+    return base64.urlsafe_b64encode(f"{created_at}|{object_id}".encode()).decode()
+
+def _decode_cursor(cursor: str):
+    try:
+        created_at, object_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|", 1)
+        return created_at, object_id
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def _list_objects(supabase, response: Response, mission_id: Optional[str], limit: int, cursor: Optional[str], fields: Optional[str]):
+    """
+    One page of objects, newest first, keyset-paginated on (created_at, id).
+    Sets X-Next-Cursor when another page may follow.
+    """
+    projection = _object_projection(fields)
+    after = _decode_cursor(cursor) if cursor else None
+
+    def run(select):
+        query = supabase.table("objetos_exploracion").select(select)
+        query = query.eq("mission_id", mission_id) if mission_id else query.is_("mission_id", "null")
+        if after:
+            created_at, last_id = after
+            query = query.or_(f'created_at.lt."{created_at}",and(created_at.eq."{created_at}",id.lt.{last_id})')
+        return query.order("created_at", desc=True).order("id", desc=True).limit(limit).execute().data or []
+
+    try:
+        rows = run(projection)
+    except Exception as e:
+        if "metadata_slim" not in projection:
+            raise
+        print(f"metadata_slim fallback: {e}")
+        keys = ", ".join(f"_meta_{k}:metadata->{k}" for k in METADATA_FALLBACK_KEYS)
+        rows = run(projection.replace("metadata:metadata_slim", keys))
+        # legacy_image as in metadata_slim (metadata ? 'image_base64'). PostgREST
+        # can't project the operator, so filter on it: only ids come back.
+        legacy = set()
+        if rows:
+            res = supabase.table("objetos_exploracion").select("id")\
+                .in_("id", [row["id"] for row in rows])\
+                .not_.is_("metadata->image_base64", "null")\
+                .execute()
+            legacy = {r["id"] for r in res.data or []}
+        for row in rows:
+            meta = {k: row.pop(f"_meta_{k}", None) for k in METADATA_FALLBACK_KEYS}
+            row["metadata"] = {k: v for k, v in meta.items() if v is not None}
+            if row["id"] in legacy:
+                row["metadata"]["legacy_image"] = True
+
+    if len(rows) == limit:
+        last = rows[-1]
+        response.headers["X-Next-Cursor"] = _encode_cursor(last["created_at"], last["id"])
+    return rows
 
 @router.post("/start")
 async def start_mission(req: MissionStartRequest, user = Depends(get_current_user)):
@@ -37,6 +124,7 @@ async def start_mission(req: MissionStartRequest, user = Depends(get_current_use
             "estado": "activa"
         }
         res = supabase.table("misiones").insert(mission_data).execute()
+        dashboard_service.invalidate()
         if res.data:
             return {"success": True, "mission_id": res.data[0]['id'], "code": code}
         return {"success": False, "error": "Insert Failed"}
@@ -52,6 +140,7 @@ async def end_mission(req: MissionEndRequest):
             "estado": "completada",
             "fin_at": datetime.now().isoformat()
         }).eq("id", req.mission_id).execute()
+        dashboard_service.invalidate()
         return {"success": True}
     except Exception as e:
         return {"success": False, "error": str(e)}
@@ -67,30 +156,41 @@ async def list_missions(user = Depends(get_current_user)):
         return []
 
 @router.get("/orphaned/objects")
-async def list_orphaned_objects():
+async def list_orphaned_objects(
+    response: Response,
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None
+):
     supabase = get_supabase()
     if not supabase: return []
     try:
-        # Fetch objects where mission_id is null
-        # Explicitly selecting columns to ensure they are retrieved
-        res = supabase.table("objetos_exploracion").select("*, subcategoria, genero").is_("mission_id", "null").order("created_at", desc=True).execute()
-        
-        return res.data
+        # Objects where mission_id is null
+        return _list_objects(supabase, response, None, limit, cursor, fields)
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Orphan fetch error: {e}")
         return []
 
 @router.get("/{mission_id}/objects")
-async def list_mission_objects(mission_id: str):
+async def list_mission_objects(
+    mission_id: str,
+    response: Response,
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None
+):
     supabase = get_supabase()
     if not supabase: return []
     try:
-        # Explicit select to ensure new columns are returned
-        res = supabase.table("objetos_exploracion").select("*, subcategoria, genero").eq("mission_id", mission_id).order("created_at", desc=True).execute()
-        return res.data
+        return _list_objects(supabase, response, mission_id, limit, cursor, fields)
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Mission Object Fetch Error: {e}")
         return []
+
 @router.delete("/delete/{mission_id}")
 async def delete_mission(mission_id: str):
     supabase = get_supabase()
@@ -102,6 +202,7 @@ async def delete_mission(mission_id: str):
         
         # 2. Delete the mission
         res = supabase.table("misiones").delete().eq("id", mission_id).execute()
+        dashboard_service.invalidate()
         
         if res.data:
             return {"success": True}
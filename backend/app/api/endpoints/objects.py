@@ -1,69 +1,49 @@
-from fastapi import APIRouter
-from pydantic import BaseModel
-from typing import Dict, Any, Optional, List
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from pydantic import BaseModel, ValidationError
+from typing import Dict, Any, Optional, List, Tuple
 from app.services.ai_service import ai_service
-from supabase import create_client
+from app.services.compute_pool import compute_pool, ComputePoolBusy
+from app.services.blob_store import blob_store, BlobNotFound
+from app.services.enrichment_queue import enrichment_queue
+from app.services.dedup import duplicate_detector, RecentObjects, DEDUP_RADIUS_M, DEDUP_MIN_SIMILARITY
+from app.core.supabase_client import get_service_client
+from app.services import dashboard_service, spatial_index, image_pipeline
+from app.services.image_pipeline import Frame, ImageInput
+from app.api.uploads import read_image_request
 import os
+import asyncio
+import contextlib
 from datetime import datetime
 import base64
-from io import BytesIO
 
-# Try to import Pillow for server-side cropping
-try:
-    from PIL import Image
-    PILLOW_AVAILABLE = True
-except ImportError:
-    PILLOW_AVAILABLE = False
-    print("Warning: Pillow not installed. Server-side cropping disabled.")
-
-# Define or Import helper
 def get_supabase():
-    url = os.getenv("SUPABASE_URL")
-    key = os.getenv("SUPABASE_SERVICE_ROLE_KEY") or os.getenv("SUPABASE_ANON_KEY")
-    return create_client(url, key) if url and key else None
+    return get_service_client()
 
-def crop_image_base64(image_base64: str, bbox: List[float]) -> str:
-    """Crop an image using bbox coordinates [x, y, width, height]"""
-    if not PILLOW_AVAILABLE or not image_base64 or not bbox or len(bbox) < 4:
-        return image_base64  # Return original if can't crop
-    
-    try:
-        # Remove data URI prefix if present
-        if ',' in image_base64:
-            image_base64 = image_base64.split(',')[1]
-        
-        # Decode base64 to image
-        img_data = base64.b64decode(image_base64)
-        img = Image.open(BytesIO(img_data))
-        
-        x, y, w, h = bbox
-        
-        # Add 10% padding
-        pad = 0.1
-        x1 = max(0, int(x - w * pad))
-        y1 = max(0, int(y - h * pad))
-        x2 = min(img.width, int(x + w + w * pad))
-        y2 = min(img.height, int(y + h + h * pad))
-        
-        # Crop
-        cropped = img.crop((x1, y1, x2, y2))
-        
-        # Resize if too large (max 640x480)
-        if cropped.width > 640 or cropped.height > 480:
-            cropped.thumbnail((640, 480), Image.Resampling.LANCZOS)
-        
-        # Convert back to base64
-        buffer = BytesIO()
-        cropped.save(buffer, format='JPEG', quality=80)
-        cropped_b64 = base64.b64encode(buffer.getvalue()).decode('utf-8')
-        
-        return f"data:image/jpeg;base64,{cropped_b64}"
-    except Exception as e:
-        print(f"Crop error: {e}")
-        return image_base64  # Return original on error
+def store_frame(frame: Optional[Frame]) -> Optional[Dict[str, Any]]:
+    """Write a processed frame's display JPEG + thumbnail to the blob store. Returns the metadata reference."""
+    if not frame:
+        return None
+    ref = {
+        "key": blob_store.put(frame.jpeg, "image/jpeg"),
+        "content_type": "image/jpeg",
+        "size": len(frame.jpeg)
+    }
+    if frame.thumb:
+        ref["thumb_key"] = blob_store.put(frame.thumb, "image/jpeg")
+    return ref
+
+def store_object_image(image: ImageInput, bbox: Optional[List[float]] = None) -> Optional[Dict[str, Any]]:
+    """Crop/thumbnail a frame (no CLIP input) and store it. Used by the blob migration script."""
+    return store_frame(image_pipeline.process_frame(image, bbox, clip=False))
 
 router = APIRouter()
 
+BULK_MAX_ITEMS = int(os.getenv("OBJECTS_BULK_MAX_ITEMS", "100"))
+# CPU stages one build_object_row can have queued at once: decode/crop, embed, store
+POOL_JOBS_PER_ITEM = 3
+
 class ObjectCreateRequest(BaseModel):
     source: str 
     object_class: str
@@ -72,7 +52,8 @@ class ObjectCreateRequest(BaseModel):
     timestamp: str
     location: Dict[str, Any]
     heading: float
-    image_base64: str
+    # JSON body only; multipart/octet-stream uploads send the raw image instead
+    image_base64: str = ""
     metadata: Dict[str, Any]
     mission_id: Optional[str] = None
     bbox: Optional[List[float]] = None  # [x, y, width, height] for server-side crop
@@ -88,120 +69,403 @@ class ObjectUpdateRequest(BaseModel):
 # --- ENDPOINTS ---
 
 @router.get("/nearby")
-async def get_nearby_objects(lat: float, lng: float, radius: int = 500):
+async def get_nearby_objects(lat: float, lng: float, radius: int = 500, limit: int = 100):
     """
-    Get all objects within a radius (meters) from a GPS location.
+    Get objects within a radius (meters) from a GPS location, nearest first.
     Returns objects from ALL missions (including orphaned objects).
+    Served from cached geohash tiles; large radii go straight to PostGIS.
     """
     try:
         supabase = get_supabase()
         if not supabase:
             return []
         
-        # Use PostGIS RPC function if available, otherwise fallback to raw query
-        # Try using RPC first (search_nearby_objects_v2)
+        limit = max(1, min(limit, 500))
         try:
-            res = supabase.rpc(
-                'search_nearby_objects_v2',
-                {
-                    'user_lat': lat,
-                    'user_lng': lng,
-                    'max_distance': radius
-                }
-            ).execute()
-            
-            if res.data:
-                return res.data
-        except Exception as rpc_err:
-            print(f"RPC fallback: {rpc_err}")
-        
-        # Fallback: Simple query without distance filtering
-        # Use PostGIS functions to extract lat/lng from geometry
-        res = supabase.rpc('get_all_objects_with_coords', {}).execute()
-        
-        if res.data:
-            return res.data
-        
-        # If RPC doesn't exist, try raw select (lat/lng will need client parsing)
-        res = supabase.table("objetos_exploracion").select(
-            "id, nombre, tipo, descripcion, posicion, metadata, mission_id, created_at, subcategoria, genero"
-        ).order("created_at", desc=True).limit(100).execute()
-        
-        # Post-process to add lat/lng (client-side WKB parsing is hard, so we approximate)
-        if res.data:
-            for obj in res.data:
-                # If posicion exists but is WKB hex, extract from metadata as fallback
-                if obj.get('metadata') and obj['metadata'].get('heading') is not None:
-                    # Metadata usually has coordinates from save time
-                    pass  # Already have metadata
-            return res.data
+            return await run_in_threadpool(spatial_index.nearby, supabase, lat, lng, radius, limit)
+        except Exception as tile_err:
+            print(f"Nearby tiles fallback: {tile_err}")
         
+        # Migration 05 not applied yet: previous RPC. Its signature differs between
+        # deployment/init_additional.sql and migrations/archive/create_rpc_nearby.sql
+        for params in (
+            {'user_lat': lat, 'user_lng': lng, 'max_distance': radius},
+            {'p_lat': lat, 'p_lng': lng, 'radius_meters': radius},
+        ):
+            try:
+                res = supabase.rpc('search_nearby_objects_v2', params).execute()
+                return (res.data or [])[:limit]
+            except Exception as rpc_err:
+                print(f"RPC fallback: {rpc_err}")
         return []
         
     except Exception as e:
         print(f"Nearby objects error: {e}")
         return []
 
+async def build_object_row(req: ObjectCreateRequest, image: Optional[bytes] = None) -> Dict[str, Any]:
+    """
+    Build the objetos_exploracion row for a detection.
+    `image` is the raw upload; otherwise req.image_base64 is used.
+    The frame is decoded once on the compute pool; embedding and blob writes then
+    run concurrently. ComputePoolBusy propagates.
+    """
+    # Build GeoJSON Point for PostGIS
+    lat = req.location.get('lat', 0)
+    lng = req.location.get('lng', 0)
+    
+    # Decode once: crop, thumbnail and CLIP input (of the crop) from the same buffer
+    source = image if image is not None else req.image_base64
+    frame = None
+    if source and len(source) > 100:
+        try:
+            frame = await compute_pool.run(image_pipeline.process_frame, source, req.bbox)
+        except ComputePoolBusy:
+            raise
+        except Exception as e:
+            print(f"Image decode failed: {e}")
+    
+    async def embed():
+        # AI embedding of the selected crop (optional, if image provided)
+        if not frame:
+            return None
+        try:
+            return await ai_service.embed_frame(frame)
+        except ComputePoolBusy:
+            raise
+        except Exception as e:
+            print(f"Embedding gen failed: {e}")
+            return None
+    
+    async def store_image():
+        # Image for display in Archives goes to the blob store; the row only keeps the reference
+        if not frame:
+            return None
+        try:
+            return await run_in_threadpool(store_frame, frame)
+        except Exception as e:
+            print(f"Image store failed: {e}")
+            return None
+    
+    embedding, image_ref = await asyncio.gather(embed(), store_image())
+    
+    # Prepare data for insert (never persist inline base64 blobs)
+    metadata = {k: v for k, v in req.metadata.items() if k != "image_base64"}
+    insert_data = {
+        "nombre": req.name,
+        "tipo": req.object_class,
+        "descripcion": req.metadata.get('description', ''),
+        "posicion": f"POINT({lng} {lat})",  # PostGIS format
+        "metadata": {
+            **metadata,
+            "source": req.source,
+            "confidence": req.confidence,
+            "heading": req.heading,
+            "timestamp": req.timestamp,
+            "image_ref": image_ref
+        }
+    }
+    
+    # Add mission_id if provided
+    if req.mission_id:
+        insert_data["mission_id"] = req.mission_id
+        
+    # Add embedding if generated
+    if embedding:
+        insert_data["embedding"] = embedding
+    
+    return insert_data
+
+async def enqueue_enrichment(row: Dict[str, Any], req: ObjectCreateRequest) -> List[str]:
+    """
+    Queue background enrichment for an inserted row: description + category when the
+    client sent no description, embedding when none could be computed inline.
+    Never fails the save.
+    """
+    try:
+        needs_text = not (req.metadata.get('description') or '').strip()
+        return await run_in_threadpool(enrichment_queue.enqueue_object, row, needs_text)
+    except Exception as e:
+        print(f"Enrichment enqueue failed: {e}")
+        return []
+
 @router.post("/create")
-async def create_object(req: ObjectCreateRequest):
-    """Create a new AR object (from Sentinel, Teach, or Marker modes)"""
+async def create_object(request: Request):
+    """
+    Create a new AR object (from Sentinel, Teach, or Marker modes).
+    Body: JSON (image_base64), multipart (image part + meta JSON) or raw image
+    bytes with the other fields in the X-Meta header.
+    A near-duplicate of a recent object in the same mission (close by, similar
+    embedding) is merged into it instead of inserted: see duplicate_of. Only for
+    automatic sources (DEDUP_SOURCES, default sentinel).
+    """
+    req, image = await read_image_request(request, ObjectCreateRequest)
     try:
         supabase = get_supabase()
         if not supabase: 
             return {"success": False, "error": "DB Connection Error"}
         
-        # Build GeoJSON Point for PostGIS
-        lat = req.location.get('lat', 0)
-        lng = req.location.get('lng', 0)
+        insert_data = await build_object_row(req, image)
+        lat, lng = req.location.get('lat', 0), req.location.get('lng', 0)
+        embedding = insert_data.get("embedding")
         
-        # AI embedding generation (optional, if image provided)
-        embedding = None
-        if req.image_base64 and len(req.image_base64) > 100:
-            try:
-                embedding = ai_service.generate_embedding(req.image_base64)
-            except Exception as e:
-                print(f"Embedding gen failed: {e}")
-        
-        # Prepare data for insert
-        insert_data = {
-            "nombre": req.name,
-            "tipo": req.object_class,
-            "descripcion": req.metadata.get('description', ''),
-            "posicion": f"POINT({lng} {lat})",  # PostGIS format
-            "metadata": {
-                **req.metadata,
-                "source": req.source,
-                "confidence": req.confidence,
-                "heading": req.heading,
-                "timestamp": req.timestamp,
-                # Store image for display in Archives - crop if bbox provided
-                "image_base64": (
-                    crop_image_base64(req.image_base64, req.bbox)[:500000] 
-                    if req.bbox and req.image_base64 and len(req.image_base64) > 100 
-                    else (req.image_base64[:500000] if req.image_base64 and len(req.image_base64) > 100 else None)
-                )
-            }
-        }
-        
-        # Add mission_id if provided
-        if req.mission_id:
-            insert_data["mission_id"] = req.mission_id
+        async with duplicate_detector.lock(req.mission_id):
+            match = None
+            if duplicate_detector.applies_to(req.source):
+                match = await run_in_threadpool(duplicate_detector.find, supabase, req.mission_id, lat, lng, embedding)
+            if match:
+                data = await run_in_threadpool(duplicate_detector.resolve, supabase, match, req.confidence, req.timestamp)
+                return {"success": True, "data": data, "duplicate_of": match["id"], "duplicate": match}
             
-        # Add embedding if generated
-        if embedding:
-            insert_data["embedding"] = embedding
-            
-        res = supabase.table("objetos_exploracion").insert(insert_data).execute()
+            res = supabase.table("objetos_exploracion").insert(insert_data).execute()
+            if res.data:
+                duplicate_detector.remember(req.mission_id, res.data[0].get("id"), lat, lng, embedding)
+        dashboard_service.invalidate()
+        spatial_index.invalidate_point(req.location.get('lat', 0), req.location.get('lng', 0))
         
         if res.data and len(res.data) > 0:
-            return {"success": True, "data": res.data[0]}
+            enrichment = await enqueue_enrichment(res.data[0], req)
+            return {"success": True, "data": res.data[0], "enrichment": enrichment}
         else:
             return {"success": False, "error": "Insert failed"}
             
+    except ComputePoolBusy as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
     except Exception as e:
         print(f"Create object error: {e}")
         return {"success": False, "error": str(e)}
 
+async def _read_bulk_items(request: Request) -> List[Any]:
+    """
+    Parse a bulk body into a list of ObjectCreateRequest (or error strings).
+    Accepts a JSON array, {"items": [...]}, or NDJSON (application/x-ndjson) streamed line by line.
+    """
+    items = []
+    
+    def parse(raw):
+        try:
+            if isinstance(raw, (str, bytes)):
+                return ObjectCreateRequest.model_validate_json(raw)
+            return ObjectCreateRequest.model_validate(raw)
+        except ValidationError as e:
+            return f"Invalid item: {e.errors()[0].get('msg', 'validation error')}"
+    
+    if "ndjson" in request.headers.get("content-type", ""):
+        buffer = b""
+        async for chunk in request.stream():
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                if line.strip():
+                    items.append(parse(line))
+            if len(items) > BULK_MAX_ITEMS:
+                break
+        if buffer.strip():
+            items.append(parse(buffer))
+    else:
+        try:
+            body = await request.json()
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid JSON body")
+        if isinstance(body, dict):
+            body = body.get("items", [])
+        if not isinstance(body, list):
+            raise HTTPException(status_code=400, detail="Expected a JSON array of objects")
+        items = [parse(raw) for raw in body]
+    
+    if len(items) > BULK_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"Bulk limit is {BULK_MAX_ITEMS} items")
+    return items
+
+@router.post("/bulk")
+async def bulk_create_objects(request: Request):
+    """
+    Bulk ingest for Sentinel bursts / offline queue flush.
+    Embeddings share micro-batches, crops run in parallel and rows are written
+    with a single multi-row insert. Reports success per item (by index).
+    """
+    supabase = get_supabase()
+    if not supabase:
+        return {"success": False, "error": "DB Connection Error", "results": []}
+    
+    items = await _read_bulk_items(request)
+    results = [{"index": i, "success": False} for i in range(len(items))]
+    
+    # Bound in-flight CPU work per request so one bulk call can't trip backpressure alone:
+    # at most half of max_pending, counted in pool jobs rather than items
+    limit = asyncio.Semaphore(max(1, compute_pool.max_pending // (2 * POOL_JOBS_PER_ITEM)))
+    
+    async def prepare(i, item):
+        if isinstance(item, str):
+            results[i]["error"] = item
+            return None
+        async with limit:
+            try:
+                return await build_object_row(item)
+            except ComputePoolBusy:
+                results[i]["error"] = "busy"
+            except Exception as e:
+                results[i]["error"] = str(e)
+        return None
+    
+    rows = await asyncio.gather(*(prepare(i, item) for i, item in enumerate(items)))
+    
+    # Same per-mission locks as create_object, so a single create racing this batch
+    # can't insert the same object twice (sorted: no lock-order deadlock between batches)
+    missions = {items[i].mission_id for i, row in enumerate(rows)
+                if row is not None and duplicate_detector.applies_to(items[i].source)}
+    async with contextlib.AsyncExitStack() as locks:
+        for mission_id in sorted(missions, key=lambda m: (m is not None, m or "")):
+            await locks.enter_async_context(duplicate_detector.lock(mission_id))
+
+        # Near-duplicates of an earlier item in this batch, or of an existing object, are not inserted
+        pending = []
+        batch = RecentObjects(float("inf"), len(items) or 1)
+        for i, row in enumerate(rows):
+            if row is None:
+                continue
+            item, embedding = items[i], row.get("embedding")
+            lat, lng = item.location.get('lat', 0), item.location.get('lng', 0)
+            if duplicate_detector.applies_to(item.source) and embedding:
+                earlier = batch.find(item.mission_id, lat, lng, embedding, DEDUP_RADIUS_M, DEDUP_MIN_SIMILARITY)
+                if earlier:
+                    results[i].update({"success": True, "duplicate_of_index": earlier["id"]})
+                    continue
+                try:
+                    match = await run_in_threadpool(duplicate_detector.find, supabase, item.mission_id, lat, lng, embedding)
+                    if match:
+                        await run_in_threadpool(duplicate_detector.resolve, supabase, match, item.confidence, item.timestamp)
+                        results[i].update({"success": True, "id": match["id"], "duplicate_of": match["id"]})
+                        continue
+                except Exception as e:
+                    print(f"Bulk dedup check failed: {e}")
+                batch.remember(item.mission_id, i, lat, lng, embedding)
+            pending.append((i, row))
+    
+        if pending:
+            try:
+                res = supabase.table("objetos_exploracion").insert([row for _, row in pending]).execute()
+                dashboard_service.invalidate()
+                for i, _ in pending:
+                    spatial_index.invalidate_point(items[i].location.get('lat', 0), items[i].location.get('lng', 0))
+                inserted = res.data or []
+                for (i, row), data in zip(pending, inserted):
+                    results[i]["success"] = True
+                    results[i]["id"] = data.get("id")
+                    duplicate_detector.remember(
+                        items[i].mission_id, data.get("id"),
+                        items[i].location.get('lat', 0), items[i].location.get('lng', 0), row.get("embedding")
+                    )
+                    results[i]["enrichment"] = await enqueue_enrichment(data, items[i])
+                for i, _ in pending[len(inserted):]:
+                    results[i]["error"] = "Insert failed"
+            except Exception as e:
+                print(f"Bulk insert error: {e}")
+                for i, _ in pending:
+                    results[i]["error"] = str(e)
+    
+    ok_count = sum(1 for r in results if r["success"])
+    duplicate_count = sum(1 for r in results if r["success"] and ("duplicate_of" in r or "duplicate_of_index" in r))
+    return {
+        "success": ok_count == len(items),
+        "inserted": ok_count - duplicate_count,
+        "duplicates": duplicate_count,
+        "failed": len(items) - ok_count,
+        "results": results
+    }
+
+@router.get("/enrichment/status")
+async def enrichment_status(object_id: Optional[str] = None):
+    """Background enrichment queue: totals per job kind/status, or the jobs of one object."""
+    return await run_in_threadpool(enrichment_queue.status, object_id)
+
+def _parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """Parse a single 'bytes=start-end' range. Returns (start, end) inclusive or None if unsatisfiable."""
+    try:
+        unit, spec = header.split("=", 1)
+        if unit.strip() != "bytes" or "," in spec:
+            return None
+        first, last = spec.strip().split("-", 1)
+        if first == "":
+            length = int(last)
+            if length <= 0:
+                return None
+            return max(0, size - length), size - 1
+        start = int(first)
+        end = int(last) if last else size - 1
+        if start >= size or end < start:
+            return None
+        return start, min(end, size - 1)
+    except ValueError:
+        return None
+
+@router.get("/{object_id}/image")
+async def get_object_image(object_id: str, request: Request, variant: str = "full"):
+    """
+    Stream an object's image from the blob store.
+    variant=full|thumb. Supports ETag/If-None-Match and single Range requests.
+    """
+    supabase = get_supabase()
+    if not supabase:
+        raise HTTPException(status_code=500, detail="DB Connection Error")
+    
+    try:
+        res = supabase.table("objetos_exploracion").select(
+            "image_ref:metadata->image_ref, image_base64:metadata->>image_base64"
+        ).eq("id", object_id).limit(1).execute()
+    except Exception as e:
+        print(f"Object image lookup error: {e}")
+        raise HTTPException(status_code=404, detail="Object not found")
+    
+    if not res.data:
+        raise HTTPException(status_code=404, detail="Object not found")
+    row = res.data[0]
+    ref = row.get("image_ref")
+    
+    # Legacy rows still carry the image inline in metadata
+    if not ref:
+        legacy = row.get("image_base64")
+        if not legacy:
+            raise HTTPException(status_code=404, detail="Object has no image")
+        if ',' in legacy:
+            legacy = legacy.split(',')[1]
+        content = base64.b64decode(legacy)
+        etag = f'"{blob_store.key_for(content)}"'
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers={"ETag": etag})
+        return Response(content=content, media_type="image/jpeg", headers={"ETag": etag})
+    
+    key = ref.get("thumb_key") if variant == "thumb" and ref.get("thumb_key") else ref["key"]
+    etag = f'"{key}"'
+    headers = {
+        "ETag": etag,
+        "Accept-Ranges": "bytes",
+        "Cache-Control": "public, max-age=86400"
+    }
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    
+    try:
+        size = await run_in_threadpool(blob_store.size, key)
+    except BlobNotFound:
+        raise HTTPException(status_code=404, detail="Image blob missing")
+    
+    media_type = ref.get("content_type", "image/jpeg")
+    range_header = request.headers.get("range")
+    if range_header:
+        byte_range = _parse_range(range_header, size)
+        if not byte_range:
+            return Response(status_code=416, headers={"Content-Range": f"bytes */{size}"})
+        start, end = byte_range
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+        headers["Content-Length"] = str(end - start + 1)
+        body = await run_in_threadpool(blob_store.iter_range, key, start, end)
+        return StreamingResponse(body, status_code=206, media_type=media_type, headers=headers)
+    
+    headers["Content-Length"] = str(size)
+    body = await run_in_threadpool(blob_store.iter_range, key)
+    return StreamingResponse(body, media_type=media_type, headers=headers)
+
 @router.put("/{object_id}")
 async def update_object(object_id: str, req: ObjectUpdateRequest):
     try:
@@ -217,6 +481,8 @@ async def update_object(object_id: str, req: ObjectUpdateRequest):
             update_data["tipo"] = req.tipo
             
         res = supabase.table("objetos_exploracion").update(update_data).eq("id", object_id).execute()
+        dashboard_service.invalidate()
+        spatial_index.invalidate_all()
         
         if not res.data:
             return {"success": False, "error": "Object not found or not modified"}
@@ -231,6 +497,9 @@ async def delete_object(object_id: str):
         supabase = get_supabase()
         if not supabase: return {"success": False}
         supabase.table("objetos_exploracion").delete().eq("id", object_id).execute()
+        duplicate_detector.forget(object_id)
+        dashboard_service.invalidate()
+        spatial_index.invalidate_all()
         return {"success": True}
     except Exception as e:
         return {"success": False, "error": str(e)}
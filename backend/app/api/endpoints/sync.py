@@ -0,0 +1,61 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from starlette.concurrency import run_in_threadpool
+from typing import Optional
+from app.api.deps import get_current_user
+from app.core.supabase_client import get_service_client
+import base64
+
+router = APIRouter()
+
+def get_supabase():
+    return get_service_client()
+
+def _encode_cursor(xid: int, version: int) -> str:
+    return base64.urlsafe_b64encode(f"{xid}.{version}".encode()).decode()
+
+def _decode_cursor(cursor: Optional[str]):
+    if not cursor:
+        return 0, 0
+    try:
+        xid, version = base64.urlsafe_b64decode(cursor.encode()).decode().split(".", 1)
+        return int(xid), int(version)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+@router.get("/sync")
+async def sync_delta(
+    since: Optional[str] = None,
+    limit: int = Query(500, ge=1, le=2000),
+    user=Depends(get_current_user)
+):
+    """
+    Delta sync for objects and missions.
+    Returns rows inserted/updated (op=upsert, slim, no embedding/blobs) and deleted
+    (op=delete, tombstone) since `since`, in change order. Pass back `cursor` until
+    `has_more` is false. `reset` means the cursor is older than tombstone retention:
+    drop the local replica and sync again without `since`.
+    """
+    supabase = get_supabase()
+    if not supabase:
+        raise HTTPException(status_code=500, detail="DB Connection Error")
+
+    since_xid, since_version = _decode_cursor(since)
+    try:
+        res = await run_in_threadpool(
+            lambda: supabase.rpc("get_sync_delta", {
+                "p_since_xid": since_xid,
+                "p_since_version": since_version,
+                "p_limit": limit
+            }).execute()
+        )
+    except Exception as e:
+        print(f"Sync Error: {e}")
+        raise HTTPException(status_code=500, detail="Sync unavailable")
+
+    delta = res.data or {}
+    return {
+        "changes": delta.get("changes", []),
+        "cursor": _encode_cursor(delta.get("next_xid", since_xid), delta.get("next_version", since_version)),
+        "has_more": delta.get("has_more", False),
+        "reset": delta.get("reset", False)
+    }
@@ -6,8 +6,7 @@ Mars-Sight AR
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from typing import Optional, List
-from supabase import create_client
-import os
+from app.core.supabase_client import get_service_client
 
 router = APIRouter()
 
@@ -16,9 +15,7 @@ router = APIRouter()
 # ============================================
 
 def get_supabase():
-    url = os.getenv("SUPABASE_URL")
-    key = os.getenv("SUPABASE_SERVICE_ROLE_KEY") or os.getenv("SUPABASE_ANON_KEY")
-    return create_client(url, key) if url and key else None
+    return get_service_client()
 
 # ============================================
 # Models
@@ -50,6 +47,10 @@ class AsignarTaxonomia(BaseModel):
     subcategoria_id: Optional[str] = None
     etiqueta_ids: Optional[List[str]] = None
 
+class AsignarTaxonomiaBulk(AsignarTaxonomia):
+    objeto_ids: List[str]
+    reemplazar_etiquetas: bool = True  # False = solo añadir etiquetas
+
 # ============================================
 # Categorías
 # ============================================
@@ -246,6 +247,33 @@ async def delete_etiqueta(etiqueta_id: str):
 # Asignación de Taxonomía a Objetos
 # ============================================
 
+def _asignar(supabase, objeto_ids: List[str], data: AsignarTaxonomia, reemplazar: bool = True) -> dict:
+    """Una sola llamada RPC transaccional: categoría, subcategoría y deltas de uso_count."""
+    res = supabase.rpc("asignar_taxonomia_objetos", {
+        "p_objeto_ids": objeto_ids,
+        "p_categoria_id": data.categoria_id or None,
+        "p_subcategoria_id": data.subcategoria_id or None,
+        "p_etiqueta_ids": data.etiqueta_ids,
+        "p_reemplazar": reemplazar
+    }).execute()
+    return res.data or {}
+
+@router.post("/objetos/asignar-bulk")
+async def asignar_taxonomia_bulk(data: AsignarTaxonomiaBulk):
+    """Asignar la misma taxonomía a varios objetos (multi-selección en Archives)"""
+    try:
+        supabase = get_supabase()
+        if not supabase:
+            return {"success": False, "error": "DB Error"}
+        
+        if not data.objeto_ids:
+            return {"success": True, "objetos": 0}
+        
+        result = _asignar(supabase, data.objeto_ids, data, data.reemplazar_etiquetas)
+        return {"success": True, **result}
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
 @router.post("/objetos/{objeto_id}/asignar")
 async def asignar_taxonomia(objeto_id: str, data: AsignarTaxonomia):
     """Asignar categoría, subcategoría y etiquetas a un objeto"""
@@ -254,31 +282,7 @@ async def asignar_taxonomia(objeto_id: str, data: AsignarTaxonomia):
         if not supabase:
             return {"success": False, "error": "DB Error"}
         
-        # Update categoria and subcategoria
-        update_data = {}
-        if data.categoria_id:
-            update_data["categoria_id"] = data.categoria_id
-        if data.subcategoria_id:
-            update_data["subcategoria_id"] = data.subcategoria_id
-        
-        if update_data:
-            supabase.table("objetos_exploracion").update(update_data).eq("id", objeto_id).execute()
-        
-        # Handle etiquetas (many-to-many)
-        if data.etiqueta_ids is not None:
-            # Remove existing
-            supabase.table("objeto_etiquetas").delete().eq("objeto_id", objeto_id).execute()
-            
-            # Add new
-            for etiqueta_id in data.etiqueta_ids:
-                supabase.table("objeto_etiquetas").insert({
-                    "objeto_id": objeto_id,
-                    "etiqueta_id": etiqueta_id
-                }).execute()
-                
-                # Increment usage count
-                supabase.rpc("increment_etiqueta_uso", {"tag_id": etiqueta_id}).execute()
-        
+        _asignar(supabase, [objeto_id], data)
         return {"success": True}
     except Exception as e:
         return {"success": False, "error": str(e)}
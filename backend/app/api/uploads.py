@@ -0,0 +1,88 @@
+"""
+Cuerpos de subida de imágenes para /objects/create, /generate-embedding y /search-similar.
+
+- application/json: el modelo con image_base64 (formato legado)
+- multipart/form-data: parte "image" (archivo) + campos de formulario y/o parte "meta" (JSON)
+- application/octet-stream | image/*: el cuerpo es la imagen; campos en la cabecera
+  X-Meta (JSON) y/o en la query string
+"""
+
+import json
+import os
+from typing import Optional, Tuple, Type, TypeVar
+
+from fastapi import HTTPException, Request
+from pydantic import BaseModel, ValidationError
+
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(15 * 1024 * 1024)))
+
+M = TypeVar("M", bound=BaseModel)
+
+
+def _validate(model_cls: Type[M], fields: dict) -> M:
+    try:
+        return model_cls.model_validate(fields)
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors(include_url=False, include_context=False))
+
+
+def _parse_meta(raw: Optional[str]) -> dict:
+    if not raw:
+        return {}
+    try:
+        meta = json.loads(raw)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="meta must be a JSON object")
+    if not isinstance(meta, dict):
+        raise HTTPException(status_code=400, detail="meta must be a JSON object")
+    return meta
+
+
+async def _read_body(request: Request) -> bytes:
+    """Stream the body into one buffer, refusing oversized uploads early."""
+    length = request.headers.get("content-length")
+    if length and length.isdigit() and int(length) > MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail=f"Upload limit is {MAX_UPLOAD_BYTES} bytes")
+    buffer = bytearray()
+    async for chunk in request.stream():
+        buffer += chunk
+        if len(buffer) > MAX_UPLOAD_BYTES:
+            raise HTTPException(status_code=413, detail=f"Upload limit is {MAX_UPLOAD_BYTES} bytes")
+    return bytes(buffer)
+
+
+async def read_image_request(request: Request, model_cls: Type[M]) -> Tuple[M, Optional[bytes]]:
+    """
+    Parse any supported upload into (model, image_bytes).
+    image_bytes is None for JSON bodies: the image is still base64 in model.image_base64.
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+
+    if content_type == "multipart/form-data":
+        form = await request.form()
+        image = None
+        fields = {}
+        for name, value in form.multi_items():
+            if name == "image" and not isinstance(value, str):
+                if value.size is not None and value.size > MAX_UPLOAD_BYTES:
+                    raise HTTPException(status_code=413, detail=f"Upload limit is {MAX_UPLOAD_BYTES} bytes")
+                image = await value.read()
+            elif name == "meta":
+                fields.update(_parse_meta(value))
+            elif isinstance(value, str):
+                fields[name] = value
+        await form.close()
+        if image is None:
+            raise HTTPException(status_code=400, detail="Missing 'image' file part")
+        return _validate(model_cls, fields), image
+
+    if content_type == "application/octet-stream" or content_type.startswith("image/"):
+        fields = _parse_meta(request.headers.get("x-meta"))
+        fields.update(request.query_params)
+        model = _validate(model_cls, fields)
+        return model, await _read_body(request)
+
+    try:
+        return model_cls.model_validate_json(await request.body()), None
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors(include_url=False, include_context=False))
@@ -0,0 +1,165 @@
+"""
+Caché en dos niveles: LRU en memoria + SQLite en disco (opcional).
+
+Base de la caché de embeddings y de la de resultados del LLM. El nivel de
+disco también está acotado: cada PRUNE_INTERVAL_S se borran las filas
+caducadas y, si quedan más de disk_max_entries, las más antiguas (stored_at).
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Optional
+
+PRUNE_INTERVAL_S = 60.0
+
+
+class TieredCache:
+    def __init__(
+        self,
+        table: str,
+        value_column: str,
+        encode: Callable[[Any], Any],
+        decode: Callable[[Any], Any],
+        max_entries: int = 1024,
+        ttl_seconds: float = 0,
+        disk_path: Optional[str] = None,
+        disk_max_entries: int = 0,
+        name: str = "cache",
+    ):
+        """ttl_seconds 0 = no expiry; disk_max_entries 0 = no row cap (TTL pruning still applies)."""
+        self.table = table
+        self.value_column = value_column
+        self._encode = encode
+        self._decode = decode
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.disk_max_entries = disk_max_entries
+        self.name = name
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (stored_at, value)
+        self._last_prune = 0.0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_pruned = 0
+        self.disk_rows = 0
+        self._db = None
+        if disk_path:
+            try:
+                os.makedirs(os.path.dirname(disk_path) or ".", exist_ok=True)
+                self._db = sqlite3.connect(disk_path, check_same_thread=False)
+                self._db.execute(
+                    f"CREATE TABLE IF NOT EXISTS {table} (key TEXT PRIMARY KEY, stored_at REAL, {value_column} BLOB)"
+                )
+                self._db.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_stored_at ON {table}(stored_at)")
+                self._db.commit()
+                self._prune(time.time())
+            except Exception as e:
+                print(f"{name} disk tier disabled: {e}")
+                self._db = None
+
+    def _expired(self, stored_at: float) -> bool:
+        return self.ttl_seconds > 0 and time.time() - stored_at > self.ttl_seconds
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and not self._expired(entry[0]):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry:
+                del self._entries[key]
+
+            row = self._disk_get(key)
+            if row is not None:
+                self.disk_hits += 1
+                self._remember(key, row[1], row[0])
+                return row[1]
+
+            self.misses += 1
+            return None
+
+    def put(self, key: str, value: Any):
+        now = time.time()
+        with self._lock:
+            self._remember(key, value, now)
+            if self._db:
+                try:
+                    self._db.execute(
+                        f"INSERT OR REPLACE INTO {self.table} (key, stored_at, {self.value_column}) VALUES (?, ?, ?)",
+                        (key, now, self._encode(value)),
+                    )
+                    self._db.commit()
+                    if now - self._last_prune > PRUNE_INTERVAL_S:
+                        self._prune(now)
+                except Exception as e:
+                    print(f"{self.name} write error: {e}")
+
+    def _remember(self, key: str, value: Any, stored_at: float):
+        self._entries[key] = (stored_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _disk_get(self, key: str):
+        if not self._db:
+            return None
+        try:
+            row = self._db.execute(
+                f"SELECT stored_at, {self.value_column} FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+        except Exception as e:
+            print(f"{self.name} read error: {e}")
+            return None
+        if not row:
+            return None
+        if self._expired(row[0]):
+            self._db.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+            self._db.commit()
+            return None
+        return row[0], self._decode(row[1])
+
+    def _prune(self, now: float):
+        """Drop expired rows, then the oldest ones above disk_max_entries. Caller holds the lock."""
+        self._last_prune = now
+        pruned = 0
+        if self.ttl_seconds > 0:
+            pruned += self._db.execute(
+                f"DELETE FROM {self.table} WHERE stored_at < ?", (now - self.ttl_seconds,)
+            ).rowcount
+        rows = self._db.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+        if self.disk_max_entries and rows > self.disk_max_entries:
+            excess = rows - self.disk_max_entries
+            pruned += self._db.execute(
+                f"DELETE FROM {self.table} WHERE key IN "
+                f"(SELECT key FROM {self.table} ORDER BY stored_at LIMIT ?)",
+                (excess,),
+            ).rowcount
+            rows -= excess
+        self._db.commit()
+        self.disk_pruned += pruned
+        self.disk_rows = rows
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round((self.hits + self.disk_hits) / lookups, 3) if lookups else 0.0,
+                "disk_tier": self._db is not None,
+                "disk_rows": self.disk_rows,
+                "disk_max_entries": self.disk_max_entries,
+                "disk_pruned": self.disk_pruned,
+            }
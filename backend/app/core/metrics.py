@@ -0,0 +1,47 @@
+"""
+Métricas en proceso (sin dependencias externas).
+Contadores simples y ventanas de latencia que los servicios exponen en /metrics.
+"""
+
+import threading
+from collections import deque
+
+
+class LatencyStats:
+    """Acumula latencias (ms) y mantiene una ventana reciente para percentiles."""
+
+    def __init__(self, window: int = 512):
+        self._lock = threading.Lock()
+        self._recent = deque(maxlen=window)
+        self.count = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, ms: float, error: bool = False):
+        with self._lock:
+            self.count += 1
+            if error:
+                self.errors += 1
+            self.total_ms += ms
+            self.max_ms = max(self.max_ms, ms)
+            self._recent.append(ms)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            recent = sorted(self._recent)
+            count, errors, total, peak = self.count, self.errors, self.total_ms, self.max_ms
+
+        def pct(p):
+            if not recent:
+                return 0.0
+            return round(recent[min(len(recent) - 1, int(len(recent) * p))], 2)
+
+        return {
+            "count": count,
+            "errors": errors,
+            "avg_ms": round(total / count, 2) if count else 0.0,
+            "p50_ms": pct(0.50),
+            "p95_ms": pct(0.95),
+            "max_ms": round(peak, 2),
+        }
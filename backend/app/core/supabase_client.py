@@ -0,0 +1,142 @@
+"""
+Cliente PostgREST compartido por todo el proceso.
+
+Antes cada endpoint llamaba a create_client() por petición, abriendo una sesión
+HTTP nueva (handshake TLS incluido) cada vez. Aquí se mantiene un único
+transporte httpx con pool de conexiones keep-alive; el cliente service-role, el
+anónimo y las vistas por usuario (token JWT) son envoltorios ligeros sobre ese
+mismo transporte.
+"""
+
+import os
+import threading
+import time
+from functools import lru_cache
+from typing import Optional
+
+import httpx
+from postgrest import SyncPostgrestClient
+from postgrest.utils import SyncClient
+
+from app.core.metrics import LatencyStats
+
+POOL_MAX_CONNECTIONS = int(os.getenv("SUPABASE_POOL_MAX_CONNECTIONS", "20"))
+POOL_MAX_KEEPALIVE = int(os.getenv("SUPABASE_POOL_MAX_KEEPALIVE", "10"))
+POOL_KEEPALIVE_EXPIRY = float(os.getenv("SUPABASE_POOL_KEEPALIVE_EXPIRY", "30"))
+HTTP_TIMEOUT = float(os.getenv("SUPABASE_HTTP_TIMEOUT", "30"))
+
+latency = LatencyStats()
+
+
+class _MeteredTransport(httpx.BaseTransport):
+    """Transporte compartido: mide latencia y no se cierra al cerrar un cliente."""
+
+    def __init__(self):
+        self._inner = httpx.HTTPTransport(
+            limits=httpx.Limits(
+                max_connections=POOL_MAX_CONNECTIONS,
+                max_keepalive_connections=POOL_MAX_KEEPALIVE,
+                keepalive_expiry=POOL_KEEPALIVE_EXPIRY,
+            )
+        )
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        start = time.perf_counter()
+        try:
+            response = self._inner.handle_request(request)
+        except Exception:
+            latency.observe((time.perf_counter() - start) * 1000, error=True)
+            raise
+        latency.observe((time.perf_counter() - start) * 1000, error=response.status_code >= 500)
+        return response
+
+    def close(self):
+        # Los clientes individuales no deben cerrar el pool compartido
+        pass
+
+    def shutdown(self):
+        self._inner.close()
+
+    def open_connections(self) -> int:
+        pool = getattr(self._inner, "_pool", None)
+        return len(getattr(pool, "connections", []) or [])
+
+
+_transport_lock = threading.Lock()
+_transport: Optional[_MeteredTransport] = None
+
+
+def _get_transport() -> _MeteredTransport:
+    global _transport
+    with _transport_lock:
+        if _transport is None:
+            _transport = _MeteredTransport()
+        return _transport
+
+
+class PooledPostgrestClient(SyncPostgrestClient):
+    """SyncPostgrestClient cuya sesión usa el transporte compartido del proceso."""
+
+    def create_session(self, base_url, headers, timeout, *args, **kwargs):
+        return SyncClient(
+            base_url=base_url,
+            headers=headers,
+            timeout=timeout,
+            transport=_get_transport(),
+            follow_redirects=True,
+        )
+
+
+def _build(key: str, token: Optional[str] = None) -> Optional[PooledPostgrestClient]:
+    url = os.getenv("SUPABASE_URL")
+    if not url or not key:
+        return None
+    headers = {
+        "apikey": key,
+        "Authorization": f"Bearer {token or key}",
+    }
+    return PooledPostgrestClient(f"{url.rstrip('/')}/rest/v1", headers=headers, timeout=HTTP_TIMEOUT)
+
+
+def _anon_key() -> Optional[str]:
+    return os.getenv("SUPABASE_ANON_KEY") or os.getenv("SUPABASE_KEY")
+
+
+@lru_cache()
+def get_service_client() -> Optional[PooledPostgrestClient]:
+    """Cliente con service-role (o anon como respaldo); ignora RLS si hay service key."""
+    return _build(os.getenv("SUPABASE_SERVICE_ROLE_KEY") or os.getenv("SUPABASE_ANON_KEY"))
+
+
+@lru_cache()
+def get_anon_client() -> Optional[PooledPostgrestClient]:
+    """Cliente con la anon key, sujeto a RLS."""
+    return _build(_anon_key())
+
+
+def get_user_client(token: str) -> Optional[PooledPostgrestClient]:
+    """
+    Vista por petición autenticada con el JWT del usuario para que apliquen las
+    políticas RLS. Crearla es barato: comparte el pool de conexiones.
+    """
+    return _build(_anon_key(), token=token)
+
+
+def pool_stats() -> dict:
+    transport = _get_transport()
+    return {
+        "max_connections": POOL_MAX_CONNECTIONS,
+        "max_keepalive": POOL_MAX_KEEPALIVE,
+        "open_connections": transport.open_connections(),
+        "latency": latency.snapshot(),
+    }
+
+
+def close_pool():
+    global _transport
+    with _transport_lock:
+        if _transport is not None:
+            _transport.shutdown()
+            _transport = None
+    get_service_client.cache_clear()
+    get_anon_client.cache_clear()
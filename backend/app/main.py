@@ -1,13 +1,34 @@
+import time
+_IMPORT_START = time.perf_counter()
+
+from dotenv import load_dotenv
+
+# Load .env before app modules read their tunables at import time
+load_dotenv()
+
 from fastapi import FastAPI, Depends
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from app.api.deps import get_current_user
-from dotenv import load_dotenv
+from app.core import supabase_client
+from app.services.compute_pool import compute_pool
+from app.services.ai_service import ai_service
+from app.services.chat_persistence import chat_persistence
+from app.services.chat_context import chat_context
+from app.services.enrichment_queue import enrichment_queue
+from app.services.dedup import duplicate_detector
+from app.services.llm_gateway import llm_gateway
+from app.services import dashboard_service, spatial_index, image_pipeline
 import os
 
 # Import Routers
-from app.api.endpoints import dashboard, chat, telemetry, missions, objects, ai, taxonomia
+from app.api.endpoints import dashboard, chat, telemetry, missions, objects, ai, taxonomia, sync
 
-load_dotenv()
+# Tracked by scripts/import_time_report.py; heavy ML modules must stay out of this path
+IMPORT_MS = round((time.perf_counter() - _IMPORT_START) * 1000, 1)
+
+# 0 = load the vision model on first use instead of right after startup
+AI_EAGER_LOAD = os.getenv("AI_EAGER_LOAD", "1") != "0"
 
 app = FastAPI(
     title="Mars-Sight AR API",
@@ -32,6 +53,7 @@ app.include_router(missions.router, prefix="/api/missions", tags=["missions"])
 app.include_router(objects.router, prefix="/api/objects", tags=["objects"])
 app.include_router(ai.router, prefix="/api", tags=["ai"]) 
 app.include_router(taxonomia.router, prefix="/api/taxonomia", tags=["taxonomia"])
+app.include_router(sync.router, prefix="/api", tags=["sync"])
 
 @app.get("/")
 async def root():
@@ -49,6 +71,45 @@ async def health_check():
         "services": ["database", "ai_model"]
     }
 
+@app.get("/ready")
+async def readiness():
+    """Readiness (vs /health liveness): 503 until the vision model is loaded and warmed up."""
+    ai = ai_service.status()
+    body = {"status": "ready" if ai["state"] == "ready" else ai["state"], "import_ms": IMPORT_MS, "ai_model": ai}
+    return JSONResponse(body, status_code=200 if ai["state"] == "ready" else 503)
+
+@app.on_event("startup")
+async def start_services():
+    if AI_EAGER_LOAD:
+        ai_service.start_loading()
+    enrichment_queue.start()
+
+@app.get("/metrics")
+async def metrics():
+    return {
+        "supabase_pool": supabase_client.pool_stats(),
+        "compute_pool": compute_pool.stats(),
+        "ai_model": ai_service.status(),
+        "embedding_batcher": ai_service.batcher.stats(),
+        "embedding_cache": ai_service.embedding_cache.stats(),
+        "llm_cache": ai_service.llm_cache.stats(),
+        "llm_gateway": llm_gateway.stats(),
+        "chat_persistence": chat_persistence.stats(),
+        "chat_context": chat_context.stats(),
+        "enrichment_queue": enrichment_queue.stats(),
+        "dedup": duplicate_detector.stats(),
+        "dashboard_cache": dashboard_service.summary_cache.stats(),
+        "nearby_tile_cache": spatial_index.tile_cache.stats(),
+        "image_pipeline": image_pipeline.stats(),
+    }
+
+@app.on_event("shutdown")
+async def shutdown_services():
+    await chat_persistence.drain()
+    await enrichment_queue.stop()
+    supabase_client.close_pool()
+    compute_pool.shutdown()
+
 @app.get("/me")
 async def read_users_me(user = Depends(get_current_user)):
     return user
@@ -1,60 +1,266 @@
-import torch
 import traceback
-import base64
-import io
+import asyncio
 import json
-from PIL import Image
+import os
+import threading
+import time
+from app.services.compute_pool import compute_pool
+from app.services.embedding_batcher import EmbeddingBatcher
+from app.services.embedding_cache import EmbeddingCache
+from app.services.image_pipeline import Frame, ImageInput, content_hash, decode_for_clip, to_bytes
+from app.services.vision_backends import VISION_BACKEND, VISION_MODEL_NAME, RemoteClipEncoder, create_encoder
+from app.services.inference_server import INFERENCE_SOCKET
+from app.services.llm_cache import LLMResultCache, cache_key
+from app.services.llm_gateway import LLMOverloaded, llm_gateway
+
+# Micro-batching: wait up to EMBED_BATCH_WINDOW_MS for more images, max EMBED_MAX_BATCH per encode()
+EMBED_BATCH_WINDOW_MS = float(os.getenv("EMBED_BATCH_WINDOW_MS", "5"))
+EMBED_MAX_BATCH = int(os.getenv("EMBED_MAX_BATCH", "16"))
+
+# Embedding cache keyed by image content hash (TTL 0 = no expiry, empty path = memory only)
+EMBED_CACHE_SIZE = int(os.getenv("EMBED_CACHE_SIZE", "1024"))
+EMBED_CACHE_TTL = float(os.getenv("EMBED_CACHE_TTL", "0"))
+EMBED_CACHE_PATH = os.getenv("EMBED_CACHE_PATH", "./data/embedding_cache.sqlite")
+EMBED_CACHE_DISK_MAX = int(os.getenv("EMBED_CACHE_DISK_MAX", "50000"))  # rows kept on disk
+
+# Model loads in the background after startup; requests wait up to AI_READY_WAIT_S, then 503
+AI_READY_WAIT_S = float(os.getenv("AI_READY_WAIT_S", "10"))
+AI_WARMUP_BATCH = int(os.getenv("AI_WARMUP_BATCH", "2"))
+# With INFERENCE_SOCKET: retry with backoff up to this long, then state "failed"
+AI_REMOTE_CONNECT_TIMEOUT_S = float(os.getenv("AI_REMOTE_CONNECT_TIMEOUT_S", "120"))
+
+# LLM enrichment results keyed by normalized inputs (default TTL 7 days, empty path = memory only)
+LLM_MODEL = os.getenv("LLM_MODEL", "llama3:8b-instruct-q6_K")
+LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", "2048"))
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "./data/llm_cache.sqlite")
+LLM_CACHE_DISK_MAX = int(os.getenv("LLM_CACHE_DISK_MAX", "20000"))  # rows kept on disk
+
+
+class ModelNotReady(Exception):
+    """The vision model is still loading (or failed to load)."""
+
+
+class UnparsedReply(Exception):
+    """The LLM answered without the expected JSON; carries the raw reply. Never cached."""
+
+    def __init__(self, content: str):
+        super().__init__("LLM reply is not valid JSON")
+        self.content = content
+
 
 class AIService:
     def __init__(self):
-        self.device = 'cuda' if torch.cuda.is_available() else 'cpu'
+        self.device = 'cpu'
         self.visual_model = None
-        self._load_model()
+        self.vision_backend = None
+        self.state = "idle"  # idle | loading | ready | failed
+        self.load_error = None
+        self.timings = {}
+        self._state_lock = threading.Lock()  # state transitions only (never held while loading)
+        self._load_lock = threading.Lock()
+        self._ready = threading.Event()
+        self.embedding_cache = EmbeddingCache(
+            max_entries=EMBED_CACHE_SIZE,
+            ttl_seconds=EMBED_CACHE_TTL,
+            disk_path=EMBED_CACHE_PATH or None,
+            disk_max_entries=EMBED_CACHE_DISK_MAX,
+        )
+        self.batcher = EmbeddingBatcher(
+            self._encode_images,
+            window_ms=EMBED_BATCH_WINDOW_MS,
+            max_batch=EMBED_MAX_BATCH,
+        )
+        self.llm_cache = LLMResultCache(
+            max_entries=LLM_CACHE_SIZE,
+            ttl_seconds=LLM_CACHE_TTL,
+            disk_path=LLM_CACHE_PATH or None,
+            disk_max_entries=LLM_CACHE_DISK_MAX,
+        )
+
+    def start_loading(self):
+        """Load + warm up the model on a background thread (idempotent)."""
+        with self._state_lock:
+            if self.state != "idle":
+                return
+            self.state = "loading"
+        threading.Thread(target=self.load, name="ai-model-loader", daemon=True).start()
+
+    def load(self):
+        """Blocking load + warmup; safe to call from several threads (scripts call it directly)."""
+        with self._load_lock:
+            if self._ready.is_set():
+                return
+            self.state = "loading"
+            start = time.perf_counter()
+            self._load_model()
+            self.timings["model_load_ms"] = round((time.perf_counter() - start) * 1000, 1)
+            if self.visual_model:
+                self._warmup()
+                self.state = "ready"
+            else:
+                self.state = "failed"
+            self._ready.set()
+
+    def _connect_remote(self):
+        # Shared inference server: no model in this process; wait until it is reachable
+        print(f"AI: Using inference server at {INFERENCE_SOCKET}...")
+        deadline = time.monotonic() + AI_REMOTE_CONNECT_TIMEOUT_S
+        delay = 0.5
+        while True:
+            try:
+                self.visual_model = RemoteClipEncoder(INFERENCE_SOCKET)
+                self.vision_backend = self.visual_model.backend
+                self.device = self.visual_model.device
+                print(f"AI: Connected to inference server ({self.vision_backend}).")
+                return
+            except Exception as e:
+                self.load_error = f"inference server {INFERENCE_SOCKET}: {e}"
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                # load() marks the service failed; /ready reports load_error
+                print(f"AI: Gave up on inference server after {AI_REMOTE_CONNECT_TIMEOUT_S:.0f}s: {self.load_error}")
+                self.visual_model = None
+                return
+            time.sleep(min(delay, remaining))
+            delay = min(delay * 2, 10.0)
 
     def _load_model(self):
+        if INFERENCE_SOCKET:
+            return self._connect_remote()
+        backends = [VISION_BACKEND] if VISION_BACKEND == "torch" else [VISION_BACKEND, "torch"]
+        for backend in backends:
+            try:
+                print(f"AI: Loading Vision Model ({backend})...")
+                self.visual_model = create_encoder(VISION_MODEL_NAME, backend)
+                self.vision_backend = backend
+                self.device = self.visual_model.device
+                print(f"AI: Vision Model Loaded on {self.device.upper()} ({backend}).")
+                return
+            except ImportError as e:
+                self.load_error = f"Modules not found for {backend} backend ({e})"
+                print(f"AI: {self.load_error}. AI features limited.")
+            except Exception as e:
+                self.load_error = f"{backend}: {e}"
+                print(f"AI Load Error ({backend}): {e}")
+        self.visual_model = None
+
+    def _warmup(self):
+        # Synthetic batch: first forward pass pays graph/kernel init, not the first user
+        if AI_WARMUP_BATCH <= 0:
+            return
         try:
-            from sentence_transformers import SentenceTransformer
-            print(f"AI: Using device: {self.device}")
-            print("AI: Loading Vision Model...")
-            self.visual_model = SentenceTransformer('clip-ViT-B-32', device=self.device)
-            self.visual_model.max_seq_length = 512
-            print(f"AI: Vision Model Loaded on {self.device.upper()}.")
-        except ImportError:
-            print("AI: Modules not found (sentence_transformers). AI features limited.")
-            self.visual_model = None
+            from PIL import Image
+            start = time.perf_counter()
+            images = [Image.new("RGB", (224, 224), ((i * 71) % 256, 128, 200)) for i in range(AI_WARMUP_BATCH)]
+            self._encode_images(images)
+            self.timings["warmup_ms"] = round((time.perf_counter() - start) * 1000, 1)
         except Exception as e:
-            print(f"AI Load Error: {e}")
-            self.visual_model = None
+            print(f"AI Warmup Error: {e}")
+
+    async def _wait_ready(self):
+        if self.visual_model and self._ready.is_set():
+            return
+        self.start_loading()
+        deadline = time.monotonic() + AI_READY_WAIT_S
+        while not self._ready.is_set() and time.monotonic() < deadline:
+            await asyncio.sleep(0.1)
+        if not self.visual_model:
+            raise ModelNotReady("AI model failed to load" if self.state == "failed" else "AI model is loading")
+
+    def status(self) -> dict:
+        return {
+            "state": self.state,
+            "backend": self.vision_backend,
+            "device": self.device,
+            "error": self.load_error if self.state == "failed" else None,
+            **self.timings,
+        }
+
+    def _cache_key(self, source_hash: str, region=None) -> str:
+        # Model name (and non-default backend) in the key so switching encoders never
+        # serves stale vectors; crop region so a crop and its full frame never share a vector
+        model = VISION_MODEL_NAME if self.vision_backend in (None, "torch") else f"{VISION_MODEL_NAME}@{self.vision_backend}"
+        key = f"{model}:{source_hash}"
+        if region:
+            key += ":" + ",".join(str(v) for v in region)
+        return key
+
+    def _prepare(self, image: ImageInput):
+        """Decode + cache lookup. Returns (cache_key, cached_vector, image); image is None on hit."""
+        image_data = to_bytes(image)
+        key = self._cache_key(content_hash(image_data))
+        cached = self.embedding_cache.get(key)
+        if cached is not None:
+            return key, cached, None
+        return key, None, decode_for_clip(image_data)
+
+    def _encode_images(self, images: list) -> list:
+        """Encode a list of PIL images in a single forward pass (selected backend)."""
+        return self.visual_model.encode(images)
 
-    def generate_embedding(self, image_base64: str) -> list:
+    def generate_embedding(self, image: ImageInput) -> list:
+        """Synchronous, unbatched encode (scripts / benchmarks). Loads the model if needed."""
+        self.load()
         if not self.visual_model:
             raise Exception("AI Model not loaded.")
         
         try:
-            if ',' in image_base64:
-                image_base64 = image_base64.split(',')[1]
-            
-            image_data = base64.b64decode(image_base64)
-            image = Image.open(io.BytesIO(image_data))
-            
-            with torch.no_grad():
-                embedding = self.visual_model.encode(
-                    image, 
-                    convert_to_numpy=True, 
-                    show_progress_bar=False, 
-                    batch_size=1
-                )
-            return embedding.tolist()
+            key, cached, decoded = self._prepare(image)
+            if cached is not None:
+                return cached
+            embedding = self._encode_images([decoded])[0]
+            self.embedding_cache.put(key, embedding)
+            return embedding
+        except Exception as e:
+            print(f"Embedding Gen Error: {e}")
+            raise e
+
+    async def generate_embedding_async(self, image: ImageInput) -> list:
+        """
+        Decode on the compute pool (raw bytes or base64), then hand the image to
+        the micro-batcher so concurrent requests share one CLIP forward pass. Repeat frames are
+        served from the embedding cache without touching the model.
+        Raises ModelNotReady while the model is still loading.
+        """
+        await self._wait_ready()
+        
+        try:
+            key, cached, decoded = await compute_pool.run(self._prepare, image)
+            if cached is not None:
+                return cached
+            embedding = await asyncio.wrap_future(self.batcher.submit(decoded))
+            # Cache write (SQLite tier) off the loop, outside the pool's backpressure budget
+            await asyncio.get_running_loop().run_in_executor(None, self.embedding_cache.put, key, embedding)
+            return embedding
         except Exception as e:
             print(f"Embedding Gen Error: {e}")
             raise e
 
-    def enrich_label(self, label: str) -> dict:
+    async def embed_frame(self, frame: Frame) -> list:
+        """
+        Embedding of an already decoded frame (image_pipeline.process_frame):
+        the CLIP input is the object's crop, so no second decode happens here.
+        """
+        await self._wait_ready()
+        if frame.clip_image is None:
+            raise Exception("Frame could not be decoded.")
+        
+        loop = asyncio.get_running_loop()
+        key = self._cache_key(frame.source_hash, frame.region)
+        cached = await loop.run_in_executor(None, self.embedding_cache.get, key)
+        if cached is not None:
+            return cached
+        embedding = await asyncio.wrap_future(self.batcher.submit(frame.clip_image))
+        await loop.run_in_executor(None, self.embedding_cache.put, key, embedding)
+        return embedding
+
+    async def enrich_label(self, label: str, priority: str = "enrichment", strict: bool = False) -> dict:
+        """strict: raise on failure instead of returning the fallback (enrichment queue retries)."""
         if not label:
             return {"description": "No data.", "category": "common"}
-            
-        try:
-            import ollama
+
+        async def infer():
             prompt = (
                 f"Analyze '{label}'. "
                 f"1. Provide a natural description in Spanish (español), concise (2 sentences). "
@@ -62,44 +268,55 @@ class AIService:
                 f"Return ONLY a valid JSON object like this: {{ 'description': '...', 'category': '...' }}"
             )
             
-            response = ollama.chat(model='llama3:8b-instruct-q6_K', messages=[
+            response = await llm_gateway.chat(LLM_MODEL, [
               {'role': 'user', 'content': prompt}
-            ])
+            ], priority=priority)
             
             content = response['message']['content']
             
-            # Simple parsing
+            # Simple parsing; a malformed reply raises so it never reaches the cache
             try:
-                start = content.find('{')
-                end = content.rfind('}') + 1
-                if start != -1 and end != -1:
-                    return json.loads(content[start:end])
-                else:
-                    return {"description": content, "category": "common"}
-            except:
-                 return {"description": content, "category": "common"}
+                parsed = json.loads(content[content.find('{'):content.rfind('}') + 1])
+            except ValueError:
+                raise UnparsedReply(content)
+            if not isinstance(parsed, dict):
+                raise UnparsedReply(content)
+            return parsed
 
+        try:
+            key = cache_key("enrich", LLM_MODEL, label=label)
+            return await self.llm_cache.get_or_compute(key, infer)
+        except LLMOverloaded:
+            raise
+        except UnparsedReply as e:
+            # Served for this request only; the next one asks the model again
+            return {"description": e.content, "category": "common"}
         except ImportError:
+            if strict:
+                raise
             return {"description": "AI Module Missing", "category": "unknown"}
         except Exception as e:
+            if strict:
+                raise
             print(f"Enrich Error: {e}")
             return {"description": "AI Analysis Failed", "category": "unknown"}
 
-    def generate_contextual_description(
+    async def generate_contextual_description(
         self,
         object_name: str,
         category: str = None,
         subcategory: str = None,
         tags: list = None,
-        location_context: str = None
+        location_context: str = None,
+        priority: str = "enrichment",
+        strict: bool = False
     ) -> str:
         """
         Genera una descripción inteligente usando Llama 3 con contexto de taxonomía.
         Usa la categoría, subcategoría y etiquetas para generar descripciones más precisas.
+        Resultados cacheados por (nombre, categoría, subcategoría, etiquetas, ubicación).
         """
-        try:
-            import ollama
-            
+        async def infer():
             # Build context string
             context_parts = []
             if category:
@@ -127,9 +344,10 @@ Instrucciones:
 
 Responde SOLO con la descripción, sin explicaciones adicionales."""
             
-            response = ollama.chat(
-                model='llama3:8b-instruct-q6_K',
-                messages=[{'role': 'user', 'content': prompt}]
+            response = await llm_gateway.chat(
+                LLM_MODEL,
+                [{'role': 'user', 'content': prompt}],
+                priority=priority
             )
             
             description = response['message']['content'].strip()
@@ -139,10 +357,23 @@ Responde SOLO con la descripción, sin explicaciones adicionales."""
                 description = description[1:-1]
             
             return description
-            
+
+        try:
+            key = cache_key(
+                "contextual", LLM_MODEL,
+                name=object_name, category=category or "", subcategory=subcategory or "",
+                tags=tags or [], location=location_context or "",
+            )
+            return await self.llm_cache.get_or_compute(key, infer)
+        except LLMOverloaded:
+            raise
         except ImportError:
+            if strict:
+                raise
             return f"{object_name} detectado automáticamente."
         except Exception as e:
+            if strict:
+                raise
             print(f"Contextual Description Error: {e}")
             return f"{object_name} - objeto registrado en el sistema."
 
@@ -0,0 +1,158 @@
+"""
+Almacén de blobs direccionado por contenido (sha256) para imágenes de objetos.
+
+Las imágenes ya no viajan dentro de objetos_exploracion.metadata; la fila solo
+guarda la referencia (clave sha256). Backend local (sistema de archivos) por
+defecto, intercambiable por un backend S3-compatible vía BLOB_STORE_BACKEND=s3.
+"""
+
+import hashlib
+import os
+from abc import ABC, abstractmethod
+import tempfile
+from typing import Iterator, Optional
+
+CHUNK_SIZE = 64 * 1024
+
+
+class BlobNotFound(Exception):
+    pass
+
+
+class BlobStore(ABC):
+    """Interfaz mínima: put/size/iter_range/delete sobre claves sha256."""
+
+    @abstractmethod
+    def put(self, data: bytes, content_type: str = "application/octet-stream") -> str:
+        ...
+
+    @abstractmethod
+    def size(self, key: str) -> int:
+        ...
+
+    @abstractmethod
+    def iter_range(self, key: str, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+        """Itera los bytes [start, end] (end inclusivo) del blob."""
+
+    @abstractmethod
+    def delete(self, key: str):
+        ...
+
+    @staticmethod
+    def key_for(data: bytes) -> str:
+        return hashlib.sha256(data).hexdigest()
+
+    @staticmethod
+    def _valid_key(key: str) -> bool:
+        return len(key) == 64 and all(c in "0123456789abcdef" for c in key)
+
+
+class LocalBlobStore(BlobStore):
+    def __init__(self, root: str):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        if not self._valid_key(key):
+            raise BlobNotFound(key)
+        return os.path.join(self.root, key[:2], key[2:4], key)
+
+    def put(self, data: bytes, content_type: str = "application/octet-stream") -> str:
+        key = self.key_for(data)
+        path = self._path(key)
+        if os.path.exists(path):
+            return key  # Deduplicado: mismo contenido, misma clave
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Escritura atómica para no servir blobs a medio escribir
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        return key
+
+    def size(self, key: str) -> int:
+        try:
+            return os.path.getsize(self._path(key))
+        except OSError:
+            raise BlobNotFound(key)
+
+    def iter_range(self, key: str, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+        path = self._path(key)
+        if not os.path.exists(path):
+            raise BlobNotFound(key)
+        if end is None:
+            end = os.path.getsize(path) - 1
+
+        def gen():
+            with open(path, "rb") as f:
+                f.seek(start)
+                remaining = end - start + 1
+                while remaining > 0:
+                    chunk = f.read(min(CHUNK_SIZE, remaining))
+                    if not chunk:
+                        break
+                    remaining -= len(chunk)
+                    yield chunk
+
+        return gen()
+
+    def delete(self, key: str):
+        try:
+            os.remove(self._path(key))
+        except (OSError, BlobNotFound):
+            pass
+
+
+class S3BlobStore(BlobStore):
+    """Backend S3-compatible (AWS, MinIO, Supabase Storage S3). Requiere boto3."""
+
+    def __init__(self, bucket: str, prefix: str = "objects/", endpoint_url: Optional[str] = None):
+        import boto3
+        self.bucket = bucket
+        self.prefix = prefix
+        self.client = boto3.client("s3", endpoint_url=endpoint_url)
+
+    def _key(self, key: str) -> str:
+        if not self._valid_key(key):
+            raise BlobNotFound(key)
+        return f"{self.prefix}{key}"
+
+    def put(self, data: bytes, content_type: str = "application/octet-stream") -> str:
+        key = self.key_for(data)
+        self.client.put_object(Bucket=self.bucket, Key=self._key(key), Body=data, ContentType=content_type)
+        return key
+
+    def size(self, key: str) -> int:
+        try:
+            return self.client.head_object(Bucket=self.bucket, Key=self._key(key))["ContentLength"]
+        except Exception:
+            raise BlobNotFound(key)
+
+    def iter_range(self, key: str, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+        byte_range = f"bytes={start}-{'' if end is None else end}"
+        try:
+            obj = self.client.get_object(Bucket=self.bucket, Key=self._key(key), Range=byte_range)
+        except Exception:
+            raise BlobNotFound(key)
+        return obj["Body"].iter_chunks(CHUNK_SIZE)
+
+    def delete(self, key: str):
+        try:
+            self.client.delete_object(Bucket=self.bucket, Key=self._key(key))
+        except Exception:
+            pass
+
+
+def create_blob_store() -> BlobStore:
+    backend = os.getenv("BLOB_STORE_BACKEND", "local").lower()
+    if backend == "s3":
+        return S3BlobStore(
+            bucket=os.getenv("BLOB_STORE_S3_BUCKET", "mars-sight"),
+            prefix=os.getenv("BLOB_STORE_S3_PREFIX", "objects/"),
+            endpoint_url=os.getenv("BLOB_STORE_S3_ENDPOINT") or None,
+        )
+    return LocalBlobStore(os.getenv("BLOB_STORE_PATH", "./data/blobs"))
+
+
+# Global Instance
+blob_store = create_blob_store()
@@ -0,0 +1,168 @@
+"""
+Contexto del chat con presupuesto de tokens y resumen acumulado.
+
+El prompt se construye siempre con el mismo orden para que Ollama reutilice
+el prefijo ya evaluado en su KV cache entre turnos:
+
+    [system: SYSTEM_PROMPT + resumen acumulado]  <- estable entre turnos
+    [turnos recientes completos]                 <- solo crece al final
+    [user: contexto actual + mensaje]            <- lo único nuevo
+
+Cuando la historia no cabe en CHAT_CONTEXT_TOKENS, los turnos más antiguos se
+pliegan en el resumen en segundo plano (prioridad background del gateway). Se
+pliega hasta dejar la historia en CHAT_SUMMARY_TARGET del presupuesto, así el
+resumen (y con él el prefijo) cambia solo de vez en cuando y el tiempo de
+evaluación del prompt se mantiene plano aunque la conversación crezca.
+"""
+
+import asyncio
+import math
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.cache import TTLCache
+from app.services.llm_gateway import llm_gateway
+
+# Prompt tokens for system + summary + history + new message; keep below Ollama's num_ctx minus the reply
+CHAT_CONTEXT_TOKENS = int(os.getenv("CHAT_CONTEXT_TOKENS", "1800"))
+CHAT_SUMMARY_TARGET = float(os.getenv("CHAT_SUMMARY_TARGET", "0.5"))
+CHAT_SUMMARY_MAX_WORDS = int(os.getenv("CHAT_SUMMARY_MAX_WORDS", "150"))
+CHAT_SUMMARY_TTL = float(os.getenv("CHAT_SUMMARY_TTL", str(24 * 3600)))
+
+# No tokenizer on the API side: Llama 3 averages ~3.5 chars/token on Spanish text
+CHARS_PER_TOKEN = 3.5
+MESSAGE_OVERHEAD_TOKENS = 4  # role header + end-of-turn markers
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text or "") / CHARS_PER_TOKEN)
+
+
+def message_tokens(message: Dict[str, Any]) -> int:
+    return estimate_tokens(message.get("content", "")) + MESSAGE_OVERHEAD_TOKENS
+
+
+def _turns(messages: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+    """Group into turns starting at each user message, so cuts never split a question from its answer."""
+    turns = []
+    for m in messages:
+        if m.get("role") == "user" or not turns:
+            turns.append([])
+        turns[-1].append(m)
+    return turns
+
+
+class ChatContextBuilder:
+    def __init__(self):
+        # chat_id -> {"text": summary, "upto": id of the last folded message}
+        self.summaries = TTLCache(ttl_seconds=CHAT_SUMMARY_TTL, max_entries=1024)
+        self._summarizing = set()
+        self.built = 0
+        self.truncated = 0
+        self.summaries_made = 0
+        self.summary_failures = 0
+        self.last_prompt_tokens = 0
+
+    def build(
+        self,
+        chat_id: Optional[str],
+        system_prompt: str,
+        history: List[Dict[str, Any]],
+        message: str,
+        context: str = "",
+    ) -> Tuple[List[Dict[str, str]], List[Dict[str, Any]]]:
+        """
+        Ollama messages within the token budget, plus the oldest turns that did not fit
+        (to pass to schedule_fold()). `history` is oldest-first; DB rows carry an `id`.
+        """
+        summary = self.summaries.get(chat_id) if chat_id else None
+        upto = summary["upto"] if summary else None
+        system = system_prompt
+        if summary:
+            system += f"\n\nResumen de la conversación anterior:\n{summary['text']}"
+
+        # Request-specific context rides with the new message, never in front of the history
+        content = f"Contexto actual del sistema: {context}\n\n{message}" if context else message
+        final = {'role': 'user', 'content': content}
+
+        unsummarized = [m for m in history if upto is None or m.get("id") is None or m["id"] > upto]
+        budget = CHAT_CONTEXT_TOKENS - message_tokens({'content': system}) - message_tokens(final)
+
+        recent, used = [], 0
+        turns = _turns(unsummarized)
+        while turns:
+            cost = sum(message_tokens(m) for m in turns[-1])
+            if used + cost > budget:
+                break
+            recent[:0] = turns.pop()
+            used += cost
+        overflow = [m for turn in turns for m in turn]
+
+        messages = [{'role': 'system', 'content': system}]
+        messages.extend({'role': m['role'], 'content': m['content']} for m in recent)
+        messages.append(final)
+
+        self.built += 1
+        if overflow:
+            self.truncated += 1
+        self.last_prompt_tokens = CHAT_CONTEXT_TOKENS - budget + used
+        return messages, overflow + recent if overflow else []
+
+    def schedule_fold(self, chat_id: Optional[str], model: str, candidates: List[Dict[str, Any]]):
+        """Fold the oldest turns into the summary in the background (one job per chat)."""
+        if not chat_id or not candidates or chat_id in self._summarizing:
+            return
+        target = CHAT_CONTEXT_TOKENS * CHAT_SUMMARY_TARGET
+        fold, remaining = [], sum(message_tokens(m) for m in candidates)
+        for turn in _turns(candidates):
+            # Only persisted rows have ids to mark coverage with
+            if remaining <= target or any(m.get("id") is None for m in turn):
+                break
+            fold.extend(turn)
+            remaining -= sum(message_tokens(m) for m in turn)
+        if not fold:
+            return
+        self._summarizing.add(chat_id)
+        asyncio.get_running_loop().create_task(self._fold(chat_id, model, fold))
+
+    async def _fold(self, chat_id: str, model: str, fold: List[Dict[str, Any]]):
+        try:
+            previous = self.summaries.get(chat_id)
+            transcript = "\n".join(
+                f"{'Astronauta' if m['role'] == 'user' else 'IA'}: {m['content']}" for m in fold
+            )
+            prompt = (
+                f"Resume en español, en un máximo de {CHAT_SUMMARY_MAX_WORDS} palabras, la conversación "
+                f"entre un astronauta y la IA de su traje. Conserva datos concretos (nombres, cifras, "
+                f"decisiones y tareas pendientes). Responde solo con el resumen.\n\n"
+            )
+            if previous:
+                prompt += f"Resumen previo:\n{previous['text']}\n\n"
+            prompt += f"Nuevos mensajes:\n{transcript}"
+            response = await llm_gateway.chat(model, [{'role': 'user', 'content': prompt}], priority="background")
+            text = response['message']['content'].strip()
+            if text:
+                self.summaries.set(chat_id, {"text": text, "upto": fold[-1]["id"]})
+                self.summaries_made += 1
+        except Exception as e:
+            # Next request simply truncates again and retries the fold
+            self.summary_failures += 1
+            print(f"Chat summary failed for {chat_id}: {e}")
+        finally:
+            self._summarizing.discard(chat_id)
+
+    def stats(self) -> dict:
+        return {
+            "budget_tokens": CHAT_CONTEXT_TOKENS,
+            "built": self.built,
+            "truncated": self.truncated,
+            "summaries_made": self.summaries_made,
+            "summary_failures": self.summary_failures,
+            "summarizing": len(self._summarizing),
+            "last_prompt_tokens": self.last_prompt_tokens,
+            "summary_cache": self.summaries.stats(),
+        }
+
+
+# Global Instance
+chat_context = ChatContextBuilder()
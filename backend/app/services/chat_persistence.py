@@ -0,0 +1,228 @@
+"""
+Persistencia diferida de conversaciones (chat_logs).
+
+La respuesta al usuario solo espera una inferencia: los mensajes se encolan
+aquí y un worker en segundo plano los escribe, agrupando (coalesce) varios
+turnos de la misma conversación en una sola escritura y reintentando con
+backoff si Supabase falla. El título "inteligente" de una conversación nueva
+se genera después, también en segundo plano.
+
+Lectura consistente: mientras un turno no se ha escrito, overlay() lo añade a
+lo leído de la base para que el siguiente turno vea la historia completa.
+"""
+
+import asyncio
+import os
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.supabase_client import get_user_client
+from app.services.llm_gateway import llm_gateway
+
+COALESCE_WINDOW_S = float(os.getenv("CHAT_PERSIST_COALESCE_MS", "250")) / 1000
+MAX_ATTEMPTS = int(os.getenv("CHAT_PERSIST_MAX_ATTEMPTS", "5"))
+TITLE_MODEL = 'llama3:8b-instruct-q6_K'
+
+
+@dataclass
+class PendingChat:
+    chat_id: str
+    user_id: str
+    token: str
+    is_new: bool
+    title: Optional[str] = None
+    messages: List[Dict[str, str]] = field(default_factory=list)
+    first_message: Optional[str] = None
+    attempts: int = 0
+    not_before: float = 0.0
+    # Batch in flight: retries resend the same messages with the same id
+    batch_id: Optional[str] = None
+    batch_size: int = 0
+
+
+class ChatPersistenceQueue:
+    def __init__(self):
+        self._pending: Dict[str, PendingChat] = {}
+        self._titles: List[Tuple[str, str, str, int, float]] = []  # (chat_id, token, first_message, attempts, not_before)
+        self._wakeup: Optional[asyncio.Event] = None
+        self._worker: Optional[asyncio.Task] = None
+        self.flushed = 0
+        self.coalesced = 0
+        self.retries = 0
+        self.dropped = 0
+
+    # --- Producer side (request handlers) ---
+
+    def enqueue_turn(
+        self,
+        chat_id: str,
+        user_id: str,
+        token: str,
+        messages: List[Dict[str, str]],
+        is_new: bool = False,
+        title: Optional[str] = None,
+    ):
+        entry = self._pending.get(chat_id)
+        if entry:
+            entry.messages.extend(messages)
+            entry.token = token
+            if title and not entry.is_new:
+                entry.title = title
+            self.coalesced += 1
+        else:
+            first_message = messages[0]["content"] if is_new and messages else None
+            entry = PendingChat(chat_id, user_id, token, is_new, title, list(messages), first_message)
+            self._pending[chat_id] = entry
+        self._kick()
+
+    def overlay(
+        self,
+        chat_id: Optional[str],
+        chat_data: Optional[Dict[str, Any]],
+        user_id: Optional[str] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """Merge not-yet-written turns into data loaded from the DB."""
+        entry = self._pending.get(chat_id) if chat_id else None
+        if not entry or (user_id and entry.user_id != user_id):
+            return chat_data
+        if chat_data is None:
+            return {"id": chat_id, "user_id": entry.user_id, "title": entry.title, "messages": list(entry.messages)}
+        return {**chat_data, "messages": (chat_data.get("messages") or []) + entry.messages}
+
+    def is_pending(self, chat_id: Optional[str]) -> bool:
+        return bool(chat_id) and chat_id in self._pending
+
+    # --- Worker ---
+
+    def _kick(self):
+        if self._worker is None or self._worker.done():
+            self._wakeup = asyncio.Event()
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+        self._wakeup.set()
+
+    async def _run(self):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            # Let more turns for the same chats accumulate into one write
+            await asyncio.sleep(COALESCE_WINDOW_S)
+            await self._flush_ready()
+            await self._generate_titles()
+            if self._pending or self._titles:
+                due = [e.not_before for e in self._pending.values()] + [job[4] for job in self._titles]
+                delay = min(due) - time.monotonic()
+                await asyncio.sleep(max(0.0, delay))
+                self._wakeup.set()
+
+    async def _flush_ready(self):
+        now = time.monotonic()
+        for entry in [e for e in self._pending.values() if e.not_before <= now]:
+            await self._flush(entry)
+
+    async def _flush(self, entry: PendingChat):
+        if entry.batch_id is None:
+            entry.batch_id = str(uuid.uuid4())
+            entry.batch_size = len(entry.messages)
+        count = entry.batch_size
+        batch = entry.messages[:count]
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, self._write, entry, batch)
+        except Exception as e:
+            entry.attempts += 1
+            self.retries += 1
+            if entry.attempts >= MAX_ATTEMPTS:
+                print(f"Chat persist dropped {entry.chat_id} after {entry.attempts} attempts: {e}")
+                self._pending.pop(entry.chat_id, None)
+                self.dropped += 1
+            else:
+                entry.not_before = time.monotonic() + min(30.0, 0.5 * 2 ** entry.attempts)
+                print(f"Chat persist retry {entry.attempts} for {entry.chat_id}: {e}")
+            return
+
+        self.flushed += 1
+        del entry.messages[:count]
+        entry.batch_id = None
+        entry.batch_size = 0
+        if entry.first_message:
+            self._titles.append((entry.chat_id, entry.token, entry.first_message, 0, 0.0))
+            entry.first_message = None
+        entry.is_new = False
+        entry.title = None
+        entry.attempts = 0
+        if not entry.messages:
+            self._pending.pop(entry.chat_id, None)
+
+    def _write(self, entry: PendingChat, batch: List[Dict[str, str]]):
+        supabase = get_user_client(entry.token)
+        if not supabase:
+            return
+        # Append-only: one transactional RPC per flush, creates the chat if new.
+        # p_batch_id makes a retry of a write that did commit a no-op.
+        params = {
+            "p_chat_id": entry.chat_id,
+            "p_messages": batch,
+            "p_title": entry.title,
+            "p_batch_id": entry.batch_id,
+        }
+        try:
+            supabase.rpc("append_chat_messages", params).execute()
+        except Exception as e:
+            # Migration 10 not applied: the function has no p_batch_id yet (nothing ran)
+            if "PGRST202" not in str(e):
+                raise
+            params.pop("p_batch_id")
+            supabase.rpc("append_chat_messages", params).execute()
+
+    async def _generate_titles(self):
+        now = time.monotonic()
+        jobs = [job for job in self._titles if job[4] <= now]
+        self._titles = [job for job in self._titles if job[4] > now]
+        for chat_id, token, first, attempts, _ in jobs:
+            try:
+                title_prompt = f"Genera un título muy corto (máximo 4 palabras) para esta conversación que empieza con: '{first}'. Solo el título, sin comillas ni prefijos."
+                title_resp = await llm_gateway.chat(
+                    TITLE_MODEL, [{'role': 'user', 'content': title_prompt}], priority="background"
+                )
+                title = title_resp['message']['content'].strip().strip('"')
+                if title:
+                    await asyncio.get_running_loop().run_in_executor(None, self._write_title, chat_id, token, title)
+            except Exception as e:
+                # Fallback title was already stored with the first write
+                if attempts + 1 < MAX_ATTEMPTS:
+                    not_before = time.monotonic() + min(60.0, 2.0 * 2 ** attempts)
+                    self._titles.append((chat_id, token, first, attempts + 1, not_before))
+                    self.retries += 1
+                else:
+                    print(f"Chat title generation failed for {chat_id}: {e}")
+
+    def _write_title(self, chat_id: str, token: str, title: str):
+        supabase = get_user_client(token)
+        if supabase:
+            supabase.from_("chat_logs").update({"title": title}).eq("id", chat_id).execute()
+
+    async def drain(self, timeout: float = 10.0):
+        """Flush everything pending (shutdown)."""
+        deadline = time.monotonic() + timeout
+        while self._pending and time.monotonic() < deadline:
+            for entry in list(self._pending.values()):
+                entry.not_before = 0
+                await self._flush(entry)
+        if self._worker:
+            self._worker.cancel()
+
+    def stats(self) -> dict:
+        return {
+            "pending_chats": len(self._pending),
+            "pending_messages": sum(len(e.messages) for e in self._pending.values()),
+            "pending_titles": len(self._titles),
+            "flushed": self.flushed,
+            "coalesced": self.coalesced,
+            "retries": self.retries,
+            "dropped": self.dropped,
+        }
+
+
+# Global Instance
+chat_persistence = ChatPersistenceQueue()
@@ -0,0 +1,86 @@
+"""
+Pool acotado para trabajo CPU (CLIP, Pillow) fuera del event loop.
+
+Los endpoints async no deben ejecutar inferencia ni procesamiento de imagen
+directamente: bloquearían uvicorn durante todo el forward pass. Este pool usa
+hilos (torch y Pillow liberan el GIL en sus secciones pesadas y el modelo se
+comparte en memoria) y aplica backpressure: si hay demasiados trabajos
+pendientes, rechaza en lugar de encolar sin límite.
+"""
+
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.core.metrics import LatencyStats
+
+
+class ComputePoolBusy(Exception):
+    """El pool está saturado; el cliente debe reintentar más tarde."""
+
+
+class ComputePool:
+    def __init__(self, workers: int = 2, max_pending: int = 16):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="compute")
+        self._pending = 0
+        self._active = 0
+        self._active_lock = threading.Lock()
+        self.rejected = 0
+        self.wait = LatencyStats()
+        self.run_time = LatencyStats()
+
+    async def run(self, fn, *args, **kwargs):
+        """Ejecuta fn(*args, **kwargs) en el pool y espera el resultado."""
+        if self._pending >= self.max_pending:
+            self.rejected += 1
+            raise ComputePoolBusy(f"Compute pool saturated ({self._pending} pending)")
+
+        self._pending += 1
+        submitted = time.perf_counter()
+
+        def job():
+            started = time.perf_counter()
+            self.wait.observe((started - submitted) * 1000)
+            with self._active_lock:
+                self._active += 1
+            failed = False
+            try:
+                return fn(*args, **kwargs)
+            except Exception:
+                failed = True
+                raise
+            finally:
+                with self._active_lock:
+                    self._active -= 1
+                self.run_time.observe((time.perf_counter() - started) * 1000, error=failed)
+
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, job)
+        finally:
+            self._pending -= 1
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "queue_depth": max(0, self._pending - self._active),
+            "active": self._active,
+            "rejected": self.rejected,
+            "wait": self.wait.snapshot(),
+            "run": self.run_time.snapshot(),
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+# Global Instance
+compute_pool = ComputePool(
+    workers=int(os.getenv("COMPUTE_POOL_WORKERS", "2")),
+    max_pending=int(os.getenv("COMPUTE_POOL_MAX_PENDING", "16")),
+)
@@ -0,0 +1,53 @@
+"""
+Agregados del dashboard: una llamada RPC (get_dashboard_summary) detrás de una
+caché TTL corta. Las escrituras de misiones y objetos llaman a invalidate().
+"""
+
+import os
+
+from app.core.cache import TTLCache
+
+DASHBOARD_CACHE_TTL = float(os.getenv("DASHBOARD_CACHE_TTL", "5"))
+RECENT_LIMIT = 5
+
+MISSION_COLUMNS = "id, codigo, titulo, estado, inicio_at, fin_at, zona_geografica"
+OBJECT_COLUMNS = "id, nombre, tipo, descripcion, mission_id, created_at, subcategoria, genero, categoria_id"
+# Fallback path: the metadata keys the UI reads, never the inline image (same as missions.py)
+OBJECT_METADATA_KEYS = ("source", "description", "confidence", "heading", "timestamp", "image_ref")
+
+summary_cache = TTLCache(ttl_seconds=DASHBOARD_CACHE_TTL, max_entries=4)
+
+
+def invalidate():
+    summary_cache.invalidate()
+
+
+def _fetch_summary(supabase) -> dict:
+    try:
+        return supabase.rpc("get_dashboard_summary", {"recent_limit": RECENT_LIMIT}).execute().data
+    except Exception as e:
+        # Function not migrated yet: same shape with slim per-table queries
+        print(f"Dashboard summary RPC fallback: {e}")
+
+    summary = {"missions_count": 0, "objects_count": 0, "recent_missions": [], "recent_objects": []}
+    try:
+        summary["missions_count"] = supabase.table("misiones").select("id", count="exact", head=True).execute().count
+        summary["recent_missions"] = supabase.table("misiones").select(MISSION_COLUMNS).order("inicio_at", desc=True).limit(RECENT_LIMIT).execute().data
+    except:
+        pass
+    try:
+        summary["objects_count"] = supabase.table("objetos_exploracion").select("id", count="exact", head=True).execute().count
+        keys = ", ".join(f"_meta_{k}:metadata->{k}" for k in OBJECT_METADATA_KEYS)
+        rows = supabase.table("objetos_exploracion").select(f"{OBJECT_COLUMNS}, {keys}").order("created_at", desc=True).limit(RECENT_LIMIT).execute().data or []
+        for row in rows:
+            meta = {k: row.pop(f"_meta_{k}", None) for k in OBJECT_METADATA_KEYS}
+            row["metadata"] = {k: v for k, v in meta.items() if v is not None}
+        summary["recent_objects"] = rows
+    except:
+        pass
+    return summary
+
+
+def get_summary(supabase) -> dict:
+    """Counts + slim recent lists; cache hit on most dashboard polls."""
+    return summary_cache.get_or_set("summary", lambda: _fetch_summary(supabase))
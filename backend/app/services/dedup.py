@@ -0,0 +1,207 @@
+"""
+Supresión de casi-duplicados al crear objetos.
+
+Un objeto se considera el mismo si es de la misma misión, está a menos de
+DEDUP_RADIUS_M metros y su embedding CLIP tiene similitud coseno >=
+DEDUP_MIN_SIMILARITY. Primero se consulta un índice caliente en memoria con
+los objetos recientes de cada misión (lo habitual en Sentinel: la cámara sigue
+mirando lo que acaba de guardar); si no hay acierto, find_near_duplicate en
+PostGIS/pgvector cubre reinicios y otros workers.
+
+DEDUP_MODE: merge (suma un avistamiento al existente), skip (no escribe nada)
+u off. Sin embedding no se puede comparar y se inserta normalmente. Solo se
+aplica a los orígenes de DEDUP_SOURCES (por defecto sentinel): un objeto que
+el usuario registra a mano siempre se guarda.
+"""
+
+import asyncio
+import math
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+from app.services.spatial_index import haversine_m
+
+DEDUP_MODE = os.getenv("DEDUP_MODE", "merge")  # merge | skip | off
+DEDUP_RADIUS_M = float(os.getenv("DEDUP_RADIUS_M", "8"))
+DEDUP_MIN_SIMILARITY = float(os.getenv("DEDUP_MIN_SIMILARITY", "0.92"))
+# Comma-separated ObjectCreateRequest.source values that are deduplicated
+DEDUP_SOURCES = {s.strip() for s in os.getenv("DEDUP_SOURCES", "sentinel").split(",") if s.strip()}
+# Hot index: recent objects per mission kept in memory
+DEDUP_HOT_TTL_S = float(os.getenv("DEDUP_HOT_TTL_S", "900"))
+DEDUP_HOT_PER_MISSION = int(os.getenv("DEDUP_HOT_PER_MISSION", "256"))
+
+
+def _normalize(vector: List[float]) -> List[float]:
+    norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+    return [x / norm for x in vector]
+
+
+class RecentObjects:
+    """Per-mission ring of (id, lat, lng, unit embedding, last_seen)."""
+
+    def __init__(self, ttl_seconds: float, per_mission: int):
+        self.ttl_seconds = ttl_seconds
+        self.per_mission = per_mission
+        self._lock = threading.Lock()
+        self._missions: Dict[Optional[str], deque] = {}
+
+    def remember(self, mission_id: Optional[str], object_id: str, lat: float, lng: float, embedding: List[float]):
+        with self._lock:
+            ring = self._missions.setdefault(mission_id, deque(maxlen=self.per_mission))
+            ring.append([object_id, lat, lng, _normalize(embedding), time.monotonic()])
+
+    def find(self, mission_id: Optional[str], lat: float, lng: float, embedding: List[float],
+             radius_m: float, min_similarity: float) -> Optional[Dict[str, Any]]:
+        now = time.monotonic()
+        query = None
+        best = None
+        with self._lock:
+            ring = self._missions.get(mission_id)
+            if not ring:
+                return None
+            while ring and now - ring[0][4] > self.ttl_seconds:
+                ring.popleft()
+            for entry in ring:
+                if now - entry[4] > self.ttl_seconds:
+                    continue
+                distance = haversine_m(lat, lng, entry[1], entry[2])
+                if distance > radius_m:
+                    continue
+                query = query or _normalize(embedding)
+                similarity = sum(a * b for a, b in zip(query, entry[3]))
+                if similarity >= min_similarity and (best is None or similarity > best[1]):
+                    best = (entry, similarity, distance)
+            if best is None:
+                return None
+            best[0][4] = now  # still being looked at: keep it hot
+            return {"id": best[0][0], "similarity": round(best[1], 4), "distance_m": round(best[2], 2), "source": "hot"}
+
+    def forget(self, object_id: str):
+        with self._lock:
+            for ring in self._missions.values():
+                for entry in list(ring):
+                    if entry[0] == object_id:
+                        ring.remove(entry)
+
+    def size(self) -> int:
+        with self._lock:
+            return sum(len(ring) for ring in self._missions.values())
+
+
+class DuplicateDetector:
+    def __init__(self):
+        self.hot = RecentObjects(DEDUP_HOT_TTL_S, DEDUP_HOT_PER_MISSION)
+        self._locks: Dict[Optional[str], asyncio.Lock] = {}
+        self.checked = 0
+        self.hot_hits = 0
+        self.db_hits = 0
+        self.merged = 0
+        self.skipped = 0
+
+    @property
+    def enabled(self) -> bool:
+        return DEDUP_MODE in ("merge", "skip")
+
+    def applies_to(self, source: Optional[str]) -> bool:
+        """Automatic detections are deduplicated; user-entered objects are always inserted."""
+        return self.enabled and source in DEDUP_SOURCES
+
+    def lock(self, mission_id: Optional[str]) -> asyncio.Lock:
+        """Serializes check + insert per mission so two frames of the same object can't both insert."""
+        if mission_id not in self._locks:
+            self._locks[mission_id] = asyncio.Lock()
+        return self._locks[mission_id]
+
+    def find(self, supabase, mission_id: Optional[str], lat: float, lng: float,
+             embedding: Optional[List[float]]) -> Optional[Dict[str, Any]]:
+        """Existing near-duplicate of a new detection, or None. Blocking (may query the DB)."""
+        if not self.enabled or not embedding:
+            return None
+        self.checked += 1
+        match = self.hot.find(mission_id, lat, lng, embedding, DEDUP_RADIUS_M, DEDUP_MIN_SIMILARITY)
+        if match:
+            self.hot_hits += 1
+            return match
+        try:
+            res = supabase.rpc("find_near_duplicate", {
+                "p_lat": lat,
+                "p_lng": lng,
+                "p_embedding": embedding,
+                "p_mission_id": mission_id,
+                "radius_meters": DEDUP_RADIUS_M,
+                "min_similarity": DEDUP_MIN_SIMILARITY,
+            }).execute()
+        except Exception as e:
+            # Migration 09 not applied: hot index only
+            print(f"find_near_duplicate unavailable: {e}")
+            return None
+        if not res.data:
+            return None
+        row = res.data[0]
+        self.db_hits += 1
+        # Later frames of the same object hit the hot index
+        self.hot.remember(mission_id, row["id"], lat, lng, embedding)
+        return {
+            "id": row["id"],
+            "similarity": round(row["similarity"], 4),
+            "distance_m": round(row["distance"], 2),
+            "source": "db",
+        }
+
+    def resolve(self, supabase, match: Dict[str, Any], confidence: float, seen_at: str) -> Dict[str, Any]:
+        """Apply DEDUP_MODE to an existing match. Returns the row summary sent back to the client."""
+        if DEDUP_MODE != "merge":
+            self.skipped += 1
+            return {"id": match["id"]}
+        self.merged += 1
+        try:
+            res = supabase.rpc("merge_object_sighting", {
+                "p_id": match["id"],
+                "p_confidence": confidence,
+                "p_seen_at": seen_at,
+            }).execute()
+            return res.data or {"id": match["id"]}
+        except Exception as rpc_err:
+            print(f"merge_object_sighting fallback: {rpc_err}")
+        # Migration 09 not applied yet: same merge, read-modify-write
+        res = supabase.table("objetos_exploracion").select("metadata").eq("id", match["id"]).limit(1).execute()
+        if not res.data:
+            return {"id": match["id"]}
+        # Only the sighting keys change; the rest (legacy image_base64 included) is written back as is
+        metadata = dict(res.data[0].get("metadata") or {})
+        metadata.update({
+            "sightings": int(metadata.get("sightings") or 1) + 1,
+            "last_seen": seen_at,
+            "confidence": max(float(metadata.get("confidence") or 0), confidence or 0),
+        })
+        supabase.table("objetos_exploracion").update({"metadata": metadata}).eq("id", match["id"]).execute()
+        return {"id": match["id"], "metadata": {k: v for k, v in metadata.items() if k != "image_base64"}}
+
+    def remember(self, mission_id: Optional[str], object_id: str, lat: float, lng: float,
+                 embedding: Optional[List[float]]):
+        if self.enabled and embedding and object_id:
+            self.hot.remember(mission_id, object_id, lat, lng, embedding)
+
+    def forget(self, object_id: str):
+        self.hot.forget(object_id)
+
+    def stats(self) -> dict:
+        return {
+            "mode": DEDUP_MODE,
+            "sources": sorted(DEDUP_SOURCES),
+            "radius_m": DEDUP_RADIUS_M,
+            "min_similarity": DEDUP_MIN_SIMILARITY,
+            "hot_entries": self.hot.size(),
+            "checked": self.checked,
+            "hot_hits": self.hot_hits,
+            "db_hits": self.db_hits,
+            "merged": self.merged,
+            "skipped": self.skipped,
+        }
+
+
+# Global Instance
+duplicate_detector = DuplicateDetector()
@@ -0,0 +1,99 @@
+"""
+Micro-batching dinámico para el encoder CLIP.
+
+Las peticiones concurrentes se agrupan durante una ventana corta (o hasta
+llenar max_batch) y se codifican con una sola llamada a encode(); cada
+llamante recibe su propio vector a través de un Future.
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, List
+
+from app.core.metrics import LatencyStats
+from app.services.compute_pool import ComputePoolBusy
+
+
+class EmbeddingBatcher:
+    def __init__(
+        self,
+        encode_batch: Callable[[list], list],
+        window_ms: float = 5.0,
+        max_batch: int = 16,
+        max_queue: int = 256,
+    ):
+        self._encode_batch = encode_batch
+        self.window_ms = window_ms
+        self.max_batch = max(1, max_batch)
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self.batches = 0
+        self.items = 0
+        self.batch_time = LatencyStats()
+
+    def submit(self, item) -> Future:
+        """Encola un elemento ya decodificado; el Future resuelve con su embedding."""
+        self._ensure_started()
+        future = Future()
+        try:
+            self._queue.put_nowait((item, future))
+        except queue.Full:
+            raise ComputePoolBusy("Embedding batcher queue full")
+        return future
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name="embedding-batcher", daemon=True)
+                self._thread.start()
+
+    def _collect(self) -> List[tuple]:
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.window_ms / 1000
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _loop(self):
+        while True:
+            batch = self._collect()
+            pending = [(item, fut) for item, fut in batch if fut.set_running_or_notify_cancel()]
+            if not pending:
+                continue
+
+            start = time.perf_counter()
+            try:
+                vectors = self._encode_batch([item for item, _ in pending])
+            except Exception as e:
+                self.batch_time.observe((time.perf_counter() - start) * 1000, error=True)
+                for _, fut in pending:
+                    fut.set_exception(e)
+                continue
+
+            self.batch_time.observe((time.perf_counter() - start) * 1000)
+            self.batches += 1
+            self.items += len(pending)
+            for (_, fut), vector in zip(pending, vectors):
+                fut.set_result(vector)
+
+    def stats(self) -> dict:
+        return {
+            "window_ms": self.window_ms,
+            "max_batch": self.max_batch,
+            "queue_depth": self._queue.qsize(),
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+            "batch_time": self.batch_time.snapshot(),
+        }
@@ -0,0 +1,35 @@
+"""
+Caché de embeddings indexada por hash del contenido de la imagen.
+
+El mismo frame suele llegar dos veces (search-similar y luego objects/create).
+Nivel 1: LRU en memoria con TTL opcional. Nivel 2 (opcional): SQLite en disco
+para sobrevivir reinicios, acotado a disk_max_entries filas.
+"""
+
+from array import array
+from typing import List, Optional
+
+from app.core.disk_cache import TieredCache
+
+
+def _encode(vector: List[float]) -> bytes:
+    return array("f", vector).tobytes()
+
+
+def _decode(blob: bytes) -> List[float]:
+    vector = array("f")
+    vector.frombytes(blob)
+    return vector.tolist()
+
+
+class EmbeddingCache(TieredCache):
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 0, disk_path: Optional[str] = None,
+                 disk_max_entries: int = 0):
+        super().__init__(
+            "embeddings", "vector", _encode, _decode,
+            max_entries=max_entries,
+            ttl_seconds=ttl_seconds,
+            disk_path=disk_path,
+            disk_max_entries=disk_max_entries,
+            name="Embedding cache",
+        )
@@ -0,0 +1,358 @@
+"""
+Cola persistente de enriquecimiento de objetos (SQLite local).
+
+Guardar un hallazgo no espera al LLM ni a CLIP: create_object inserta la fila
+y encola jobs que un worker en segundo plano ejecuta y escribe de vuelta.
+
+    categorize  categoría sugerida vía enrich_label       -> metadata.ai_category (+ tipo genérico)
+    describe    descripción contextual (Llama 3)           -> descripcion / metadata.description
+    embed       embedding CLIP desde la imagen almacenada  -> embedding (backfill de embedding IS NULL)
+
+Los jobs sobreviven reinicios, se reclaman si un worker muere a mitad, se
+reintentan con backoff y se procesan por lotes: los jobs de un mismo objeto
+van en orden, los de objetos distintos en paralelo (el gateway LLM y el
+batcher de embeddings limitan la concurrencia real). Varios procesos uvicorn
+pueden compartir el mismo fichero: la reclamación es atómica.
+"""
+
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.supabase_client import get_service_client
+from app.services.ai_service import ai_service
+from app.services.blob_store import blob_store
+from app.services.llm_gateway import LLMOverloaded
+
+ENRICH_QUEUE_PATH = os.getenv("ENRICH_QUEUE_PATH", "./data/enrichment_queue.sqlite")
+ENRICH_BATCH = int(os.getenv("ENRICH_BATCH", "8"))
+ENRICH_MAX_ATTEMPTS = int(os.getenv("ENRICH_MAX_ATTEMPTS", "5"))
+ENRICH_POLL_S = float(os.getenv("ENRICH_POLL_S", "5"))
+ENRICH_JOB_TIMEOUT_S = float(os.getenv("ENRICH_JOB_TIMEOUT_S", "600"))  # reclaim jobs of a dead worker
+ENRICH_KEEP_DONE_S = float(os.getenv("ENRICH_KEEP_DONE_S", str(24 * 3600)))
+# Periodic scan for rows with embedding IS NULL (0 = off)
+ENRICH_BACKFILL_INTERVAL_S = float(os.getenv("ENRICH_BACKFILL_INTERVAL_S", "300"))
+ENRICH_BACKFILL_LIMIT = int(os.getenv("ENRICH_BACKFILL_LIMIT", "100"))
+ENRICH_BACKFILL_PAGES = int(os.getenv("ENRICH_BACKFILL_PAGES", "10"))  # max pages read per scan
+
+KINDS = ("categorize", "describe", "embed")  # execution order within one object
+
+
+async def _offload(fn, *args):
+    # SQLite / Supabase / blob I/O stays off the event loop
+    return await asyncio.get_running_loop().run_in_executor(None, fn, *args)
+
+
+class EnrichmentQueue:
+    def __init__(self, path: str):
+        self.path = path
+        self.worker_id = uuid.uuid4().hex[:8]
+        self._lock = threading.Lock()
+        self._db = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._last_backfill = 0.0
+        self._backfill_after: Optional[Tuple[str, str]] = None  # keyset (created_at, id) of the last row scanned
+        self.completed = 0
+        self.retries = 0
+        self.failed = 0
+
+    # --- Storage ---
+
+    def _conn(self) -> sqlite3.Connection:
+        if self._db is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            # Autocommit mode: claims use explicit BEGIN IMMEDIATE across processes
+            self._db = sqlite3.connect(self.path, check_same_thread=False, timeout=30, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT, object_id TEXT NOT NULL, kind TEXT NOT NULL,"
+                " payload TEXT NOT NULL, status TEXT NOT NULL DEFAULT 'pending', attempts INTEGER NOT NULL DEFAULT 0,"
+                " not_before REAL NOT NULL DEFAULT 0, claimed_by TEXT, claimed_at REAL, last_error TEXT,"
+                " created_at REAL NOT NULL, updated_at REAL NOT NULL, UNIQUE(object_id, kind))"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS idx_jobs_due ON jobs(status, not_before)")
+        return self._db
+
+    def enqueue(self, object_id: str, kind: str, payload: Dict[str, Any]) -> bool:
+        """Add a job (no-op if this object already has one of that kind). Returns True if added."""
+        now = time.time()
+        with self._lock:
+            cur = self._conn().execute(
+                "INSERT OR IGNORE INTO jobs (object_id, kind, payload, created_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (object_id, kind, json.dumps(payload, ensure_ascii=False), now, now),
+            )
+            added = cur.rowcount > 0
+        if added and self._loop:
+            # May be called from a worker thread
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+        return added
+
+    def enqueue_object(self, row: Dict[str, Any], needs_text: bool) -> List[str]:
+        """Jobs for a freshly inserted objetos_exploracion row. Returns the kinds queued."""
+        object_id = row.get("id")
+        if not object_id:
+            return []
+        metadata = row.get("metadata") or {}
+        queued = []
+        if needs_text:
+            label = metadata.get("ai_class") or (row.get("nombre") or "").lower()
+            text_payload = {
+                "label": label,
+                "name": row.get("nombre") or label,
+                "category": row.get("tipo"),
+                "subcategory": row.get("subcategoria") or metadata.get("subcategoria"),
+                "tags": metadata.get("tags") or [],
+            }
+            for kind in ("categorize", "describe"):
+                if self.enqueue(object_id, kind, text_payload):
+                    queued.append(kind)
+        image_ref = metadata.get("image_ref")
+        if not row.get("embedding") and image_ref and image_ref.get("key"):
+            if self.enqueue(object_id, "embed", {"image_key": image_ref["key"]}):
+                queued.append("embed")
+        return queued
+
+    def _claim(self, limit: int) -> List[Dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            db = self._conn()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                db.execute(
+                    "UPDATE jobs SET status = 'pending', claimed_by = NULL"
+                    " WHERE status = 'running' AND claimed_at < ?",
+                    (now - ENRICH_JOB_TIMEOUT_S,),
+                )
+                rows = db.execute(
+                    "SELECT id, object_id, kind, payload, attempts FROM jobs"
+                    " WHERE status = 'pending' AND not_before <= ? ORDER BY id LIMIT ?",
+                    (now, limit),
+                ).fetchall()
+                if rows:
+                    db.executemany(
+                        "UPDATE jobs SET status = 'running', claimed_by = ?, claimed_at = ?, updated_at = ? WHERE id = ?",
+                        [(self.worker_id, now, now, r[0]) for r in rows],
+                    )
+                db.execute("DELETE FROM jobs WHERE status = 'done' AND updated_at < ?", (now - ENRICH_KEEP_DONE_S,))
+                db.execute("COMMIT")
+            except Exception:
+                db.execute("ROLLBACK")
+                raise
+        return [
+            {"id": r[0], "object_id": r[1], "kind": r[2], "payload": json.loads(r[3]), "attempts": r[4]}
+            for r in rows
+        ]
+
+    def _complete(self, job_id: int):
+        with self._lock:
+            self._conn().execute(
+                "UPDATE jobs SET status = 'done', last_error = NULL, updated_at = ? WHERE id = ?",
+                (time.time(), job_id),
+            )
+        self.completed += 1
+
+    def _fail(self, job: Dict[str, Any], error: str, retry_after: Optional[float] = None):
+        # Load shedding by the LLM gateway is not the job's fault: reschedule without using an attempt
+        attempts = job["attempts"] + (0 if retry_after else 1)
+        now = time.time()
+        if attempts >= ENRICH_MAX_ATTEMPTS:
+            status, not_before = "failed", 0
+            self.failed += 1
+            print(f"Enrichment {job['kind']} failed for {job['object_id']}: {error}")
+        else:
+            status, not_before = "pending", now + (retry_after or min(300, 5 * 2 ** attempts))
+            self.retries += 1
+        with self._lock:
+            self._conn().execute(
+                "UPDATE jobs SET status = ?, attempts = ?, not_before = ?, last_error = ?, claimed_by = NULL,"
+                " updated_at = ? WHERE id = ?",
+                (status, attempts, not_before, error[:500], now, job["id"]),
+            )
+
+    # --- Handlers (write results back to objetos_exploracion) ---
+
+    def _apply(self, object_id: str, descripcion: Optional[str] = None, tipo: Optional[str] = None,
+               metadata: Optional[Dict[str, Any]] = None):
+        supabase = get_service_client()
+        try:
+            supabase.rpc("apply_object_enrichment", {
+                "p_id": object_id,
+                "p_descripcion": descripcion,
+                "p_tipo": tipo,
+                "p_metadata": metadata or {},
+            }).execute()
+            return
+        except Exception as rpc_err:
+            print(f"apply_object_enrichment fallback: {rpc_err}")
+        # Migration 08 not applied yet: same rules, read-modify-write
+        res = supabase.table("objetos_exploracion").select("descripcion, tipo, metadata").eq("id", object_id).limit(1).execute()
+        if not res.data:
+            return
+        row = res.data[0]
+        current = row.get("metadata") or {}
+        patch = {k: v for k, v in (metadata or {}).items() if not (k == "description" and current.get("description"))}
+        update = {"metadata": {**current, **patch}}
+        if descripcion and not row.get("descripcion"):
+            update["descripcion"] = descripcion
+        if tipo and (row.get("tipo") or "") in ("", "object", "common", "unknown"):
+            update["tipo"] = tipo
+        supabase.table("objetos_exploracion").update(update).eq("id", object_id).execute()
+
+    async def _categorize(self, object_id: str, payload: Dict[str, Any]):
+        result = await ai_service.enrich_label(payload["label"], priority="background", strict=True)
+        category = result.get("category") if isinstance(result, dict) else None
+        if category:
+            await _offload(lambda: self._apply(object_id, tipo=category, metadata={"ai_category": category}))
+
+    async def _describe(self, object_id: str, payload: Dict[str, Any]):
+        description = await ai_service.generate_contextual_description(
+            object_name=payload["name"],
+            category=payload.get("category"),
+            subcategory=payload.get("subcategory"),
+            tags=payload.get("tags"),
+            priority="background",
+            strict=True,
+        )
+        if description:
+            await _offload(
+                lambda: self._apply(object_id, descripcion=description, metadata={"description": description})
+            )
+
+    async def _embed(self, object_id: str, payload: Dict[str, Any]):
+        image = await _offload(lambda: b"".join(blob_store.iter_range(payload["image_key"])))
+        embedding = await ai_service.generate_embedding_async(image)
+
+        def write():
+            get_service_client().table("objetos_exploracion").update({"embedding": embedding}).eq("id", object_id).execute()
+        await _offload(write)
+
+    # --- Worker ---
+
+    async def _run_object(self, jobs: List[Dict[str, Any]]):
+        handlers = {"categorize": self._categorize, "describe": self._describe, "embed": self._embed}
+        for job in sorted(jobs, key=lambda j: KINDS.index(j["kind"])):
+            try:
+                await handlers[job["kind"]](job["object_id"], job["payload"])
+            except LLMOverloaded as e:
+                await _offload(self._fail, job, str(e), e.retry_after)
+            except Exception as e:
+                # ModelNotReady, ComputePoolBusy, Ollama / Supabase errors: retry with backoff
+                await _offload(self._fail, job, str(e) or type(e).__name__)
+            else:
+                await _offload(self._complete, job["id"])
+
+    async def _run(self):
+        while True:
+            try:
+                if ENRICH_BACKFILL_INTERVAL_S and time.time() - self._last_backfill > ENRICH_BACKFILL_INTERVAL_S:
+                    self._last_backfill = time.time()
+                    await _offload(self.backfill_embeddings)
+                jobs = await _offload(self._claim, ENRICH_BATCH)
+            except Exception as e:
+                print(f"Enrichment queue error: {e}")
+                jobs = []
+            if not jobs:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=ENRICH_POLL_S)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            by_object: Dict[str, List[Dict[str, Any]]] = {}
+            for job in jobs:
+                by_object.setdefault(job["object_id"], []).append(job)
+            await asyncio.gather(*(self._run_object(group) for group in by_object.values()))
+
+    def backfill_embeddings(self) -> int:
+        """
+        Queue embed jobs for stored rows that have an image but no embedding. Returns jobs added.
+        Keyset-paginated on (created_at, id) across scans: rows already queued, or whose job
+        failed for good, are stepped over instead of filling every page. Wraps around at the end.
+        """
+        supabase = get_service_client()
+        if not supabase:
+            return 0
+        added = 0
+        for _ in range(ENRICH_BACKFILL_PAGES):
+            query = supabase.table("objetos_exploracion")\
+                .select("id, created_at, image_key:metadata->image_ref->>key")\
+                .is_("embedding", "null")\
+                .not_.is_("metadata->image_ref->>key", "null")
+            if self._backfill_after:
+                created_at, last_id = self._backfill_after
+                query = query.or_(f'created_at.gt."{created_at}",and(created_at.eq."{created_at}",id.gt.{last_id})')
+            rows = query.order("created_at").order("id").limit(ENRICH_BACKFILL_LIMIT).execute().data or []
+            for row in rows:
+                if self.enqueue(row["id"], "embed", {"image_key": row["image_key"]}):
+                    added += 1
+            if len(rows) < ENRICH_BACKFILL_LIMIT:
+                self._backfill_after = None
+                break
+            self._backfill_after = (rows[-1]["created_at"], rows[-1]["id"])
+            if added >= ENRICH_BACKFILL_LIMIT:
+                break
+        return added
+
+    def start(self):
+        if self._worker is None or self._worker.done():
+            self._loop = asyncio.get_running_loop()
+            self._wakeup = asyncio.Event()
+            self._worker = self._loop.create_task(self._run())
+
+    async def stop(self):
+        if self._worker:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+    def status(self, object_id: Optional[str] = None) -> Dict[str, Any]:
+        with self._lock:
+            db = self._conn()
+            if object_id:
+                rows = db.execute(
+                    "SELECT kind, status, attempts, last_error, updated_at FROM jobs WHERE object_id = ? ORDER BY id",
+                    (object_id,),
+                ).fetchall()
+                return {
+                    "object_id": object_id,
+                    "jobs": [
+                        {"kind": k, "status": s, "attempts": a, "error": err, "updated_at": u}
+                        for k, s, a, err, u in rows
+                    ],
+                }
+            counts = db.execute("SELECT kind, status, COUNT(*) FROM jobs GROUP BY kind, status").fetchall()
+            oldest = db.execute("SELECT MIN(created_at) FROM jobs WHERE status IN ('pending', 'running')").fetchone()[0]
+        by_kind: Dict[str, Dict[str, int]] = {}
+        for kind, status, n in counts:
+            by_kind.setdefault(kind, {})[status] = n
+        return {
+            "pending": sum(n for _, s, n in counts if s == "pending"),
+            "running": sum(n for _, s, n in counts if s == "running"),
+            "failed": sum(n for _, s, n in counts if s == "failed"),
+            "by_kind": by_kind,
+            "oldest_pending_s": round(time.time() - oldest, 1) if oldest else 0.0,
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "worker": self.worker_id,
+            "running": self._worker is not None and not self._worker.done(),
+            "completed": self.completed,
+            "retries": self.retries,
+            "failed": self.failed,
+        }
+
+
+# Global Instance
+enrichment_queue = EnrichmentQueue(ENRICH_QUEUE_PATH)
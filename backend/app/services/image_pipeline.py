@@ -0,0 +1,179 @@
+"""
+Pipeline de imágenes: un solo decode por frame.
+
+Entrada: bytes crudos (multipart / octet-stream) o base64 legado en JSON.
+process_frame() decodifica una vez (modo draft de JPEG: el decoder escala
+1/2, 1/4 o 1/8 cuando no hace falta la resolución completa) y produce a
+partir del mismo buffer el recorte, la miniatura y la entrada para CLIP.
+Cada etapa se mide y se expone en /metrics.
+"""
+
+import base64
+import hashlib
+import math
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from io import BytesIO
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from app.core.metrics import LatencyStats
+
+try:
+    from PIL import Image
+    PILLOW_AVAILABLE = True
+except ImportError:
+    PILLOW_AVAILABLE = False
+    print("Warning: Pillow not installed. Server-side cropping disabled.")
+
+ImageInput = Union[str, bytes, bytearray, None]
+
+DISPLAY_SIZE = (640, 480)
+THUMB_SIZE = (256, 256)
+CLIP_INPUT_SIZE = 224  # lado corto que espera CLIP ViT-B/32
+BBOX_PADDING = 0.1
+
+stage_stats = {stage: LatencyStats() for stage in ("decode", "crop", "encode", "clip_input")}
+
+
+def to_bytes(image: ImageInput) -> bytes:
+    """Raw bytes as-is; base64 strings (with or without data URI prefix) decoded once."""
+    if not image:
+        return b""
+    if isinstance(image, (bytes, bytearray)):
+        return bytes(image)
+    if image.startswith("data:"):
+        image = image.partition(",")[2]
+    return base64.b64decode(image)
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+@dataclass
+class Frame:
+    source_hash: str
+    region: Optional[Tuple[int, int, int, int]]  # crop box in source pixels, None = full frame
+    jpeg: bytes
+    thumb: Optional[bytes] = None
+    clip_image: Any = None  # RGB PIL image, short side CLIP_INPUT_SIZE
+    timings: Dict[str, float] = field(default_factory=dict)
+
+
+@contextmanager
+def _stage(timings: Dict[str, float], name: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        ms = (time.perf_counter() - start) * 1000
+        timings[name] = round(ms, 2)
+        stage_stats[name].observe(ms)
+
+
+def _padded_region(bbox: Optional[List[float]], width: int, height: int) -> Optional[Tuple[int, int, int, int]]:
+    """bbox [x, y, width, height] plus 10% padding, clamped to the frame."""
+    if not bbox or len(bbox) < 4:
+        return None
+    x, y, w, h = bbox[:4]
+    x1 = max(0, int(x - w * BBOX_PADDING))
+    y1 = max(0, int(y - h * BBOX_PADDING))
+    x2 = min(width, int(x + w + w * BBOX_PADDING))
+    y2 = min(height, int(y + h + h * BBOX_PADDING))
+    if x2 <= x1 or y2 <= y1:
+        return None
+    return x1, y1, x2, y2
+
+
+def _decode(data: bytes, bbox: Optional[List[float]], fit: Optional[Tuple[int, int]], short_side: int = 0):
+    """
+    Decode once at the lowest JPEG draft scale that still leaves the region big
+    enough to fill `fit` (bounding box) and `short_side`; never upscales.
+    Returns (rgb_image, region_in_source_pixels, region_in_decoded_pixels).
+    """
+    img = Image.open(BytesIO(data))
+    width, height = img.size
+    region = _padded_region(bbox, width, height)
+    rx1, ry1, rx2, ry2 = region or (0, 0, width, height)
+    rw, rh = rx2 - rx1, ry2 - ry1
+    scale = 0.0
+    if fit:
+        scale = max(scale, min(fit[0] / rw, fit[1] / rh))
+    if short_side:
+        scale = max(scale, short_side / min(rw, rh))
+    if img.format == "JPEG" and scale < 1.0:
+        img.draft("RGB", (math.ceil(width * scale), math.ceil(height * scale)))
+    img = img.convert("RGB")
+    sx, sy = img.width / width, img.height / height
+    x1, y1 = int(rx1 * sx), int(ry1 * sy)
+    box = (x1, y1, max(x1 + 1, int(rx2 * sx)), max(y1 + 1, int(ry2 * sy)))
+    return img, region, box
+
+
+def _clip_input(img):
+    short = min(img.width, img.height)
+    if short <= CLIP_INPUT_SIZE:
+        return img
+    ratio = CLIP_INPUT_SIZE / short
+    return img.resize((max(1, round(img.width * ratio)), max(1, round(img.height * ratio))), Image.Resampling.BICUBIC)
+
+
+def _jpeg(img, quality: int) -> bytes:
+    buffer = BytesIO()
+    img.save(buffer, format="JPEG", quality=quality)
+    return buffer.getvalue()
+
+
+def process_frame(image: ImageInput, bbox: Optional[List[float]] = None, clip: bool = True) -> Optional[Frame]:
+    """
+    Decode a frame once and derive everything an object needs from it:
+    display JPEG (cropped to bbox, max 640x480), thumbnail JPEG and the CLIP
+    input for that same crop. Undecodable input is kept as-is (no variants).
+    """
+    data = to_bytes(image)
+    if not data:
+        return None
+    frame = Frame(source_hash=content_hash(data), region=None, jpeg=data)
+    if not PILLOW_AVAILABLE:
+        return frame  # Store original if can't process
+
+    try:
+        with _stage(frame.timings, "decode"):
+            img, region, box = _decode(data, bbox, DISPLAY_SIZE, CLIP_INPUT_SIZE if clip else 0)
+
+        with _stage(frame.timings, "crop"):
+            if region:
+                img = img.crop(box)
+
+        # From the crop itself, before the display resize can shrink thin crops below 224px
+        if clip:
+            with _stage(frame.timings, "clip_input"):
+                clip_image = _clip_input(img)
+                frame.clip_image = clip_image.copy() if clip_image is img else clip_image
+
+        with _stage(frame.timings, "encode"):
+            if img.width > DISPLAY_SIZE[0] or img.height > DISPLAY_SIZE[1]:
+                img.thumbnail(DISPLAY_SIZE, Image.Resampling.LANCZOS)
+            jpeg = _jpeg(img, 80)
+            thumb = img.copy()
+            thumb.thumbnail(THUMB_SIZE, Image.Resampling.LANCZOS)
+            thumb_jpeg = _jpeg(thumb, 70)
+
+        frame.region, frame.jpeg, frame.thumb = region, jpeg, thumb_jpeg
+    except Exception as e:
+        print(f"Crop error: {e}")
+    return frame
+
+
+def decode_for_clip(data: bytes):
+    """Full-frame CLIP input (embedding / similarity endpoints), draft-decoded near 224px."""
+    timings = {}
+    with _stage(timings, "decode"):
+        img, _, _ = _decode(data, None, None, CLIP_INPUT_SIZE)
+    with _stage(timings, "clip_input"):
+        return _clip_input(img)
+
+
+def stats() -> dict:
+    return {stage: s.snapshot() for stage, s in stage_stats.items()}
@@ -0,0 +1,202 @@
+"""
+Servidor de inferencia compartido (opcional) para despliegues con varios workers.
+
+Con `uvicorn --workers N` cada proceso cargaría su propia copia de CLIP. En su
+lugar, un único proceso mantiene el modelo, agrupa en micro-batches las
+peticiones de todos los workers y es dueño del presupuesto de hilos de CPU; los
+workers le envían la entrada CLIP ya preprocesada por un socket Unix local.
+
+    python -m app.services.inference_server            # proceso de inferencia
+    INFERENCE_SOCKET=./data/inference.sock uvicorn app.main:app --workers 4
+
+Protocolo (ambas direcciones), por trama:
+    u32 header_len | header JSON | u32 body_len | body
+    encode: header {"op": "encode", "sizes": [[w, h], ...]}, body = RGB crudo concatenado
+            -> {"ok": true, "count": n, "dim": d}, body = float32 (little endian) n*d
+    info:   -> {"ok": true, "model": ..., "backend": ...}
+    error:  -> {"ok": false, "error": "...", "busy": bool}
+"""
+
+import asyncio
+import json
+import os
+import socket
+import struct
+import threading
+from typing import List, Optional, Tuple
+
+# Lado API: si está definido, los workers usan el servidor en lugar de cargar CLIP
+INFERENCE_SOCKET = os.getenv("INFERENCE_SOCKET", "")
+INFERENCE_TIMEOUT_S = float(os.getenv("INFERENCE_TIMEOUT_S", "30"))
+
+_U32 = struct.Struct("!I")
+
+
+def _pack(header: dict, body: bytes = b"") -> bytes:
+    raw = json.dumps(header).encode()
+    return _U32.pack(len(raw)) + raw + _U32.pack(len(body)) + body
+
+
+class InferenceError(Exception):
+    def __init__(self, message: str, busy: bool = False):
+        super().__init__(message)
+        self.busy = busy
+
+
+# ---------------------------------------------------------------------------
+# Cliente (lado worker de la API): una conexión persistente, reconexión perezosa
+# ---------------------------------------------------------------------------
+
+class InferenceClient:
+    def __init__(self, path: str, timeout: float = INFERENCE_TIMEOUT_S):
+        self.path = path
+        self.timeout = timeout
+        self._sock: Optional[socket.socket] = None
+        self._lock = threading.Lock()
+
+    def _recv_exact(self, n: int) -> bytes:
+        chunks, remaining = [], n
+        while remaining:
+            chunk = self._sock.recv(min(remaining, 1 << 20))
+            if not chunk:
+                raise ConnectionError("Inference server closed the connection")
+            chunks.append(chunk)
+            remaining -= len(chunk)
+        return b"".join(chunks)
+
+    def _call_once(self, header: dict, body: bytes) -> Tuple[dict, bytes]:
+        if self._sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            sock.connect(self.path)
+            self._sock = sock
+        self._sock.sendall(_pack(header, body))
+        reply = json.loads(self._recv_exact(_U32.unpack(self._recv_exact(4))[0]))
+        payload = self._recv_exact(_U32.unpack(self._recv_exact(4))[0])
+        return reply, payload
+
+    def call(self, header: dict, body: bytes = b"") -> Tuple[dict, bytes]:
+        with self._lock:
+            try:
+                reply, payload = self._call_once(header, body)
+            except socket.timeout:
+                self.close()  # stream is out of sync now
+                raise
+            except OSError:
+                # Server restarted: drop the socket and retry once on a fresh connection
+                self.close()
+                try:
+                    reply, payload = self._call_once(header, body)
+                except Exception:
+                    self.close()
+                    raise
+        if not reply.get("ok"):
+            raise InferenceError(reply.get("error", "inference failed"), busy=reply.get("busy", False))
+        return reply, payload
+
+    def info(self) -> dict:
+        return self.call({"op": "info"})[0]
+
+    def encode(self, images: list) -> List[List[float]]:
+        import numpy as np
+        rgb = [img.convert("RGB") for img in images]
+        header = {"op": "encode", "sizes": [[img.width, img.height] for img in rgb]}
+        reply, payload = self.call(header, b"".join(img.tobytes() for img in rgb))
+        vectors = np.frombuffer(payload, dtype="<f4").reshape(reply["count"], reply["dim"])
+        return vectors.tolist()
+
+    def close(self):
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            finally:
+                self._sock = None
+
+
+# ---------------------------------------------------------------------------
+# Servidor
+# ---------------------------------------------------------------------------
+
+class InferenceServer:
+    def __init__(self, path: str):
+        # Imported after load_dotenv() so .env tunables apply
+        from PIL import Image
+        from app.services.embedding_batcher import EmbeddingBatcher
+        from app.services.vision_backends import VISION_BACKEND, VISION_MODEL_NAME, create_encoder
+
+        self.path = path
+        threads = int(os.getenv("INFERENCE_THREADS", "0"))  # 0 = library default
+        if threads and VISION_BACKEND == "torch":
+            import torch
+            torch.set_num_threads(threads)
+        self.model_name = VISION_MODEL_NAME
+        self.encoder = create_encoder(VISION_MODEL_NAME, VISION_BACKEND)
+        # One batcher for every API worker: batches form across processes
+        self.batcher = EmbeddingBatcher(
+            self.encoder.encode,
+            window_ms=float(os.getenv("EMBED_BATCH_WINDOW_MS", "5")),
+            max_batch=int(os.getenv("EMBED_MAX_BATCH", "16")),
+            max_queue=int(os.getenv("INFERENCE_MAX_QUEUE", "512")),
+        )
+        self.encoder.encode([Image.new("RGB", (224, 224), (128, 128, 128))])  # warmup
+
+    async def _encode(self, header: dict, body: bytes) -> Tuple[dict, bytes]:
+        import numpy as np
+        from PIL import Image
+        from app.services.compute_pool import ComputePoolBusy
+
+        images, offset = [], 0
+        for w, h in header["sizes"]:
+            size = w * h * 3
+            images.append(Image.frombytes("RGB", (w, h), body[offset:offset + size]))
+            offset += size
+        try:
+            futures = [asyncio.wrap_future(self.batcher.submit(img)) for img in images]
+        except ComputePoolBusy as e:
+            return {"ok": False, "error": str(e), "busy": True}, b""
+        vectors = np.asarray(await asyncio.gather(*futures), dtype="<f4")
+        return {"ok": True, "count": len(images), "dim": int(vectors.shape[1])}, vectors.tobytes()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    header = json.loads(await reader.readexactly(_U32.unpack(await reader.readexactly(4))[0]))
+                    body = await reader.readexactly(_U32.unpack(await reader.readexactly(4))[0])
+                except asyncio.IncompleteReadError:
+                    break
+                try:
+                    if header.get("op") == "encode":
+                        reply, payload = await self._encode(header, body)
+                    elif header.get("op") == "info":
+                        reply, payload = {"ok": True, "model": self.model_name, "backend": self.encoder.backend,
+                                          "stats": self.batcher.stats()}, b""
+                    else:
+                        reply, payload = {"ok": False, "error": f"unknown op {header.get('op')}"}, b""
+                except Exception as e:
+                    print(f"Inference error: {e}")
+                    reply, payload = {"ok": False, "error": str(e)}, b""
+                writer.write(_pack(reply, payload))
+                await writer.drain()
+        finally:
+            writer.close()
+
+    async def serve(self):
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        server = await asyncio.start_unix_server(self._handle, path=self.path)
+        print(f"Inference server: {self.model_name} ({self.encoder.backend}) on {self.path}")
+        async with server:
+            await server.serve_forever()
+
+
+def main():
+    from dotenv import load_dotenv
+    load_dotenv()
+    path = os.getenv("INFERENCE_SOCKET") or "./data/inference.sock"
+    asyncio.run(InferenceServer(path).serve())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Caché de resultados del LLM (enrich-data / contextual-description).
+
+Las mismas etiquetas de YOLO ("person", "chair", "car") llegan una y otra vez;
+la respuesta de Llama 3 para una misma entrada se reutiliza. Nivel 1: LRU en
+memoria con TTL. Nivel 2 (opcional): SQLite en disco, acotado a
+disk_max_entries filas (ver app.core.disk_cache). Además, single-flight:
+N peticiones concurrentes para la misma clave esperan una sola inferencia.
+"""
+
+import asyncio
+import hashlib
+import json
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from app.core.disk_cache import TieredCache
+
+
+def cache_key(kind: str, model: str, **fields) -> str:
+    """Stable key over normalized inputs (case/whitespace-insensitive, tags as a set)."""
+    normalized = {}
+    for name, value in fields.items():
+        if isinstance(value, str):
+            value = " ".join(value.lower().split())
+        elif isinstance(value, (list, tuple)):
+            value = sorted({" ".join(str(v).lower().split()) for v in value})
+        normalized[name] = value
+    raw = json.dumps([kind, model, normalized], sort_keys=True, ensure_ascii=False)
+    return f"{kind}:{hashlib.sha256(raw.encode()).hexdigest()}"
+
+
+class LLMResultCache(TieredCache):
+    def __init__(self, max_entries: int = 2048, ttl_seconds: float = 0, disk_path: Optional[str] = None,
+                 disk_max_entries: int = 0):
+        super().__init__(
+            "llm_results", "value",
+            lambda value: json.dumps(value, ensure_ascii=False),
+            json.loads,
+            max_entries=max_entries,
+            ttl_seconds=ttl_seconds,
+            disk_path=disk_path,
+            disk_max_entries=disk_max_entries,
+            name="LLM cache",
+        )
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.coalesced = 0
+
+    async def get_or_compute(self, key: str, factory: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Cached value, or one shared factory() run for all concurrent callers of `key`.
+        The run is its own task: a caller disconnecting does not cancel it for the rest.
+        Exceptions reach every waiter and are not cached.
+        """
+        pending = self._inflight.get(key)
+        if pending is None:
+            loop = asyncio.get_running_loop()
+            value = await loop.run_in_executor(None, self.get, key)
+            if value is not None:
+                return value
+            pending = self._inflight.get(key)  # another caller may have started meanwhile
+            if pending is None:
+                pending = asyncio.ensure_future(self._compute(key, factory))
+                self._inflight[key] = pending
+                pending.add_done_callback(lambda _: self._inflight.pop(key, None))
+                return await asyncio.shield(pending)
+        with self._lock:
+            self.coalesced += 1
+        return await asyncio.shield(pending)
+
+    async def _compute(self, key: str, factory: Callable[[], Awaitable[Any]]) -> Any:
+        value = await factory()
+        await asyncio.get_running_loop().run_in_executor(None, self.put, key, value)
+        return value
+
+    def stats(self) -> dict:
+        stats = super().stats()
+        with self._lock:
+            stats["coalesced"] = self.coalesced
+            stats["inflight"] = len(self._inflight)
+        return stats
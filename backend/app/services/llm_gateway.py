@@ -0,0 +1,238 @@
+"""
+Gateway central hacia la instancia local de Ollama.
+
+Chat, títulos, enrich-data y descripciones contextuales comparten un único
+Ollama: sin coordinación, el trabajo de fondo puede dejar sin turno al chat
+interactivo. Todas las llamadas pasan por aquí:
+
+  - Clases de prioridad (interactive < enrichment < background): cuando se
+    libera un hueco lo toma la petición en cola de mayor prioridad.
+  - LLM_MAX_IN_FLIGHT: peticiones simultáneas hacia Ollama.
+  - Deadline de espera por clase: si la espera estimada lo supera se rechaza
+    al momento (503); si la cola de la clase está llena, 429.
+  - Métricas por clase: profundidad de cola, espera, TTFT, tokens/s.
+"""
+
+import asyncio
+import heapq
+import itertools
+import os
+import time
+from collections import deque
+from typing import AsyncIterator, Dict, List, Optional
+
+from app.core.metrics import LatencyStats
+
+LLM_MAX_IN_FLIGHT = int(os.getenv("LLM_MAX_IN_FLIGHT", "1"))
+LLM_MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", "32"))  # per priority class
+
+# Lower value = served first; deadline = longest acceptable queue wait
+PRIORITIES = {"interactive": 0, "enrichment": 1, "background": 2}
+DEADLINES_S = {
+    "interactive": float(os.getenv("LLM_DEADLINE_INTERACTIVE_S", "30")),
+    "enrichment": float(os.getenv("LLM_DEADLINE_ENRICHMENT_S", "15")),
+    "background": float(os.getenv("LLM_DEADLINE_BACKGROUND_S", "300")),
+}
+
+
+class LLMOverloaded(Exception):
+    """Ollama is saturated for this priority class; answer status_code with Retry-After."""
+
+    def __init__(self, message: str, status_code: int = 503, retry_after: int = 5):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+def _field(response, name: str):
+    # ollama returns dicts (<0.4) or subscriptable models (>=0.4)
+    try:
+        return response[name]
+    except (KeyError, TypeError):
+        return None
+
+
+class _ClassStats:
+    def __init__(self):
+        self.queued = 0
+        self.in_flight = 0
+        self.served = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.wait = LatencyStats()
+        self.ttft = LatencyStats()
+        self.run = LatencyStats()
+        self._rates = deque(maxlen=256)  # generated tokens/s per request
+
+    def snapshot(self) -> dict:
+        rates = sorted(self._rates)
+        return {
+            "queue_depth": self.queued,
+            "in_flight": self.in_flight,
+            "served": self.served,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "wait": self.wait.snapshot(),
+            "ttft": self.ttft.snapshot(),
+            "run": self.run.snapshot(),
+            "tokens_per_s": {
+                "avg": round(sum(rates) / len(rates), 2) if rates else 0.0,
+                "p50": round(rates[len(rates) // 2], 2) if rates else 0.0,
+            },
+        }
+
+
+class LLMGateway:
+    def __init__(self, max_in_flight: int = 1, max_queue: int = 32):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self._in_flight = 0
+        self._waiters = []  # heap of (priority, seq, future)
+        self._seq = itertools.count()
+        self._avg_service_s = 5.0  # EWMA of request duration, seeds the wait estimate
+        self._client = None
+        self._stats: Dict[str, _ClassStats] = {name: _ClassStats() for name in PRIORITIES}
+
+    def _ollama(self):
+        if self._client is None:
+            import ollama
+            host = os.getenv("OLLAMA_URL") or os.getenv("OLLAMA_HOST", "http://127.0.0.1:11434")
+            self._client = ollama.AsyncClient(host=host)
+        return self._client
+
+    # --- Admission / scheduling ---
+
+    def estimated_wait_s(self, priority: str) -> float:
+        rank = PRIORITIES[priority]
+        ahead = sum(1 for p, _, f in self._waiters if p <= rank and not f.done())
+        if self._in_flight < self.max_in_flight and not self._pending_waiters():
+            return 0.0
+        return (ahead + 1) * self._avg_service_s / self.max_in_flight
+
+    def admit(self, priority: str, deadline_s: Optional[float] = None):
+        """
+        Raise LLMOverloaded now if this request could not start within its deadline.
+        Returns the deadline; pass it to stream_chat(admission=...) to run the admitted request.
+        """
+        stats = self._stats[priority]
+        deadline = DEADLINES_S[priority] if deadline_s is None else deadline_s
+        if stats.queued >= self.max_queue:
+            stats.rejected += 1
+            raise LLMOverloaded(f"LLM queue full for {priority} ({stats.queued} waiting)", 429,
+                                retry_after=max(1, int(self._avg_service_s)))
+        estimate = self.estimated_wait_s(priority)
+        if estimate > deadline:
+            stats.rejected += 1
+            raise LLMOverloaded(f"LLM busy: estimated wait {estimate:.0f}s exceeds {deadline:.0f}s", 503,
+                                retry_after=max(1, int(estimate)))
+        return deadline
+
+    async def _acquire(self, priority: str, deadline: float):
+        stats = self._stats[priority]
+        submitted = time.perf_counter()
+        if self._in_flight < self.max_in_flight and not self._pending_waiters():
+            self._in_flight += 1
+        else:
+            future = asyncio.get_running_loop().create_future()
+            heapq.heappush(self._waiters, (PRIORITIES[priority], next(self._seq), future))
+            stats.queued += 1
+            try:
+                await asyncio.wait_for(asyncio.shield(future), timeout=deadline)
+            except BaseException as e:
+                granted = future.done() and not future.cancelled()
+                if not granted:
+                    future.cancel()
+                    if isinstance(e, asyncio.TimeoutError):
+                        stats.timed_out += 1
+                        raise LLMOverloaded(f"LLM queue wait exceeded {deadline:.0f}s ({priority})", 503)
+                    raise
+                if not isinstance(e, asyncio.TimeoutError):
+                    self._release()  # cancelled right after being granted: pass the slot on
+                    raise
+            finally:
+                stats.queued -= 1
+        stats.in_flight += 1
+        stats.wait.observe((time.perf_counter() - submitted) * 1000)
+
+    def _pending_waiters(self) -> bool:
+        # Drop waiters that timed out / were cancelled so they don't block the fast path
+        if any(f.done() for _, _, f in self._waiters):
+            self._waiters = [w for w in self._waiters if not w[2].done()]
+            heapq.heapify(self._waiters)
+        return bool(self._waiters)
+
+    def _release(self):
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                future.set_result(None)  # slot passes straight to the next waiter
+                return
+        self._in_flight -= 1
+
+    def _finish(self, priority: str, started: float, failed: bool, response=None, ttft_ms: Optional[float] = None):
+        stats = self._stats[priority]
+        stats.in_flight -= 1
+        elapsed = time.perf_counter() - started
+        stats.run.observe(elapsed * 1000, error=failed)
+        self._release()
+        if failed:
+            return
+        stats.served += 1
+        self._avg_service_s = 0.8 * self._avg_service_s + 0.2 * elapsed
+        if response is not None:
+            if ttft_ms is None:
+                load_ns = (_field(response, "load_duration") or 0) + (_field(response, "prompt_eval_duration") or 0)
+                ttft_ms = load_ns / 1e6 if load_ns else None
+            eval_count, eval_ns = _field(response, "eval_count"), _field(response, "eval_duration")
+            if eval_count and eval_ns:
+                stats._rates.append(eval_count / (eval_ns / 1e9))
+        if ttft_ms is not None:
+            stats.ttft.observe(ttft_ms)
+
+    # --- Public API ---
+
+    async def chat(self, model: str, messages: List[Dict[str, str]], priority: str = "interactive",
+                   deadline_s: Optional[float] = None, **kwargs):
+        """ollama chat() behind the scheduler. Raises LLMOverloaded instead of queueing past the deadline."""
+        deadline = self.admit(priority, deadline_s)
+        await self._acquire(priority, deadline)
+        started, failed, response = time.perf_counter(), True, None
+        try:
+            response = await self._ollama().chat(model=model, messages=messages, **kwargs)
+            failed = False
+            return response
+        finally:
+            self._finish(priority, started, failed, response)
+
+    async def stream_chat(self, model: str, messages: List[Dict[str, str]], priority: str = "interactive",
+                          deadline_s: Optional[float] = None, admission: Optional[float] = None,
+                          **kwargs) -> AsyncIterator:
+        """
+        Streaming chat(); the slot is held until the stream ends or the consumer stops.
+        admission: value of an earlier admit() for this request, which is then not admitted again.
+        """
+        deadline = self.admit(priority, deadline_s) if admission is None else admission
+        await self._acquire(priority, deadline)
+        started, failed, last, ttft_ms = time.perf_counter(), True, None, None
+        try:
+            async for chunk in await self._ollama().chat(model=model, messages=messages, stream=True, **kwargs):
+                if ttft_ms is None and chunk['message']['content']:
+                    ttft_ms = (time.perf_counter() - started) * 1000
+                last = chunk
+                yield chunk
+            failed = False
+        finally:
+            self._finish(priority, started, failed, last, ttft_ms)
+
+    def stats(self) -> dict:
+        return {
+            "max_in_flight": self.max_in_flight,
+            "in_flight": self._in_flight,
+            "queue_depth": sum(1 for _, _, f in self._waiters if not f.done()),
+            "avg_service_s": round(self._avg_service_s, 2),
+            "classes": {name: stats.snapshot() for name, stats in self._stats.items()},
+        }
+
+
+# Global Instance
+llm_gateway = LLMGateway(max_in_flight=LLM_MAX_IN_FLIGHT, max_queue=LLM_MAX_QUEUE)
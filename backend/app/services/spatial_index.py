@@ -0,0 +1,140 @@
+"""
+Motor de consultas espaciales por teselas geohash para /api/objects/nearby.
+
+Para un radio dado se elige la precisión de geohash cuya celda cubre el radio,
+se piden la tesela central y sus 8 vecinas (cada una cacheada por separado) y
+se filtra/ordena por distancia en Python. Un cliente AR que se desplaza
+reutiliza casi todas las teselas de la consulta anterior.
+
+Radios demasiado grandes para las teselas (o teselas saturadas) van directo a
+search_nearby_objects_v3 (bbox + ST_DWithin + ORDER BY distancia + LIMIT).
+"""
+
+import math
+import os
+from typing import Dict, List, Optional, Tuple
+
+from app.core.cache import TTLCache
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+EARTH_RADIUS_M = 6371008.8
+METERS_PER_DEG_LAT = 111320.0
+
+# Precisión almacenada en la columna geohash (ver migración 05)
+STORED_PRECISION = 7
+MIN_TILE_PRECISION = 4
+TILE_MAX_ROWS = int(os.getenv("NEARBY_TILE_MAX_ROWS", "500"))
+TILE_TTL = float(os.getenv("NEARBY_TILE_TTL", "30"))
+
+tile_cache = TTLCache(ttl_seconds=TILE_TTL, max_entries=int(os.getenv("NEARBY_TILE_CACHE_SIZE", "2048")))
+
+
+def geohash_encode(lat: float, lng: float, precision: int) -> str:
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, bit_count, even = [], 0, 0, True
+    while len(chars) < precision:
+        rng, value = (lng_range, lng) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        if value >= mid:
+            bits = (bits << 1) | 1
+            rng[0] = mid
+        else:
+            bits <<= 1
+            rng[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_BASE32[bits])
+            bits, bit_count = 0, 0
+    return "".join(chars)
+
+
+def cell_size_deg(precision: int) -> Tuple[float, float]:
+    """(lat_degrees, lng_degrees) of a geohash cell."""
+    total_bits = precision * 5
+    lng_bits = (total_bits + 1) // 2
+    lat_bits = total_bits // 2
+    return 180.0 / (1 << lat_bits), 360.0 / (1 << lng_bits)
+
+
+def cell_size_m(precision: int, lat: float) -> Tuple[float, float]:
+    dlat, dlng = cell_size_deg(precision)
+    return dlat * METERS_PER_DEG_LAT, dlng * METERS_PER_DEG_LAT * max(math.cos(math.radians(lat)), 0.01)
+
+
+def precision_for_radius(lat: float, radius_m: float) -> Optional[int]:
+    """Finest precision whose cell is at least as large as the radius (3x3 tiles then cover the circle)."""
+    for precision in range(STORED_PRECISION, MIN_TILE_PRECISION - 1, -1):
+        if min(cell_size_m(precision, lat)) >= radius_m:
+            return precision
+    return None
+
+
+def covering_tiles(lat: float, lng: float, precision: int) -> List[str]:
+    dlat, dlng = cell_size_deg(precision)
+    tiles = []
+    for i in (-1, 0, 1):
+        for j in (-1, 0, 1):
+            tlat = max(-89.999999, min(89.999999, lat + i * dlat))
+            tlng = ((lng + j * dlng + 180.0) % 360.0) - 180.0
+            tile = geohash_encode(tlat, tlng, precision)
+            if tile not in tiles:
+                tiles.append(tile)
+    return tiles
+
+
+def haversine_m(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp, dl = p2 - p1, math.radians(lng2 - lng1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
+
+
+def _fetch_tile(supabase, tile: str) -> Optional[List[Dict]]:
+    """Rows of a tile (cached). None if the tile is saturated (caller should go direct)."""
+    rows = tile_cache.get(tile)
+    if rows is None:
+        rows = supabase.rpc("get_objects_in_tile", {"p_geohash": tile, "max_results": TILE_MAX_ROWS + 1}).execute().data or []
+        tile_cache.set(tile, rows)
+    return None if len(rows) > TILE_MAX_ROWS else rows
+
+
+def _search_direct(supabase, lat: float, lng: float, radius: float, limit: int) -> List[Dict]:
+    return supabase.rpc("search_nearby_objects_v3", {
+        "p_lat": lat,
+        "p_lng": lng,
+        "radius_meters": radius,
+        "max_results": limit
+    }).execute().data or []
+
+
+def nearby(supabase, lat: float, lng: float, radius: float, limit: int) -> List[Dict]:
+    """Objects within `radius` meters, nearest first, at most `limit`."""
+    precision = precision_for_radius(lat, radius)
+    if precision is None:
+        return _search_direct(supabase, lat, lng, radius, limit)
+
+    results = []
+    for tile in covering_tiles(lat, lng, precision):
+        rows = _fetch_tile(supabase, tile)
+        if rows is None:
+            return _search_direct(supabase, lat, lng, radius, limit)
+        for row in rows:
+            if row.get("lat") is None or row.get("lng") is None:
+                continue
+            distance = haversine_m(lat, lng, row["lat"], row["lng"])
+            if distance <= radius:
+                results.append({**row, "distance": distance})
+
+    results.sort(key=lambda r: r["distance"])
+    return results[:limit]
+
+
+def invalidate_point(lat: float, lng: float):
+    """Drop every cached tile (all precisions) containing this point."""
+    for precision in range(MIN_TILE_PRECISION, STORED_PRECISION + 1):
+        tile_cache.invalidate(geohash_encode(lat, lng, precision))
+
+
+def invalidate_all():
+    tile_cache.invalidate()
@@ -0,0 +1,122 @@
+"""
+Backends de inferencia para el encoder visual CLIP.
+
+- torch:     sentence-transformers (PyTorch fp32), el comportamiento original
+- onnx:      ONNX Runtime fp32 (mismo grafo exportado, sin PyTorch en runtime)
+- onnx-int8: ONNX Runtime con cuantización dinámica int8 de las capas lineales
+
+Los modelos ONNX se generan con scripts/export_clip_onnx.py y se validan con
+scripts/check_clip_parity.py (deriva coseno frente a PyTorch).
+"""
+
+import os
+from typing import List
+
+VISION_MODEL_NAME = 'clip-ViT-B-32'
+VISION_BACKEND = os.getenv("VISION_BACKEND", "torch").lower()
+VISION_ONNX_DIR = os.getenv("VISION_ONNX_DIR", "./data/onnx")
+VISION_ONNX_THREADS = int(os.getenv("VISION_ONNX_THREADS", "0"))  # 0 = ORT default
+
+BACKENDS = ("torch", "onnx", "onnx-int8")
+ONNX_FILES = {"onnx": "clip_visual_fp32.onnx", "onnx-int8": "clip_visual_int8.onnx"}
+
+# Preprocesado de CLIPProcessor (openai/clip-vit-base-patch32)
+CLIP_SIZE = 224
+CLIP_MEAN = (0.48145466, 0.4578275, 0.40821073)
+CLIP_STD = (0.26862954, 0.26130258, 0.27577711)
+
+
+def onnx_path(backend: str, onnx_dir: str = VISION_ONNX_DIR) -> str:
+    return os.path.join(onnx_dir, ONNX_FILES[backend])
+
+
+class TorchClipEncoder:
+    backend = "torch"
+
+    def __init__(self, model_name: str):
+        import torch
+        from sentence_transformers import SentenceTransformer
+        self._torch = torch
+        self.device = 'cuda' if torch.cuda.is_available() else 'cpu'
+        self.model = SentenceTransformer(model_name, device=self.device)
+        self.model.max_seq_length = 512
+
+    def encode(self, images: list) -> List[List[float]]:
+        with self._torch.no_grad():
+            embeddings = self.model.encode(
+                images,
+                convert_to_numpy=True,
+                show_progress_bar=False,
+                batch_size=len(images)
+            )
+        return [e.tolist() for e in embeddings]
+
+
+class OnnxClipEncoder:
+    """Vision tower + projection exported to ONNX; preprocessing mirrors CLIPProcessor in numpy."""
+
+    def __init__(self, backend: str, path: str):
+        import numpy as np
+        import onnxruntime as ort
+        from PIL import Image
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"{path} not found (run scripts/export_clip_onnx.py)")
+        self._np = np
+        self._resample = Image.Resampling.BICUBIC
+        self.backend = backend
+        self.device = 'cpu'
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if VISION_ONNX_THREADS:
+            options.intra_op_num_threads = VISION_ONNX_THREADS
+        self.session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+        self._mean = np.array(CLIP_MEAN, dtype=np.float32).reshape(1, 1, 3)
+        self._std = np.array(CLIP_STD, dtype=np.float32).reshape(1, 1, 3)
+
+    def _preprocess(self, image):
+        np = self._np
+        image = image.convert("RGB")
+        # Resize shortest side to 224 (bicubic), center crop 224x224
+        scale = CLIP_SIZE / min(image.width, image.height)
+        w, h = max(CLIP_SIZE, round(image.width * scale)), max(CLIP_SIZE, round(image.height * scale))
+        image = image.resize((w, h), self._resample)
+        left, top = (w - CLIP_SIZE) // 2, (h - CLIP_SIZE) // 2
+        image = image.crop((left, top, left + CLIP_SIZE, top + CLIP_SIZE))
+        pixels = (np.asarray(image, dtype=np.float32) / 255.0 - self._mean) / self._std
+        return pixels.transpose(2, 0, 1)
+
+    def encode(self, images: list) -> List[List[float]]:
+        batch = self._np.stack([self._preprocess(img) for img in images])
+        embeddings = self.session.run(None, {self.input_name: batch})[0]
+        return [e.tolist() for e in embeddings]
+
+
+class RemoteClipEncoder:
+    """Encoder living in the shared inference server (app.services.inference_server)."""
+    device = "remote"
+
+    def __init__(self, path: str):
+        from app.services.inference_server import InferenceClient
+        self.client = InferenceClient(path)
+        info = self.client.info()
+        # Server's backend, so cache namespaces match a local encoder of the same kind
+        self.backend = info["backend"]
+
+    def encode(self, images: list) -> List[List[float]]:
+        from app.services.compute_pool import ComputePoolBusy
+        from app.services.inference_server import InferenceError
+        try:
+            return self.client.encode(images)
+        except InferenceError as e:
+            if e.busy:
+                raise ComputePoolBusy(str(e))
+            raise
+
+
+def create_encoder(model_name: str, backend: str = VISION_BACKEND):
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown VISION_BACKEND '{backend}' (expected one of {', '.join(BACKENDS)})")
+    if backend == "torch":
+        return TorchClipEncoder(model_name)
+    return OnnxClipEncoder(backend, onnx_path(backend))
@@ -0,0 +1,70 @@
+-- ============================================
+-- ÍNDICE ANN PARA EMBEDDINGS (pgvector >= 0.5.0)
+-- search_similar_objects ordena por distancia coseno (<=>), así que el índice
+-- usa vector_cosine_ops. Sin él, /api/search-similar hace un full scan.
+-- ============================================
+
+CREATE INDEX IF NOT EXISTS idx_obj_embedding_hnsw
+    ON objetos_exploracion
+    USING hnsw (embedding vector_cosine_ops)
+    WITH (m = 16, ef_construction = 64);
+
+-- Alternativa IVFFlat (construcción más rápida, menos memoria; crear tras cargar datos,
+-- lists ≈ filas / 1000):
+-- CREATE INDEX IF NOT EXISTS idx_obj_embedding_ivfflat
+--     ON objetos_exploracion
+--     USING ivfflat (embedding vector_cosine_ops)
+--     WITH (lists = 100);
+
+-- ============================================
+-- search_similar_objects con recall ajustable
+-- ef_search: candidatos explorados por HNSW (más = mejor recall, más lento)
+-- probes:    listas visitadas por IVFFlat
+-- El ORDER BY ... LIMIT interno es lo que permite usar el índice; el umbral
+-- se aplica después sobre los k mejores (mismo resultado que antes).
+-- ============================================
+
+DROP FUNCTION IF EXISTS search_similar_objects(vector, float, int);
+
+CREATE OR REPLACE FUNCTION search_similar_objects(
+    query_embedding vector(512),
+    match_threshold float DEFAULT 0.75,
+    match_count int DEFAULT 3,
+    ef_search int DEFAULT 40,
+    probes int DEFAULT 10
+)
+RETURNS TABLE (
+    id uuid,
+    nombre text,
+    tipo text,
+    lat float,
+    lng float,
+    metadata jsonb,
+    similarity float
+)
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    -- Locales a la transacción de la llamada RPC
+    PERFORM set_config('hnsw.ef_search', GREATEST(ef_search, match_count)::text, true);
+    PERFORM set_config('ivfflat.probes', GREATEST(probes, 1)::text, true);
+
+    RETURN QUERY
+    SELECT c.id, c.nombre, c.tipo, c.lat, c.lng, c.metadata, c.similarity
+    FROM (
+        SELECT
+            o.id,
+            o.nombre,
+            o.tipo,
+            ST_Y(o.posicion::geometry) as lat,
+            ST_X(o.posicion::geometry) as lng,
+            o.metadata,
+            1 - (o.embedding <=> query_embedding) as similarity
+        FROM objetos_exploracion o
+        WHERE o.embedding IS NOT NULL
+        ORDER BY o.embedding <=> query_embedding
+        LIMIT match_count
+    ) c
+    WHERE c.similarity > match_threshold;
+END;
+$$;
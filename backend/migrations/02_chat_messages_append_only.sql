@@ -0,0 +1,106 @@
+-- ============================================
+-- MENSAJES DE CHAT APPEND-ONLY
+-- Antes cada turno leía y reescribía todo chat_logs.messages (O(n²) bytes en
+-- la vida de una conversación) y /api/chat/history descargaba todos los
+-- mensajes solo para un preview de 50 caracteres.
+-- Ahora: una fila por mensaje + columnas desnormalizadas en chat_logs.
+-- chat_logs.messages queda como legado (solo lectura, ya no se escribe).
+-- ============================================
+
+CREATE TABLE IF NOT EXISTS public.chat_messages (
+    id BIGSERIAL PRIMARY KEY,
+    chat_id UUID NOT NULL REFERENCES public.chat_logs(id) ON DELETE CASCADE,
+    user_id UUID REFERENCES auth.users(id) ON DELETE CASCADE,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    created_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_chat_messages_chat ON public.chat_messages(chat_id, id);
+
+ALTER TABLE public.chat_logs ADD COLUMN IF NOT EXISTS last_preview TEXT;
+ALTER TABLE public.chat_logs ADD COLUMN IF NOT EXISTS message_count INT DEFAULT 0;
+
+-- Keyset pagination del historial: (updated_at DESC, id DESC) por usuario
+CREATE INDEX IF NOT EXISTS idx_chat_logs_user_updated
+    ON public.chat_logs(user_id, updated_at DESC, id DESC);
+
+-- RLS: cada usuario solo ve sus mensajes
+ALTER TABLE public.chat_messages ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Users can view own chat messages" ON public.chat_messages;
+CREATE POLICY "Users can view own chat messages" ON public.chat_messages
+    FOR SELECT TO authenticated USING (auth.uid() = user_id);
+
+DROP POLICY IF EXISTS "Users can insert own chat messages" ON public.chat_messages;
+CREATE POLICY "Users can insert own chat messages" ON public.chat_messages
+    FOR INSERT TO authenticated WITH CHECK (auth.uid() = user_id);
+
+DROP POLICY IF EXISTS "Users can delete own chat messages" ON public.chat_messages;
+CREATE POLICY "Users can delete own chat messages" ON public.chat_messages
+    FOR DELETE TO authenticated USING (auth.uid() = user_id);
+
+-- ============================================
+-- Backfill desde chat_logs.messages (idempotente)
+-- ============================================
+INSERT INTO public.chat_messages (chat_id, user_id, role, content, created_at)
+SELECT c.id, c.user_id, m.value->>'role', COALESCE(m.value->>'content', ''), c.updated_at
+FROM public.chat_logs c
+CROSS JOIN LATERAL jsonb_array_elements(COALESCE(c.messages, '[]'::jsonb)) WITH ORDINALITY AS m(value, ord)
+WHERE NOT EXISTS (SELECT 1 FROM public.chat_messages cm WHERE cm.chat_id = c.id)
+ORDER BY c.id, m.ord;
+
+UPDATE public.chat_logs c
+SET message_count = s.n,
+    last_preview = s.preview
+FROM (
+    SELECT DISTINCT ON (chat_id)
+        chat_id,
+        COUNT(*) OVER (PARTITION BY chat_id) AS n,
+        LEFT(content, 50) AS preview
+    FROM public.chat_messages
+    ORDER BY chat_id, id DESC
+) s
+WHERE s.chat_id = c.id;
+
+-- ============================================
+-- append_chat_messages: un turno = una llamada, transaccional.
+-- Crea la conversación si no existe (p_title como título inicial); si existe,
+-- p_title (opcional) reemplaza el título. Coste constante por turno.
+-- ============================================
+CREATE OR REPLACE FUNCTION public.append_chat_messages(
+    p_chat_id uuid,
+    p_messages jsonb,
+    p_title text DEFAULT NULL
+)
+RETURNS void
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_count int;
+    v_preview text;
+BEGIN
+    INSERT INTO public.chat_logs (id, user_id, title, message_count)
+    VALUES (p_chat_id, auth.uid(), COALESCE(p_title, 'New Conversation'), 0)
+    ON CONFLICT (id) DO NOTHING;
+
+    IF NOT EXISTS (SELECT 1 FROM public.chat_logs WHERE id = p_chat_id AND user_id = auth.uid()) THEN
+        RAISE EXCEPTION 'chat % not found for user', p_chat_id;
+    END IF;
+
+    INSERT INTO public.chat_messages (chat_id, user_id, role, content)
+    SELECT p_chat_id, auth.uid(), m.value->>'role', COALESCE(m.value->>'content', '')
+    FROM jsonb_array_elements(p_messages) WITH ORDINALITY AS m(value, ord)
+    ORDER BY m.ord;
+
+    v_count := jsonb_array_length(p_messages);
+    v_preview := LEFT(p_messages->(v_count - 1)->>'content', 50);
+
+    UPDATE public.chat_logs
+    SET message_count = COALESCE(message_count, 0) + v_count,
+        last_preview = COALESCE(v_preview, last_preview),
+        title = COALESCE(p_title, title),
+        updated_at = NOW()
+    WHERE id = p_chat_id;
+END;
+$$;
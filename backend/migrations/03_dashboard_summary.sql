@@ -0,0 +1,39 @@
+-- ============================================
+-- RESUMEN DEL DASHBOARD EN UNA SOLA LLAMADA
+-- Reemplaza 4 llamadas PostgREST (2 count exactos + 2 select("*") con blobs)
+-- por una función que devuelve conteos y listas recientes ligeras.
+-- ============================================
+
+CREATE INDEX IF NOT EXISTS idx_obj_created_at ON objetos_exploracion(created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_misiones_inicio_at ON misiones(inicio_at DESC);
+
+CREATE OR REPLACE FUNCTION get_dashboard_summary(recent_limit int DEFAULT 5)
+RETURNS jsonb
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT jsonb_build_object(
+        'missions_count', (SELECT count(*) FROM misiones),
+        'objects_count', (SELECT count(*) FROM objetos_exploracion),
+        'recent_missions', COALESCE((
+            SELECT jsonb_agg(m ORDER BY m.inicio_at DESC)
+            FROM (
+                SELECT id, codigo, titulo, estado, inicio_at, fin_at, zona_geografica
+                FROM misiones
+                ORDER BY inicio_at DESC
+                LIMIT recent_limit
+            ) m
+        ), '[]'::jsonb),
+        'recent_objects', COALESCE((
+            SELECT jsonb_agg(o ORDER BY o.created_at DESC)
+            FROM (
+                SELECT id, nombre, tipo, descripcion, mission_id, created_at,
+                       subcategoria, genero, categoria_id,
+                       metadata - 'image_base64' AS metadata
+                FROM objetos_exploracion
+                ORDER BY created_at DESC
+                LIMIT recent_limit
+            ) o
+        ), '[]'::jsonb)
+    );
+$$;
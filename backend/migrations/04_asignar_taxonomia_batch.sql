@@ -0,0 +1,85 @@
+-- ============================================
+-- ASIGNACIÓN DE TAXONOMÍA EN LOTE (TRANSACCIONAL)
+-- Antes: update + delete + (insert + increment_etiqueta_uso) por etiqueta,
+-- cada uno una llamada HTTP sin transacción (18 llamadas para 8 etiquetas) y
+-- uso_count se incrementaba incluso al reasignar la misma etiqueta.
+-- Ahora: una sola función set-based que reemplaza (o añade) etiquetas para
+-- uno o varios objetos y ajusta uso_count con deltas exactos.
+-- ============================================
+
+CREATE OR REPLACE FUNCTION public.asignar_taxonomia_objetos(
+    p_objeto_ids uuid[],
+    p_categoria_id uuid DEFAULT NULL,
+    p_subcategoria_id uuid DEFAULT NULL,
+    p_etiqueta_ids uuid[] DEFAULT NULL,
+    p_reemplazar boolean DEFAULT true
+)
+RETURNS jsonb
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_ids uuid[];
+    v_added int := 0;
+    v_removed int := 0;
+BEGIN
+    -- Solo objetos existentes; bloqueados para serializar asignaciones concurrentes
+    SELECT array_agg(id) INTO v_ids
+    FROM (
+        SELECT id FROM public.objetos_exploracion
+        WHERE id = ANY(p_objeto_ids)
+        ORDER BY id
+        FOR UPDATE
+    ) o;
+
+    IF v_ids IS NULL THEN
+        RETURN jsonb_build_object('objetos', 0, 'agregadas', 0, 'eliminadas', 0);
+    END IF;
+
+    IF p_categoria_id IS NOT NULL OR p_subcategoria_id IS NOT NULL THEN
+        UPDATE public.objetos_exploracion
+        SET categoria_id = COALESCE(p_categoria_id, categoria_id),
+            subcategoria_id = COALESCE(p_subcategoria_id, subcategoria_id)
+        WHERE id = ANY(v_ids);
+    END IF;
+
+    IF p_etiqueta_ids IS NOT NULL THEN
+        WITH removed AS (
+            DELETE FROM public.objeto_etiquetas
+            WHERE p_reemplazar
+              AND objeto_id = ANY(v_ids)
+              AND NOT (etiqueta_id = ANY(p_etiqueta_ids))
+            RETURNING etiqueta_id
+        ),
+        added AS (
+            INSERT INTO public.objeto_etiquetas (objeto_id, etiqueta_id)
+            SELECT o.id, t.id
+            FROM unnest(v_ids) AS o(id)
+            CROSS JOIN (SELECT DISTINCT id FROM public.etiquetas WHERE id = ANY(p_etiqueta_ids)) t
+            ON CONFLICT DO NOTHING
+            RETURNING etiqueta_id
+        ),
+        deltas AS (
+            SELECT etiqueta_id, -1 AS d FROM removed
+            UNION ALL
+            SELECT etiqueta_id, 1 AS d FROM added
+        ),
+        applied AS (
+            UPDATE public.etiquetas e
+            SET uso_count = GREATEST(0, COALESCE(e.uso_count, 0) + s.delta)
+            FROM (SELECT etiqueta_id, SUM(d) AS delta FROM deltas GROUP BY etiqueta_id) s
+            WHERE e.id = s.etiqueta_id AND s.delta <> 0
+            RETURNING e.id
+        )
+        SELECT
+            (SELECT count(*) FROM added),
+            (SELECT count(*) FROM removed)
+        INTO v_added, v_removed;
+    END IF;
+
+    RETURN jsonb_build_object(
+        'objetos', array_length(v_ids, 1),
+        'agregadas', v_added,
+        'eliminadas', v_removed
+    );
+END;
+$$;
@@ -0,0 +1,128 @@
+-- ============================================
+-- CONSULTAS ESPACIALES POR TESELAS (GEOHASH)
+-- Cada objeto guarda su geohash (precisión 7 ≈ 150 m); el backend pide
+-- teselas por prefijo y las cachea, de modo que un cliente AR que camina
+-- reutiliza las teselas vecinas en vez de consultar toda la tabla.
+-- ============================================
+
+ALTER TABLE objetos_exploracion ADD COLUMN IF NOT EXISTS geohash text;
+
+CREATE OR REPLACE FUNCTION set_objeto_geohash()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF NEW.posicion IS NULL THEN
+        NEW.geohash := NULL;
+    ELSE
+        NEW.geohash := ST_GeoHash(NEW.posicion::geometry, 7);
+    END IF;
+    RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_objeto_geohash ON objetos_exploracion;
+CREATE TRIGGER trg_objeto_geohash
+    BEFORE INSERT OR UPDATE OF posicion ON objetos_exploracion
+    FOR EACH ROW EXECUTE FUNCTION set_objeto_geohash();
+
+UPDATE objetos_exploracion
+SET geohash = ST_GeoHash(posicion::geometry, 7)
+WHERE posicion IS NOT NULL AND geohash IS NULL;
+
+-- Búsqueda por prefijo (LIKE 'abc%')
+CREATE INDEX IF NOT EXISTS idx_obj_geohash ON objetos_exploracion(geohash text_pattern_ops);
+
+-- ============================================
+-- Objetos de una tesela (prefijo geohash de cualquier precisión <= 7)
+-- ============================================
+CREATE OR REPLACE FUNCTION public.get_objects_in_tile(p_geohash text, max_results int DEFAULT 500)
+RETURNS TABLE (
+    id uuid,
+    mission_id uuid,
+    nombre text,
+    tipo text,
+    descripcion text,
+    created_at timestamptz,
+    lat float,
+    lng float,
+    metadata jsonb,
+    subcategoria text,
+    genero text
+)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT
+        o.id,
+        o.mission_id,
+        o.nombre,
+        o.tipo,
+        o.descripcion,
+        o.created_at,
+        ST_Y(o.posicion::geometry) as lat,
+        ST_X(o.posicion::geometry) as lng,
+        o.metadata - 'image_base64',
+        o.subcategoria,
+        o.genero
+    FROM public.objetos_exploracion o
+    WHERE o.geohash LIKE p_geohash || '%'
+    ORDER BY o.created_at DESC
+    LIMIT max_results;
+$$;
+
+-- ============================================
+-- Búsqueda directa (radios grandes / teselas saturadas):
+-- prefiltro por bounding box (usa el índice GIST), luego ST_DWithin exacto,
+-- orden por distancia y límite.
+-- ============================================
+CREATE OR REPLACE FUNCTION public.search_nearby_objects_v3(
+    p_lat float,
+    p_lng float,
+    radius_meters float,
+    max_results int DEFAULT 100
+)
+RETURNS TABLE (
+    id uuid,
+    mission_id uuid,
+    nombre text,
+    tipo text,
+    descripcion text,
+    created_at timestamptz,
+    lat float,
+    lng float,
+    metadata jsonb,
+    subcategoria text,
+    genero text,
+    distance float
+)
+LANGUAGE sql
+STABLE
+AS $$
+    WITH origin AS (
+        SELECT
+            ST_SetSRID(ST_MakePoint(p_lng, p_lat), 4326)::geography AS g,
+            radius_meters / 111320.0 AS dlat,
+            radius_meters / (111320.0 * GREATEST(cos(radians(p_lat)), 0.01)) AS dlng
+    )
+    SELECT
+        o.id,
+        o.mission_id,
+        o.nombre,
+        o.tipo,
+        o.descripcion,
+        o.created_at,
+        ST_Y(o.posicion::geometry) as lat,
+        ST_X(o.posicion::geometry) as lng,
+        o.metadata - 'image_base64',
+        o.subcategoria,
+        o.genero,
+        ST_Distance(o.posicion, origin.g) as distance
+    FROM public.objetos_exploracion o, origin
+    WHERE o.posicion && ST_MakeEnvelope(
+            p_lng - origin.dlng, p_lat - origin.dlat,
+            p_lng + origin.dlng, p_lat + origin.dlat, 4326)::geography
+      AND ST_DWithin(o.posicion, origin.g, radius_meters)
+    ORDER BY distance
+    LIMIT max_results;
+$$;
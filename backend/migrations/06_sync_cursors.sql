@@ -0,0 +1,212 @@
+-- ============================================
+-- SINCRONIZACIÓN DELTA (objetos + misiones)
+-- Cada escritura marca la fila con el xid de su transacción y una versión
+-- de secuencia; los borrados dejan una lápida (tombstone). get_sync_delta
+-- devuelve solo lo cambiado desde el cursor (xid, versión).
+--
+-- El cursor avanza como máximo hasta pg_snapshot_xmin: toda transacción con
+-- xid menor ya terminó, así que una transacción lenta que confirma tarde no
+-- puede quedar detrás de un cursor ya entregado al cliente.
+-- ============================================
+
+CREATE SEQUENCE IF NOT EXISTS sync_version_seq;
+
+ALTER TABLE objetos_exploracion
+    ADD COLUMN IF NOT EXISTS sync_xid xid8,
+    ADD COLUMN IF NOT EXISTS sync_version bigint;
+
+ALTER TABLE misiones
+    ADD COLUMN IF NOT EXISTS sync_xid xid8,
+    ADD COLUMN IF NOT EXISTS sync_version bigint;
+
+UPDATE objetos_exploracion
+SET sync_xid = pg_current_xact_id(), sync_version = nextval('sync_version_seq')
+WHERE sync_xid IS NULL;
+
+UPDATE misiones
+SET sync_xid = pg_current_xact_id(), sync_version = nextval('sync_version_seq')
+WHERE sync_xid IS NULL;
+
+CREATE INDEX IF NOT EXISTS idx_obj_sync ON objetos_exploracion(sync_xid, sync_version);
+CREATE INDEX IF NOT EXISTS idx_misiones_sync ON misiones(sync_xid, sync_version);
+
+CREATE OR REPLACE FUNCTION set_sync_version()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    NEW.sync_xid := pg_current_xact_id();
+    NEW.sync_version := nextval('sync_version_seq');
+    RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_objeto_sync ON objetos_exploracion;
+CREATE TRIGGER trg_objeto_sync
+    BEFORE INSERT OR UPDATE ON objetos_exploracion
+    FOR EACH ROW EXECUTE FUNCTION set_sync_version();
+
+DROP TRIGGER IF EXISTS trg_mision_sync ON misiones;
+CREATE TRIGGER trg_mision_sync
+    BEFORE INSERT OR UPDATE ON misiones
+    FOR EACH ROW EXECUTE FUNCTION set_sync_version();
+
+-- ============================================
+-- Lápidas de borrado
+-- ============================================
+CREATE TABLE IF NOT EXISTS sync_tombstones (
+    sync_version bigint PRIMARY KEY DEFAULT nextval('sync_version_seq'),
+    sync_xid xid8 NOT NULL DEFAULT pg_current_xact_id(),
+    entity text NOT NULL,          -- 'objects' | 'missions'
+    row_id uuid NOT NULL,
+    deleted_at timestamptz DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS idx_tombstones_sync ON sync_tombstones(sync_xid, sync_version);
+CREATE INDEX IF NOT EXISTS idx_tombstones_deleted_at ON sync_tombstones(deleted_at);
+
+-- Solo el backend (service role) lee las lápidas
+ALTER TABLE sync_tombstones ENABLE ROW LEVEL SECURITY;
+
+CREATE OR REPLACE FUNCTION record_sync_tombstone()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    INSERT INTO sync_tombstones (entity, row_id) VALUES (TG_ARGV[0], OLD.id);
+    RETURN OLD;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_objeto_tombstone ON objetos_exploracion;
+CREATE TRIGGER trg_objeto_tombstone
+    AFTER DELETE ON objetos_exploracion
+    FOR EACH ROW EXECUTE FUNCTION record_sync_tombstone('objects');
+
+DROP TRIGGER IF EXISTS trg_mision_tombstone ON misiones;
+CREATE TRIGGER trg_mision_tombstone
+    AFTER DELETE ON misiones
+    FOR EACH ROW EXECUTE FUNCTION record_sync_tombstone('missions');
+
+-- Horizonte de purga: cursores anteriores deben resincronizar desde cero
+CREATE TABLE IF NOT EXISTS sync_meta (
+    id int PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+    horizon_xid xid8 NOT NULL DEFAULT '0'
+);
+INSERT INTO sync_meta (id) VALUES (1) ON CONFLICT DO NOTHING;
+ALTER TABLE sync_meta ENABLE ROW LEVEL SECURITY;
+
+CREATE OR REPLACE FUNCTION public.prune_sync_tombstones(keep interval DEFAULT '30 days')
+RETURNS int
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_max xid8;
+    v_count int;
+BEGIN
+    WITH pruned AS (
+        DELETE FROM sync_tombstones
+        WHERE deleted_at < now() - keep
+        RETURNING sync_xid
+    )
+    SELECT max(sync_xid), count(*) INTO v_max, v_count FROM pruned;
+
+    IF v_max IS NOT NULL THEN
+        UPDATE sync_meta SET horizon_xid = GREATEST(horizon_xid, v_max) WHERE id = 1;
+    END IF;
+    RETURN v_count;
+END;
+$$;
+
+-- ============================================
+-- Delta desde (p_since_xid, p_since_version), en orden de cambio
+-- ============================================
+CREATE OR REPLACE FUNCTION public.get_sync_delta(
+    p_since_xid bigint DEFAULT 0,
+    p_since_version bigint DEFAULT 0,
+    p_limit int DEFAULT 500
+)
+RETURNS jsonb
+LANGUAGE plpgsql
+STABLE
+AS $$
+DECLARE
+    v_since xid8 := p_since_xid::text::xid8;
+    v_upto xid8 := pg_snapshot_xmin(pg_current_snapshot());
+    v_horizon xid8;
+    v_changes jsonb;
+    v_count int;
+    v_last jsonb;
+BEGIN
+    SELECT horizon_xid INTO v_horizon FROM sync_meta WHERE id = 1;
+    IF p_since_xid > 0 AND v_since < v_horizon THEN
+        RETURN jsonb_build_object(
+            'reset', true, 'changes', '[]'::jsonb, 'has_more', false,
+            'next_xid', 0, 'next_version', 0
+        );
+    END IF;
+
+    WITH changes AS (
+        SELECT 'objects' AS entity, 'upsert' AS op, o.id, o.sync_xid, o.sync_version,
+               jsonb_build_object(
+                   'id', o.id,
+                   'mission_id', o.mission_id,
+                   'nombre', o.nombre,
+                   'tipo', o.tipo,
+                   'descripcion', o.descripcion,
+                   'subcategoria', o.subcategoria,
+                   'genero', o.genero,
+                   'categoria_id', o.categoria_id,
+                   'subcategoria_id', o.subcategoria_id,
+                   'created_at', o.created_at,
+                   'lat', ST_Y(o.posicion::geometry),
+                   'lng', ST_X(o.posicion::geometry),
+                   'metadata', o.metadata - 'image_base64'
+               ) AS data
+        FROM objetos_exploracion o
+        WHERE (o.sync_xid, o.sync_version) > (v_since, p_since_version)
+          AND o.sync_xid < v_upto
+        UNION ALL
+        SELECT 'missions', 'upsert', m.id, m.sync_xid, m.sync_version,
+               to_jsonb(m) - 'sync_xid' - 'sync_version'
+        FROM misiones m
+        WHERE (m.sync_xid, m.sync_version) > (v_since, p_since_version)
+          AND m.sync_xid < v_upto
+        UNION ALL
+        SELECT t.entity, 'delete', t.row_id, t.sync_xid, t.sync_version, NULL
+        FROM sync_tombstones t
+        WHERE (t.sync_xid, t.sync_version) > (v_since, p_since_version)
+          AND t.sync_xid < v_upto
+    ),
+    page AS (
+        SELECT * FROM changes
+        ORDER BY sync_xid, sync_version
+        LIMIT p_limit + 1
+    ),
+    numbered AS (
+        SELECT page.*, row_number() OVER (ORDER BY sync_xid, sync_version) AS n FROM page
+    )
+    SELECT
+        COALESCE(jsonb_agg(jsonb_build_object(
+            'entity', entity, 'op', op, 'id', id, 'data', data
+        ) ORDER BY n) FILTER (WHERE n <= p_limit), '[]'::jsonb),
+        count(*),
+        (array_agg(jsonb_build_object(
+            'xid', sync_xid::text::bigint, 'version', sync_version
+        ) ORDER BY n DESC) FILTER (WHERE n <= p_limit))[1]
+    INTO v_changes, v_count, v_last
+    FROM numbered;
+
+    IF v_count > p_limit THEN
+        RETURN jsonb_build_object(
+            'reset', false, 'changes', v_changes, 'has_more', true,
+            'next_xid', (v_last->>'xid')::bigint, 'next_version', (v_last->>'version')::bigint
+        );
+    END IF;
+
+    RETURN jsonb_build_object(
+        'reset', false, 'changes', v_changes, 'has_more', false,
+        'next_xid', GREATEST(v_upto, v_since)::text::bigint, 'next_version', 0
+    );
+END;
+$$;
@@ -0,0 +1,26 @@
+-- ============================================
+-- LISTADOS DE OBJETOS PAGINADOS (misión / huérfanos)
+-- Keyset sobre (created_at, id) y proyección ligera: metadata sin el
+-- base64 legado (campo calculado de PostgREST) y sin embedding.
+-- ============================================
+
+CREATE INDEX IF NOT EXISTS idx_obj_mission_created_id
+    ON objetos_exploracion(mission_id, created_at DESC, id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_obj_orphan_created_id
+    ON objetos_exploracion(created_at DESC, id DESC)
+    WHERE mission_id IS NULL;
+
+-- Campo calculado: select=...,metadata:metadata_slim
+-- legacy_image indica que la imagen sigue inline y se sirve por /objects/{id}/image
+CREATE OR REPLACE FUNCTION public.metadata_slim(o public.objetos_exploracion)
+RETURNS jsonb
+LANGUAGE sql
+IMMUTABLE
+AS $$
+    SELECT CASE
+        WHEN o.metadata ? 'image_base64'
+            THEN (o.metadata - 'image_base64') || jsonb_build_object('legacy_image', true)
+        ELSE o.metadata
+    END;
+$$;
@@ -0,0 +1,45 @@
+-- ============================================
+-- ENRIQUECIMIENTO EN SEGUNDO PLANO (cola de jobs del backend)
+-- La descripción / categoría sugerida por el LLM y el embedding se escriben
+-- después de crear el objeto. La escritura es un merge atómico: nunca pisa
+-- una descripción que el usuario ya editó ni otras claves de metadata.
+-- ============================================
+
+-- Backfill de embeddings: filas sin vector, más antiguas primero
+CREATE INDEX IF NOT EXISTS idx_obj_embedding_missing
+    ON objetos_exploracion(created_at)
+    WHERE embedding IS NULL;
+
+CREATE OR REPLACE FUNCTION public.apply_object_enrichment(
+    p_id uuid,
+    p_descripcion text DEFAULT NULL,
+    p_tipo text DEFAULT NULL,
+    p_metadata jsonb DEFAULT '{}'::jsonb
+)
+RETURNS boolean
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_meta jsonb := COALESCE(p_metadata, '{}'::jsonb);
+BEGIN
+    UPDATE public.objetos_exploracion o
+    SET
+        -- Solo rellena huecos: la edición manual gana
+        descripcion = CASE
+            WHEN p_descripcion IS NOT NULL AND COALESCE(o.descripcion, '') = '' THEN p_descripcion
+            ELSE o.descripcion
+        END,
+        -- La categoría sugerida solo reemplaza las genéricas del cliente
+        tipo = CASE
+            WHEN p_tipo IS NOT NULL AND COALESCE(o.tipo, '') IN ('', 'object', 'common', 'unknown') THEN p_tipo
+            ELSE o.tipo
+        END,
+        metadata = COALESCE(o.metadata, '{}'::jsonb)
+            || CASE
+                WHEN COALESCE(o.metadata->>'description', '') <> '' THEN v_meta - 'description'
+                ELSE v_meta
+            END
+    WHERE o.id = p_id;
+    RETURN FOUND;
+END;
+$$;
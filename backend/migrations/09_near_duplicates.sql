@@ -0,0 +1,79 @@
+-- ============================================
+-- SUPRESIÓN DE CASI-DUPLICADOS AL INSERTAR
+-- En modo Sentinel la cámara se queda mirando el mismo objeto y se guardaba
+-- una fila por detección. El backend busca antes un objeto de la misma
+-- misión a pocos metros con embedding casi idéntico y, si existe, registra
+-- un avistamiento más en lugar de insertar.
+-- ============================================
+
+-- El filtro espacial (&& + ST_DWithin sobre el índice GiST de posicion) deja
+-- unas pocas filas; la distancia coseno solo se calcula sobre ellas. Con un
+-- radio grande el planner puede optar por el índice HNSW de embedding.
+CREATE OR REPLACE FUNCTION public.find_near_duplicate(
+    p_lat float,
+    p_lng float,
+    p_embedding vector(512),
+    p_mission_id uuid DEFAULT NULL,
+    radius_meters float DEFAULT 8,
+    min_similarity float DEFAULT 0.92
+)
+RETURNS TABLE (
+    id uuid,
+    similarity float,
+    distance float
+)
+LANGUAGE sql
+STABLE
+AS $$
+    WITH origin AS (
+        SELECT
+            ST_SetSRID(ST_MakePoint(p_lng, p_lat), 4326)::geography AS g,
+            radius_meters / 111320.0 AS dlat,
+            radius_meters / (111320.0 * GREATEST(cos(radians(p_lat)), 0.01)) AS dlng
+    )
+    SELECT
+        o.id,
+        1 - (o.embedding <=> p_embedding) AS similarity,
+        ST_Distance(o.posicion, origin.g) AS distance
+    FROM public.objetos_exploracion o, origin
+    WHERE o.posicion && ST_MakeEnvelope(
+            p_lng - origin.dlng, p_lat - origin.dlat,
+            p_lng + origin.dlng, p_lat + origin.dlat, 4326)::geography
+      AND ST_DWithin(o.posicion, origin.g, radius_meters)
+      AND o.embedding IS NOT NULL
+      AND o.mission_id IS NOT DISTINCT FROM p_mission_id
+      AND 1 - (o.embedding <=> p_embedding) >= min_similarity
+    ORDER BY o.embedding <=> p_embedding
+    LIMIT 1;
+$$;
+
+-- Un avistamiento más del mismo objeto: contador, última vez visto y la
+-- mejor confianza. Devuelve un resumen ligero de la fila.
+CREATE OR REPLACE FUNCTION public.merge_object_sighting(
+    p_id uuid,
+    p_confidence float DEFAULT NULL,
+    p_seen_at text DEFAULT NULL
+)
+RETURNS jsonb
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_row jsonb;
+BEGIN
+    UPDATE public.objetos_exploracion o
+    SET metadata = COALESCE(o.metadata, '{}'::jsonb) || jsonb_build_object(
+            'sightings', COALESCE((o.metadata->>'sightings')::int, 1) + 1,
+            'last_seen', COALESCE(p_seen_at, now()::text),
+            'confidence', GREATEST(COALESCE((o.metadata->>'confidence')::float, 0), COALESCE(p_confidence, 0))
+        )
+    WHERE o.id = p_id
+    RETURNING jsonb_build_object(
+        'id', o.id,
+        'nombre', o.nombre,
+        'tipo', o.tipo,
+        'mission_id', o.mission_id,
+        'metadata', o.metadata - 'image_base64'
+    ) INTO v_row;
+    RETURN v_row;
+END;
+$$;
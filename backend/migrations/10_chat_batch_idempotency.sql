@@ -0,0 +1,78 @@
+-- ============================================
+-- APPEND DE MENSAJES IDEMPOTENTE
+-- El worker de persistencia reintenta append_chat_messages si la llamada
+-- falla; si el fallo llegó después del COMMIT (timeout, conexión cortada) el
+-- reintento duplicaba el turno. Cada lote lleva ahora un p_batch_id generado
+-- por el backend y reutilizado en los reintentos: un lote ya aplicado se
+-- ignora.
+-- ============================================
+
+CREATE TABLE IF NOT EXISTS public.chat_message_batches (
+    chat_id UUID NOT NULL REFERENCES public.chat_logs(id) ON DELETE CASCADE,
+    batch_id UUID NOT NULL,
+    user_id UUID REFERENCES auth.users(id) ON DELETE CASCADE,
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    PRIMARY KEY (chat_id, batch_id)
+);
+
+ALTER TABLE public.chat_message_batches ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Users can view own chat batches" ON public.chat_message_batches;
+CREATE POLICY "Users can view own chat batches" ON public.chat_message_batches
+    FOR SELECT TO authenticated USING (auth.uid() = user_id);
+
+DROP POLICY IF EXISTS "Users can insert own chat batches" ON public.chat_message_batches;
+CREATE POLICY "Users can insert own chat batches" ON public.chat_message_batches
+    FOR INSERT TO authenticated WITH CHECK (auth.uid() = user_id);
+
+-- La firma antigua (3 parámetros) se elimina: con dos sobrecargas PostgREST
+-- no puede elegir entre ellas.
+DROP FUNCTION IF EXISTS public.append_chat_messages(uuid, jsonb, text);
+
+CREATE OR REPLACE FUNCTION public.append_chat_messages(
+    p_chat_id uuid,
+    p_messages jsonb,
+    p_title text DEFAULT NULL,
+    p_batch_id uuid DEFAULT NULL
+)
+RETURNS void
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_count int;
+    v_preview text;
+BEGIN
+    INSERT INTO public.chat_logs (id, user_id, title, message_count)
+    VALUES (p_chat_id, auth.uid(), COALESCE(p_title, 'New Conversation'), 0)
+    ON CONFLICT (id) DO NOTHING;
+
+    IF NOT EXISTS (SELECT 1 FROM public.chat_logs WHERE id = p_chat_id AND user_id = auth.uid()) THEN
+        RAISE EXCEPTION 'chat % not found for user', p_chat_id;
+    END IF;
+
+    -- Lote ya aplicado (reintento tras un commit cuya respuesta se perdió)
+    IF p_batch_id IS NOT NULL THEN
+        INSERT INTO public.chat_message_batches (chat_id, batch_id, user_id)
+        VALUES (p_chat_id, p_batch_id, auth.uid())
+        ON CONFLICT (chat_id, batch_id) DO NOTHING;
+        IF NOT FOUND THEN
+            RETURN;
+        END IF;
+    END IF;
+
+    INSERT INTO public.chat_messages (chat_id, user_id, role, content)
+    SELECT p_chat_id, auth.uid(), m.value->>'role', COALESCE(m.value->>'content', '')
+    FROM jsonb_array_elements(p_messages) WITH ORDINALITY AS m(value, ord)
+    ORDER BY m.ord;
+
+    v_count := jsonb_array_length(p_messages);
+    v_preview := LEFT(p_messages->(v_count - 1)->>'content', 50);
+
+    UPDATE public.chat_logs
+    SET message_count = COALESCE(message_count, 0) + v_count,
+        last_preview = COALESCE(v_preview, last_preview),
+        title = COALESCE(p_title, title),
+        updated_at = NOW()
+    WHERE id = p_chat_id;
+END;
+$$;
@@ -0,0 +1,60 @@
+"""
+Benchmark: throughput del encoder CLIP vs tamaño de batch (CPU).
+
+Uso (desde backend/):
+    python scripts/benchmark_embedding_batch.py [--images 64] [--sizes 1,2,4,8,16,32]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image
+
+
+def synthetic_images(n, size=(640, 480)):
+    images = []
+    for i in range(n):
+        color = ((i * 37) % 256, (i * 91) % 256, (i * 53) % 256)
+        images.append(Image.new("RGB", size, color))
+    return images
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--images", type=int, default=64)
+    parser.add_argument("--sizes", default="1,2,4,8,16,32")
+    parser.add_argument("--threads", type=int, default=None, help="torch.set_num_threads")
+    args = parser.parse_args()
+
+    import torch
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    from app.services.ai_service import ai_service
+    ai_service.load()
+    if not ai_service.visual_model:
+        print("ERROR: CLIP model not loaded")
+        return
+
+    images = synthetic_images(args.images)
+    sizes = [int(s) for s in args.sizes.split(",")]
+
+    # Warmup
+    ai_service._encode_images(images[:2])
+
+    print(f"Device: {ai_service.device} | threads: {torch.get_num_threads()} | images: {len(images)}")
+    print(f"{'batch':>6} {'total_s':>9} {'img/s':>9} {'ms/img':>9}")
+    for size in sizes:
+        start = time.perf_counter()
+        for i in range(0, len(images), size):
+            ai_service._encode_images(images[i:i + size])
+        elapsed = time.perf_counter() - start
+        print(f"{size:>6} {elapsed:>9.2f} {len(images) / elapsed:>9.1f} {elapsed * 1000 / len(images):>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Paridad de los backends ONNX frente a PyTorch: deriva coseno de los embeddings,
+latencia por imagen y memoria residente. Sale con código 1 si algún backend
+queda por debajo de su umbral de similitud.
+
+Uso (desde backend/):
+    python scripts/check_clip_parity.py [--images-dir ./data/samples] [--count 32]
+        [--backends onnx,onnx-int8] [--min-fp32 0.999] [--min-int8 0.98]
+"""
+
+import argparse
+import os
+import resource
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from PIL import Image
+
+from app.services.vision_backends import VISION_MODEL_NAME, create_encoder
+
+
+def load_images(images_dir, count):
+    if images_dir:
+        names = sorted(n for n in os.listdir(images_dir) if n.lower().endswith((".jpg", ".jpeg", ".png")))
+        return [Image.open(os.path.join(images_dir, n)).convert("RGB") for n in names[:count]]
+    # Textured synthetic frames (flat colours hide quantization error)
+    rng = np.random.default_rng(0)
+    images = []
+    for i in range(count):
+        base = rng.integers(0, 256, size=(3,), dtype=np.uint8)
+        noise = rng.normal(0, 40, size=(480, 640, 3))
+        gradient = np.linspace(0, 80, 640)[None, :, None]
+        pixels = np.clip(base + noise + gradient, 0, 255).astype(np.uint8)
+        images.append(Image.fromarray(pixels))
+    return images
+
+
+def rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def timed_encode(encoder, images, batch=8):
+    encoder.encode(images[:1])  # warmup
+    start = time.perf_counter()
+    vectors = []
+    for i in range(0, len(images), batch):
+        vectors.extend(encoder.encode(images[i:i + batch]))
+    elapsed = time.perf_counter() - start
+    return np.array(vectors, dtype=np.float32), elapsed * 1000 / len(images)
+
+
+def cosine(a, b):
+    a = a / np.linalg.norm(a, axis=1, keepdims=True)
+    b = b / np.linalg.norm(b, axis=1, keepdims=True)
+    return (a * b).sum(axis=1)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--images-dir", default=None)
+    parser.add_argument("--count", type=int, default=32)
+    parser.add_argument("--backends", default="onnx,onnx-int8")
+    parser.add_argument("--min-fp32", type=float, default=0.999)
+    parser.add_argument("--min-int8", type=float, default=0.98)
+    args = parser.parse_args()
+
+    images = load_images(args.images_dir, args.count)
+    thresholds = {"onnx": args.min_fp32, "onnx-int8": args.min_int8}
+
+    before = rss_mb()
+    reference, ref_ms = timed_encode(create_encoder(VISION_MODEL_NAME, "torch"), images)
+    print(f"images: {len(images)}")
+    print(f"{'backend':>10} {'ms/img':>8} {'+rss_mb':>8} {'min_cos':>9} {'mean_cos':>9}  status")
+    print(f"{'torch':>10} {ref_ms:>8.1f} {rss_mb() - before:>8.0f} {1.0:>9.5f} {1.0:>9.5f}  reference")
+
+    failed = False
+    for backend in [b.strip() for b in args.backends.split(",") if b.strip()]:
+        before = rss_mb()
+        vectors, ms = timed_encode(create_encoder(VISION_MODEL_NAME, backend), images)
+        sims = cosine(reference, vectors)
+        ok = sims.min() >= thresholds[backend]
+        failed |= not ok
+        # ru_maxrss is a high-water mark: growth after torch is only a lower bound
+        print(f"{backend:>10} {ms:>8.1f} {rss_mb() - before:>8.0f} {sims.min():>9.5f} {sims.mean():>9.5f}  "
+              f"{'OK' if ok else f'FAIL (< {thresholds[backend]})'}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Exporta el encoder visual CLIP (vision tower + proyección) a ONNX fp32 y
+genera la variante con cuantización dinámica int8.
+
+Uso (desde backend/):
+    pip install -r scripts/requirements.txt
+    python scripts/export_clip_onnx.py [--out ./data/onnx] [--opset 17]
+
+Después: VISION_BACKEND=onnx | onnx-int8, y validar con scripts/check_clip_parity.py
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.vision_backends import CLIP_SIZE, VISION_MODEL_NAME, VISION_ONNX_DIR, onnx_path
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--out", default=VISION_ONNX_DIR)
+    parser.add_argument("--opset", type=int, default=17)
+    args = parser.parse_args()
+
+    import torch
+    from sentence_transformers import SentenceTransformer
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    os.makedirs(args.out, exist_ok=True)
+    fp32_path = onnx_path("onnx", args.out)
+    int8_path = onnx_path("onnx-int8", args.out)
+
+    # sentence-transformers CLIP = transformers CLIPModel; encode(image) == get_image_features
+    clip = SentenceTransformer(VISION_MODEL_NAME, device="cpu")[0].model.eval()
+
+    class VisualEncoder(torch.nn.Module):
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, pixel_values):
+            return self.model.get_image_features(pixel_values=pixel_values)
+
+    dummy = torch.randn(1, 3, CLIP_SIZE, CLIP_SIZE)
+    print(f"Exporting {VISION_MODEL_NAME} -> {fp32_path}")
+    with torch.no_grad():
+        torch.onnx.export(
+            VisualEncoder(clip),
+            (dummy,),
+            fp32_path,
+            input_names=["pixel_values"],
+            output_names=["image_embeds"],
+            dynamic_axes={"pixel_values": {0: "batch"}, "image_embeds": {0: "batch"}},
+            opset_version=args.opset,
+            do_constant_folding=True,
+        )
+
+    print(f"Quantizing (dynamic int8) -> {int8_path}")
+    quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+
+    for path in (fp32_path, int8_path):
+        print(f"  {os.path.basename(path)}: {os.path.getsize(path) / 1e6:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Informe de tiempo de importación de app.main (python -X importtime).
+
+Arranque en frío = importar app.main; los módulos de ML pesados deben
+cargarse después, en el hilo de carga del modelo. Sale con código 1 si se
+supera el presupuesto o si alguno de esos módulos entra en la importación.
+
+Uso (desde backend/):
+    python scripts/import_time_report.py [--top 20] [--budget-ms 1500]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Must never be imported by app.main itself
+HEAVY_MODULES = ("torch", "sentence_transformers", "transformers", "onnxruntime", "onnx")
+
+
+def collect():
+    """[(module, self_us, cumulative_us, depth)] for `import app.main` in a fresh interpreter."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=BACKEND_DIR, capture_output=True, text=True,
+        env={**os.environ, "AI_EAGER_LOAD": "0"},
+    )
+    if proc.returncode != 0:
+        print(proc.stderr[-2000:])
+        sys.exit(proc.returncode)
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--budget-ms", type=float, default=None)
+    args = parser.parse_args()
+
+    rows = collect()
+    total_ms = sum(cumulative for _, _, cumulative, depth in rows if depth == 0) / 1000
+    heavy = sorted({name for name, _, _, _ in rows if name.split(".")[0] in HEAVY_MODULES})
+
+    print(f"import app.main: {total_ms:.0f} ms ({len(rows)} modules)")
+    print(f"{'cumulative_ms':>14} {'self_ms':>8}  module")
+    for name, self_us, cumulative_us, _ in sorted(rows, key=lambda r: r[2], reverse=True)[:args.top]:
+        print(f"{cumulative_us / 1000:>14.1f} {self_us / 1000:>8.1f}  {name}")
+
+    failed = False
+    if heavy:
+        print(f"\nHeavy modules imported at startup: {', '.join(heavy)}")
+        failed = True
+    if args.budget_ms is not None and total_ms > args.budget_ms:
+        print(f"\nOver budget: {total_ms:.0f} ms > {args.budget_ms:.0f} ms")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Mueve imágenes base64 de objetos_exploracion.metadata al blob store.
+
+Para cada fila con metadata.image_base64: genera imagen + miniatura, las guarda
+en el blob store, reemplaza image_base64 por image_ref y actualiza la fila.
+
+Uso (desde backend/):
+    python scripts/migrate_images_to_blob_store.py [--batch 50] [--dry-run]
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from app.core.supabase_client import get_service_client
+from app.api.endpoints.objects import store_object_image
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--batch", type=int, default=50)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    supabase = get_service_client()
+    if not supabase:
+        print("ERROR: Supabase credentials not configured")
+        return
+
+    migrated = 0
+    failed = set()
+    while True:
+        query = supabase.table("objetos_exploracion").select("id, metadata") \
+            .not_.is_("metadata->>image_base64", "null")
+        if failed:
+            query = query.not_.in_("id", list(failed))
+        rows = query.limit(args.batch).execute().data or []
+        if not rows:
+            break
+
+        for row in rows:
+            metadata = dict(row.get("metadata") or {})
+            try:
+                # Legacy images were already cropped at ingest; only re-encode + thumbnail
+                ref = store_object_image(metadata.pop("image_base64"))
+                metadata["image_ref"] = ref
+                if not args.dry_run:
+                    supabase.table("objetos_exploracion").update({"metadata": metadata}).eq("id", row["id"]).execute()
+                migrated += 1
+            except Exception as e:
+                print(f"FAILED {row['id']}: {e}")
+                failed.add(row["id"])
+
+        print(f"Migrated {migrated} objects...")
+        if args.dry_run:
+            break
+
+    print(f"DONE: {migrated} migrated, {len(failed)} failed")
+
+
+if __name__ == "__main__":
+    main()
@@ -53,26 +53,10 @@ export class ARDataController {
                 console.warn("Frame capture failed:", e);
             }
             
-            // 2. Get AI description (best effort, non-blocking)
-            let description = `${objClass} detectado automáticamente.`;
-            let category = this.mapClassToCategory(objClass);
-            
-            try {
-                const docRes = await fetch('/api/enrich-data', {
-                    method: 'POST',
-                    headers: {'Content-Type': 'application/json'},
-                    body: JSON.stringify({ label: objClass })
-                }).then(r => r.json());
-                
-                if (docRes && docRes.description) {
-                    description = docRes.description;
-                }
-                if (docRes && docRes.category) {
-                    category = docRes.category;
-                }
-            } catch(e) { 
-                console.warn("Enrichment failed, using default description"); 
-            }
+            // 2. Description + category are generated server-side after saving
+            //    (background enrichment queue), so the save never waits on the LLM
+            const description = `${objClass} detectado automáticamente.`;
+            const category = this.mapClassToCategory(objClass);
 
             // 3. Calculate GPS position
             const distance = prediction.distance || 3; // meters
@@ -103,7 +87,6 @@ export class ARDataController {
                 image_base64: capturedImage || '',
                 bbox: prediction.bbox || null,  // Send bbox for server-side crop
                 metadata: {
-                    description: description,
                     created_by: 'SENTINEL_AUTO',
                     ai_class: objClass,
                     ai_confidence: prediction.score.toFixed(2)
@@ -113,7 +96,10 @@ export class ARDataController {
 
             console.log("Auto-save API response:", res); // DEBUG
 
-            if (res.success) {
+            if (res.success && res.duplicate_of) {
+                // Same object seen again nearby: the server merged it as a new sighting
+                this.ctx.ui.showToast(`✓ ${objClass} ya registrado`, 1500);
+            } else if (res.success) {
                 this.ctx.ui.showToast(`✓ ${objClass} guardado`, 2000);
                 
                 // Add to local state for immediate display
@@ -403,11 +389,18 @@ export class ARDataController {
     async searchVisualDatabase(imageBase64) {
          if (!imageBase64) return [];
          
-         const response = await fetch('/api/search-similar', {
-             method: 'POST',
-             headers: {'Content-Type': 'application/json'},
-             body: JSON.stringify({ image_base64: imageBase64 })
-         });
+         // Raw JPEG body instead of base64-in-JSON
+         const response = imageBase64.startsWith('data:')
+             ? await fetch('/api/search-similar', {
+                 method: 'POST',
+                 headers: {'Content-Type': 'application/octet-stream'},
+                 body: await (await fetch(imageBase64)).blob()
+             })
+             : await fetch('/api/search-similar', {
+                 method: 'POST',
+                 headers: {'Content-Type': 'application/json'},
+                 body: JSON.stringify({ image_base64: imageBase64 })
+             });
          
          const data = await response.json();
          return data.matches || [];
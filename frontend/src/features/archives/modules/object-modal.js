@@ -25,8 +25,9 @@ export class ObjectModal {
         this.dom.inpDesc.value = obj.descripcion || (obj.metadata?.description || '');
 
         let imgSrc = '../../assets/placeholder-mars.jpg';
-        if (obj.metadata && obj.metadata.image_base64) {
-            imgSrc = obj.metadata.image_base64;
+        const storedImg = api.objectImageUrl(obj, 'full');
+        if (storedImg) {
+            imgSrc = storedImg;
         }
         this.dom.img.src = imgSrc;
 
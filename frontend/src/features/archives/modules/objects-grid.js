@@ -3,6 +3,8 @@
  * Handles rendering the objects grid and filtering
  */
 
+import { api } from '../../../js/services/api.js';
+
 export class ObjectsGrid {
     constructor(controller) {
         this.controller = controller;
@@ -52,8 +54,9 @@ export class ObjectsGrid {
             card.onclick = () => this.controller.objectModal.openDetail(obj);
 
             let imgSrc = '../../assets/placeholder-mars.jpg';
-            if (obj.metadata && obj.metadata.image_base64) {
-                imgSrc = obj.metadata.image_base64;
+            const storedImg = api.objectImageUrl(obj, 'thumb');
+            if (storedImg) {
+                imgSrc = storedImg;
             }
 
             const dateStr = new Date(obj.created_at).toLocaleTimeString('es-ES', { hour: '2-digit', minute: '2-digit' });
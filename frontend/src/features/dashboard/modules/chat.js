@@ -69,21 +69,44 @@ export function initChat() {
         loadingMsg.textContent = '...';
         messagesContainer.appendChild(loadingMsg);
 
+        // Stream tokens into the loading bubble as they arrive
+        let streamed = false;
         try {
-            const res = await api.chat(text, "", currentChatId);
-            messagesContainer.removeChild(loadingMsg);
+            const res = await api.chatStream(text, "", currentChatId, (tokenText) => {
+                if (!streamed) {
+                    streamed = true;
+                    loadingMsg.classList.remove('loading');
+                    loadingMsg.textContent = '';
+                }
+                loadingMsg.textContent += tokenText;
+                messagesContainer.scrollTop = messagesContainer.scrollHeight;
+            });
 
+            if (res.chat_id) {
+                currentChatId = res.chat_id;
+            }
+            if (!streamed) {
+                messagesContainer.removeChild(loadingMsg);
+                appendMessage(res.response || "Error: No hubo respuesta.", true);
+            } else if (res.response) {
+                loadingMsg.textContent = res.response;
+            }
+        } catch (e) {
+            if (streamed) {
+                loadingMsg.textContent += " [conexión interrumpida]";
+                return;
+            }
+            messagesContainer.removeChild(loadingMsg);
+            // Fallback to the non-streaming endpoint
+            const res = await api.chat(text, "", currentChatId);
             if (res.response) {
                 appendMessage(res.response, true);
                 if (res.chat_id) {
                     currentChatId = res.chat_id;
                 }
             } else {
-                appendMessage("Error: No hubo respuesta.", true);
+                appendMessage("Error de conexión.", true);
             }
-        } catch (e) {
-            messagesContainer.removeChild(loadingMsg);
-            appendMessage("Error de conexión.", true);
         }
     };
 
@@ -108,6 +108,16 @@ export const taxonomiaApi = {
         return res.json();
     },
     
+    // Misma taxonomía para varios objetos (multi-selección en Archives)
+    async assignTaxonomyBulk(objectIds, data) {
+        const res = await fetch(`${API_BASE}/objetos/asignar-bulk`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ ...data, objeto_ids: objectIds })
+        });
+        return res.json();
+    },
+    
     async getObjectTaxonomy(objectId) {
         const res = await fetch(`${API_BASE}/objetos/${objectId}/taxonomia`);
         return res.json();
@@ -73,6 +73,45 @@ export const api = {
         }
     },
 
+    // Streaming chat (NDJSON). onToken(text) is called per token as it arrives.
+    // Resolves with the final { response, chat_id }; throws on network/HTTP error.
+    async chatStream(message, context = "", chatId = null, onToken = () => {}) {
+        const token = await auth.getToken();
+        const res = await fetch(`${API_BASE}/chat/stream`, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'Authorization': `Bearer ${token}`
+            },
+            body: JSON.stringify({ message, context, chat_id: chatId })
+        });
+        if (!res.ok || !res.body) throw new Error('Chat stream failed');
+
+        const reader = res.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        let result = { response: '', chat_id: chatId };
+
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+            const lines = buffer.split('\n');
+            buffer = lines.pop();
+            for (const line of lines) {
+                if (!line.trim()) continue;
+                const event = JSON.parse(line);
+                if (event.type === 'token') {
+                    result.response += event.content;
+                    onToken(event.content);
+                } else if (event.type === 'done' || event.type === 'error') {
+                    result = { response: event.response, chat_id: event.chat_id };
+                }
+            }
+        }
+        return result;
+    },
+
     async getChatHistory() {
         try {
             const token = await auth.getToken();
@@ -183,20 +222,54 @@ export const api = {
         // data: { source, object_class, name, confidence, timestamp, location, heading, image_base64, metadata, mission_id }
         try {
             const token = await auth.getToken();
-            const res = await fetch(`${API_BASE}/objects/create`, {
+            const headers = { 'Authorization': `Bearer ${token}` };
+            let body;
+            if (data.image_base64?.startsWith('data:')) {
+                // Frame goes up as a binary multipart part (no base64 inflation), the rest as JSON meta
+                const { image_base64, ...meta } = data;
+                body = new FormData();
+                body.append('meta', JSON.stringify(meta));
+                body.append('image', await (await fetch(image_base64)).blob(), 'frame.jpg');
+            } else {
+                headers['Content-Type'] = 'application/json';
+                body = JSON.stringify(data);
+            }
+            const res = await fetch(`${API_BASE}/objects/create`, { method: 'POST', headers, body });
+            if (!res.ok) throw new Error('Object Create failed');
+            return await res.json();
+        } catch (err) {
+            console.error("Object Sync Error:", err);
+            return { success: false, error: err.message };
+        }
+    },
+
+    // Bulk variant: flush a queue of detections in one request.
+    // Returns { success, inserted, failed, results: [{ index, success, id?, error? }] }
+    async createObjectsBulk(items) {
+        try {
+            const token = await auth.getToken();
+            const res = await fetch(`${API_BASE}/objects/bulk`, {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json',
                     'Authorization': `Bearer ${token}`
                 },
-                body: JSON.stringify(data)
+                body: JSON.stringify(items)
             });
-            if (!res.ok) throw new Error('Object Create failed');
+            if (!res.ok) throw new Error('Bulk create failed');
             return await res.json();
         } catch (err) {
-            console.error("Object Sync Error:", err);
-            return { success: false, error: err.message };
+            console.error("Bulk Object Sync Error:", err);
+            return { success: false, error: err.message, results: [] };
+        }
+    },
+
+    // Image URL for an archived object: blob store reference, or legacy inline base64
+    objectImageUrl(obj, variant = 'full') {
+        if (obj?.metadata?.image_ref || obj?.metadata?.legacy_image) {
+            return `${API_BASE}/objects/${obj.id}/image?variant=${variant}`;
         }
+        return obj?.metadata?.image_base64 || null;
     },
 
     // --- ARCHIVES ---
@@ -210,30 +283,35 @@ export const api = {
         } catch (e) { return []; }
     },
 
-    async getMissionObjects(missionId) {
-        try {
-            const token = await auth.getToken();
-            const res = await fetch(`${API_BASE}/missions/${missionId}/objects?t=${Date.now()}`, {
+    // Follows X-Next-Cursor until the listing is exhausted
+    async _fetchObjectPages(path) {
+        const token = await auth.getToken();
+        const objects = [];
+        let cursor = null;
+        do {
+            const qs = cursor ? `&cursor=${encodeURIComponent(cursor)}` : '';
+            const res = await fetch(`${API_BASE}${path}?limit=200${qs}&t=${Date.now()}`, {
                 headers: {
                     'Authorization': `Bearer ${token}`,
                     'Cache-Control': 'no-cache'
                 }
             });
-            return await res.json();
+            if (!res.ok) break;
+            objects.push(...await res.json());
+            cursor = res.headers.get('X-Next-Cursor');
+        } while (cursor);
+        return objects;
+    },
+
+    async getMissionObjects(missionId) {
+        try {
+            return await this._fetchObjectPages(`/missions/${missionId}/objects`);
         } catch (e) { return []; }
     },
 
     async getOrphanedObjects() {
         try {
-            const token = await auth.getToken();
-            // Add timestamp to prevent browser caching
-            const res = await fetch(`${API_BASE}/missions/orphaned/objects?t=${Date.now()}`, {
-                headers: {
-                    'Authorization': `Bearer ${token}`,
-                    'Cache-Control': 'no-cache'
-                }
-            });
-            return await res.json();
+            return await this._fetchObjectPages('/missions/orphaned/objects');
         } catch (e) { return []; }
     },
 
@@ -284,5 +362,27 @@ export const api = {
             console.error(e);
             return [];
         }
+    },
+
+    // --- SYNC ---
+    // Pulls every change since `cursor` (all pages). Returns { changes, cursor, reset };
+    // on reset the caller drops its replica and syncs again with cursor = null.
+    async syncDelta(cursor = null) {
+        const token = await auth.getToken();
+        const changes = [];
+        let hasMore = true;
+        while (hasMore) {
+            const qs = cursor ? `?since=${encodeURIComponent(cursor)}` : '';
+            const res = await fetch(`${API_BASE}/sync${qs}`, {
+                headers: { 'Authorization': `Bearer ${token}` }
+            });
+            if (!res.ok) throw new Error(`Sync failed: ${res.status}`);
+            const page = await res.json();
+            if (page.reset) return { changes: [], cursor: null, reset: true };
+            changes.push(...page.changes);
+            cursor = page.cursor;
+            hasMore = page.has_more;
+        }
+        return { changes, cursor, reset: false };
     }
 };